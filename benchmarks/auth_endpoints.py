@@ -0,0 +1,278 @@
+"""Benchmark harness: throughput and latency of every auth endpoint.
+
+Runs a closed-loop load test against /register, /login, /logout, /password-reset,
+/password-update and /auth/google/google-callback, one endpoint at a time, and prints
+throughput plus p50/p95/p99 latency per endpoint as JSON.
+
+By default the ASGI app is driven in-process through httpx.ASGITransport against a fresh
+file-backed SQLite database, with bcrypt running at --bcrypt-rounds. With --url the same
+scenarios run against a running server (e.g. `poetry run tst_auth_svc`) and the server's
+BCRYPT_ROUNDS applies. The Google callback scenario runs in-process only: the code exchange
+with Google is replaced by a stand-in that signs in testuser@example.com, so it measures the
+service's own work (settings, user lookup, session creation) rather than Google's latency.
+
+Endpoints that need state first create it with untimed requests: /logout logs in to get
+the token it revokes and /password-update requests the reset token it consumes. Only the
+measured request counts towards latency; throughput is measured requests per second of
+wall time, so it includes that preparation.
+
+--output saves the report, and --compare checks it against a stored baseline report,
+exiting with status 1 if any endpoint's p99 grew or its throughput fell by more than
+--threshold percent.
+
+Usage:
+    poetry run python benchmarks/auth_endpoints.py --concurrency 16 --duration 10 --output bench.json
+    poetry run python benchmarks/auth_endpoints.py --compare benchmarks/baseline.json
+    poetry run python benchmarks/auth_endpoints.py --url http://localhost:8000 --endpoints login,logout
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+ENDPOINTS = ("register", "login", "logout", "password-reset", "password-update", "google-callback")
+PASSWORD = "benchpassword"
+GOOGLE_EMAIL = "testuser@example.com"
+
+
+def _summary(samples: list, errors: int, elapsed: float) -> dict:
+    report = {"requests": len(samples), "errors": errors,
+              "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0}
+    if not samples:
+        return report
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    report.update({
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    })
+    return report
+
+
+async def _register(client: httpx.AsyncClient, username: str, email: str = None) -> None:
+    response = await client.post("/register", json={
+        "username": username, "email": email or f"{username}@example.com", "password": PASSWORD})
+    # 400 means the user exists already, which is fine when reusing a server between runs
+    if response.status_code not in (200, 400):
+        response.raise_for_status()
+
+
+async def _login(client: httpx.AsyncClient, username: str) -> httpx.Response:
+    return await client.post("/login", json={"username": username, "password": PASSWORD})
+
+
+def _user(run_id: str, worker: int) -> str:
+    return f"bench_{run_id}_{worker}"
+
+
+async def setup_users(client: httpx.AsyncClient, concurrency: int, run_id: str) -> None:
+    """Registers one user per client plus the account the stand-in Google client signs in."""
+    for worker in range(concurrency):
+        await _register(client, _user(run_id, worker))
+    await _register(client, f"bench_google_{run_id}", GOOGLE_EMAIL)
+
+
+class StandInGoogleClient:
+    """Takes the place of the Google OAuth client in-process: every code signs in GOOGLE_EMAIL."""
+
+    async def exchange_code(self, code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
+        claims = {"iss": "https://accounts.google.com", "aud": client_id, "email": GOOGLE_EMAIL,
+                  "email_verified": True}
+        return {"access_token": f"bench-access-{code}", "id_token": f"bench-id-{code}", "email": GOOGLE_EMAIL,
+                "claims": claims}
+
+    async def close(self) -> None:
+        pass
+
+
+class Scenario:
+    """One endpoint's workload: optional untimed preparation, then the measured request."""
+
+    def __init__(self, client: httpx.AsyncClient, name: str, run_id: str):
+        self.client = client
+        self.name = name
+        self.run_id = run_id
+
+    def user(self, worker: int) -> str:
+        return _user(self.run_id, worker)
+
+    async def prepare(self, worker: int):
+        if self.name == "logout":
+            response = await _login(self.client, self.user(worker))
+            response.raise_for_status()
+            return response.json()["session_token"]
+        if self.name == "password-update":
+            response = await self.client.post("/password-reset", json={"identifier": self.user(worker)})
+            response.raise_for_status()
+            return response.json()["reset_token"]
+        return None
+
+    async def request(self, worker: int, prepared) -> httpx.Response:
+        if self.name == "register":
+            return await self.client.post("/register", json={
+                "username": f"reg_{uuid.uuid4().hex}", "email": f"{uuid.uuid4().hex}@example.com",
+                "password": PASSWORD})
+        if self.name == "login":
+            return await _login(self.client, self.user(worker))
+        if self.name == "logout":
+            return await self.client.post("/logout", json={"session_token": prepared})
+        if self.name == "password-reset":
+            return await self.client.post("/password-reset", json={"identifier": self.user(worker)})
+        if self.name == "password-update":
+            return await self.client.post("/password-update", json={"reset_token": prepared, "new_password": PASSWORD})
+        return await self.client.get("/auth/google/google-callback", params={"code": uuid.uuid4().hex})
+
+
+async def run_endpoint(client: httpx.AsyncClient, name: str, args, run_id: str) -> dict:
+    scenario = Scenario(client, name, run_id)
+    samples, errors = [], 0
+
+    async def worker(index: int, deadline: float, record: bool):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            prepared = await scenario.prepare(index)
+            started = time.perf_counter()
+            try:
+                response = await scenario.request(index, prepared)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if record:
+                if ok:
+                    samples.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+    if args.warmup > 0:
+        deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(*(worker(i, deadline, False) for i in range(args.concurrency)))
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(worker(i, deadline, True) for i in range(args.concurrency)))
+    return _summary(samples, errors, time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    if args.url and "google-callback" in endpoints:
+        print("Skipping google-callback: it only runs in-process", file=sys.stderr)
+        endpoints.remove("google-callback")
+    run_id = uuid.uuid4().hex[:8]
+    timeout = httpx.Timeout(args.timeout)
+    results = {}
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            await setup_users(client, args.concurrency, run_id)
+            for name in endpoints:
+                results[name] = await run_endpoint(client, name, args, run_id)
+        target = args.url
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        # Configure the service before it is imported: it reads its settings at import time
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+        os.environ.setdefault("GOOGLE_CLIENT_ID", "bench_client_id")
+        os.environ.setdefault("GOOGLE_CLIENT_SECRET", "bench_client_secret")
+        os.environ.setdefault("GOOGLE_REDIRECT_URI", "http://bench/auth/google/google-callback")
+        from tst_auth_svc import google_oauth_client
+        from tst_auth_svc.app import app
+        from tst_auth_svc.hashing import shutdown_hasher
+        from tst_auth_svc.models.base import Base, get_engine
+
+        google_oauth_client.google_client = StandInGoogleClient()
+        engine = get_engine()
+        Base.metadata.create_all(engine)
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+                await setup_users(client, args.concurrency, run_id)
+                for name in endpoints:
+                    results[name] = await run_endpoint(client, name, args, run_id)
+        finally:
+            shutdown_hasher()
+            engine.dispose()
+            tmp.cleanup()
+        target = "in-process"
+
+    return {
+        "meta": {
+            "target": target,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "bcrypt_rounds": None if args.url else args.bcrypt_rounds,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "endpoints": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> dict:
+    """Compares a report with a baseline report; returns per-endpoint deltas and regressions."""
+    comparison, regressions = {}, []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous or "p99_ms" not in previous or "p99_ms" not in current:
+            continue
+        p99_change = (current["p99_ms"] - previous["p99_ms"]) / previous["p99_ms"] * 100 if previous["p99_ms"] else 0.0
+        rps_change = ((current["throughput_rps"] - previous["throughput_rps"]) / previous["throughput_rps"] * 100
+                      if previous["throughput_rps"] else 0.0)
+        comparison[name] = {
+            "p99_ms": [previous["p99_ms"], current["p99_ms"]],
+            "p99_change_pct": round(p99_change, 1),
+            "throughput_rps": [previous["throughput_rps"], current["throughput_rps"]],
+            "throughput_change_pct": round(rps_change, 1),
+        }
+        if p99_change > threshold or rps_change < -threshold:
+            regressions.append(name)
+    return {"threshold_pct": threshold, "endpoints": comparison, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per endpoint")
+    parser.add_argument("--duration", type=float, default=5.0, help="measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds per endpoint before measuring")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10, help="bcrypt cost for the in-process app")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p99/throughput regression in percent")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+    print(json.dumps(report, indent=2))
+    if args.compare and report["comparison"]["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark: /login with and without group commit of session inserts.
+
+Drives the ASGI app in-process with httpx against a file-backed SQLite database and runs
+the same /login storm twice: once committing each session row on its own, once through
+the group-commit queue (SESSION_GROUP_COMMIT). Prints database commits per second, logins
+per second and the login latency distribution for both modes as JSON. The benchmark user
+has a low bcrypt cost so the commit path, not hashing, dominates.
+
+Usage:
+    poetry run python benchmarks/login_group_commit.py --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import bcrypt
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from tst_auth_svc import group_commit
+from tst_auth_svc.app import app
+from tst_auth_svc.group_commit import SessionWriteQueue
+from tst_auth_svc.models import Base, User, get_db
+from tst_auth_svc.models.base import SyncSessionAdapter
+
+
+def _summary(samples: list) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def _login_storm(client: httpx.AsyncClient, deadline: float, samples: list):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/login", json={"username": "bench", "password": "benchpassword"})
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+
+
+async def _run_mode(path: str, args, grouped: bool) -> dict:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        hashed = bcrypt.hashpw(b"benchpassword", bcrypt.gensalt(4)).decode('utf-8')
+        db.add(User(username="bench", email="bench@example.com", password=hashed))
+        db.commit()
+
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    def override_session():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_session
+    writer = None
+    if grouped:
+        writer = SessionWriteQueue(args.max_rows, args.max_delay_ms / 1000,
+                                   session_factory=lambda: SyncSessionAdapter(factory()))
+    group_commit._writer = writer
+
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        commits.clear()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(_login_storm(client, deadline, samples) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    if writer is not None:
+        await writer.close()
+    group_commit._writer = None
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+    return {
+        "commits_per_sec": round(len(commits) / elapsed, 1),
+        "logins_per_sec": round(len(samples) / elapsed, 1),
+        "login": _summary(samples),
+        "group_commit": writer.stats() if writer is not None else None,
+    }
+
+
+async def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        return {
+            "per_request_commit": await _run_mode(os.path.join(tmp, "off.db"), args, grouped=False),
+            "group_commit": await _run_mode(os.path.join(tmp, "on.db"), args, grouped=True),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per mode")
+    parser.add_argument("--max-rows", type=int, default=128, help="group commit batch size")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0, help="group commit max batch delay")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
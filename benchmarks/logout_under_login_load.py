@@ -0,0 +1,134 @@
+"""Benchmark: /logout latency while /login saturates the bcrypt hashing executor.
+
+Drives the ASGI app in-process with httpx against a file-backed SQLite database. It first
+measures /logout alone, then again while a pool of clients hammers /login, and prints both
+latency distributions as JSON. With bcrypt on its own executor the /logout p99 should stay
+roughly flat between the two phases.
+
+Usage:
+    poetry run python benchmarks/logout_under_login_load.py --login-concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import bcrypt
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from tst_auth_svc.app import app
+from tst_auth_svc.models import Base, SessionToken, User, get_db
+
+
+def _summary(samples: list) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _setup_database(path: str, tokens: int, rounds: int):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        hashed = bcrypt.hashpw(b"benchpassword", bcrypt.gensalt(rounds)).decode('utf-8')
+        user = User(username="bench", email="bench@example.com", password=hashed)
+        db.add(user)
+        db.commit()
+        # Only digests are stored, so keep the tokens themselves for the logout requests
+        token_values = [str(uuid.uuid4()) for _ in range(tokens)]
+        db.add_all(SessionToken(user_id=user.id, session_token=token) for token in token_values)
+        db.commit()
+    return factory, token_values
+
+
+async def _measure_logout(client: httpx.AsyncClient, tokens: list, duration: float, concurrency: int) -> list:
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline and tokens:
+            token = tokens.pop()
+            started = time.perf_counter()
+            await client.post("/logout", json={"session_token": token})
+            samples.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def _login_storm(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.post("/login", json={"username": "bench", "password": "benchpassword"})
+        samples.append(time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        factory, tokens = _setup_database(os.path.join(tmp, "bench.db"), args.tokens, args.rounds)
+
+        def override_session():
+            session = factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app.dependency_overrides[get_db] = override_session
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            idle = await _measure_logout(client, tokens, args.duration, args.logout_concurrency)
+
+            stop = asyncio.Event()
+            login_samples = []
+            storm = [asyncio.create_task(_login_storm(client, stop, login_samples))
+                     for _ in range(args.login_concurrency)]
+            await asyncio.sleep(1.0)
+            loaded = await _measure_logout(client, tokens, args.duration, args.logout_concurrency)
+            stop.set()
+            await asyncio.gather(*storm)
+
+            hashing = (await client.get("/internal/hashing")).json()
+        app.dependency_overrides.pop(get_db, None)
+
+    return {
+        "logout_idle": _summary(idle),
+        "logout_under_login_load": _summary(loaded),
+        "login": _summary(login_samples),
+        "hashing_executor": hashing,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--login-concurrency", type=int, default=64)
+    parser.add_argument("--logout-concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per measurement phase")
+    parser.add_argument("--tokens", type=int, default=20000, help="session rows seeded for /logout")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost of the benchmark user")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
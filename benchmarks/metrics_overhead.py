@@ -0,0 +1,118 @@
+"""Benchmark: overhead of the metrics middleware and instrumentation.
+
+Serves a cheap endpoint (/session/validate answered from the negative session cache, so
+no database or bcrypt work) through the in-process ASGI app with METRICS_ENABLED off and
+on, each in a fresh interpreter since settings are read at import time. Prints requests
+per second and latency percentiles for both, plus the raw cost of a histogram observation
+and a counter increment, as JSON.
+
+Usage:
+    poetry run python benchmarks/metrics_overhead.py --requests 20000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _percentile(ordered: list, p: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 4)
+
+
+async def _serve(requests: int, concurrency: int) -> dict:
+    import httpx
+
+    from tst_auth_svc.app import app
+    from tst_auth_svc.models.base import Base, get_engine
+
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        payload = {"session_token": "benchmark-unknown-token"}
+        await client.post("/session/validate", json=payload)
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                await client.post("/session/validate", json=payload)
+                samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(samples)
+    return {
+        "requests_per_sec": round(len(samples) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": _percentile(ordered, 0.50),
+        "p99_ms": _percentile(ordered, 0.99),
+    }
+
+
+def _recording_cost(iterations: int) -> dict:
+    from tst_auth_svc.metrics import Counter, Histogram
+
+    histogram = Histogram("bench_seconds", "Benchmark.", ("method", "route", "status"))
+    counter = Counter("bench_total", "Benchmark.", ("format",))
+    started = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe(0.003, "POST", "/login", "200")
+    observe = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(iterations):
+        counter.inc("opaque")
+    inc = time.perf_counter() - started
+    return {"histogram_observe_ns": round(observe / iterations * 1e9), "counter_inc_ns": round(inc / iterations * 1e9)}
+
+
+def _child(args) -> None:
+    print(json.dumps(asyncio.run(_serve(args.requests, args.concurrency))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5, help="alternating off/on rounds; the median is reported")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args)
+        return
+
+    runs = {"metrics_off": [], "metrics_on": []}
+    # Alternate the modes over several rounds so machine noise hits both equally
+    for _ in range(args.rounds):
+        for enabled in ("false", "true"):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(os.environ, METRICS_ENABLED=enabled, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", "--requests", str(args.requests),
+                     "--concurrency", str(args.concurrency)],
+                    env=env, check=True, capture_output=True, text=True,
+                ).stdout
+            runs["metrics_on" if enabled == "true" else "metrics_off"].append(json.loads(output.splitlines()[-1]))
+
+    # Report the median round of each mode by throughput
+    results = {mode: sorted(samples, key=lambda r: r["requests_per_sec"])[len(samples) // 2]
+               for mode, samples in runs.items()}
+    off, on = results["metrics_off"], results["metrics_on"]
+    results["throughput_change_pct"] = round((on["requests_per_sec"] - off["requests_per_sec"])
+                                             / off["requests_per_sec"] * 100, 2)
+    results["recording_cost"] = _recording_cost(200000)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: signed session token verification vs. a sessions-table lookup.
+
+Compares the in-memory HMAC verification used for SESSION_TOKEN_FORMAT=signed with the
+indexed SELECT an opaque token needs (file-backed SQLite, warm page cache, session cache
+bypassed), and prints operations per second for both as JSON.
+
+Usage:
+    poetry run python benchmarks/session_verify.py --tokens 10000 --iterations 50000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from tst_auth_svc.models import Base, SessionToken, User
+from tst_auth_svc.signed_tokens import TokenSigner, parse_key_set
+
+
+def bench_signed(tokens: int, iterations: int) -> float:
+    signer = TokenSigner(parse_key_set("bench:" + uuid.uuid4().hex), ttl=3600)
+    issued = [signer.issue(i + 1) for i in range(tokens)]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        assert signer.verify(random.choice(issued)) is not None
+    return iterations / (time.perf_counter() - start)
+
+
+def bench_database(tokens: int, iterations: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        session.add(User(id=1, username="bench", email="bench@example.com", password="x"))
+        issued = [str(uuid.uuid4()) for _ in range(tokens)]
+        session.add_all(SessionToken(user_id=1, session_token=token) for token in issued)
+        session.commit()
+
+        query = select(SessionToken.user_id)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            assert session.execute(query.where(SessionToken.session_token == random.choice(issued))).scalar()
+        elapsed = time.perf_counter() - start
+        session.close()
+        engine.dispose()
+    return iterations / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    signed = bench_signed(args.tokens, args.iterations)
+    database = bench_database(args.tokens, args.iterations)
+    print(json.dumps({
+        "signed_verify_ops_per_sec": round(signed),
+        "database_lookup_ops_per_sec": round(database),
+        "speedup": round(signed / database, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
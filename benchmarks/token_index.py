@@ -0,0 +1,177 @@
+"""Benchmark: size and lookup latency of the sessions token index, string vs digest.
+
+Builds two SQLite databases holding the same --rows tokens (90% uuid4 sessions, 10%
+"reset:" tokens, as issued by the service):
+
+    string  session_token VARCHAR(255) UNIQUE, the schema before migrations 0003-0006
+    digest  token_digest BLOB UNIQUE plus token_type, as stored now (16-byte BLAKE2b)
+
+and reports, per layout, the size of the unique index and of the whole table (from the
+dbstat virtual table), then the latency of --lookups equality lookups of random existing
+tokens, as run by /logout and /password-update. The digest lookups include hashing the
+token, so the comparison is end to end.
+
+The databases are built with the plain sqlite3 module in batches of --batch rows; at the
+default 10M rows expect a few minutes and ~2 GB of disk under --dir.
+
+Usage:
+    poetry run python benchmarks/token_index.py
+    poetry run python benchmarks/token_index.py --rows 1000000 --lookups 50000
+"""
+import argparse
+import json
+import os
+import random
+import secrets
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+
+from tst_auth_svc.models.session import RESET_TOKEN_PREFIX, TOKEN_TYPE_RESET, TOKEN_TYPE_SESSION, token_digest
+
+LAYOUTS = {
+    "string": {
+        "schema": """
+            CREATE TABLE sessions (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                session_token VARCHAR(255) NOT NULL,
+                created_at DATETIME,
+                expires_at DATETIME,
+                CONSTRAINT uq_sessions_session_token UNIQUE (session_token)
+            )""",
+        "insert": "INSERT INTO sessions (user_id, session_token, created_at, expires_at) VALUES (?, ?, ?, ?)",
+        "row": lambda user_id, token, now: (user_id, token, now, now),
+        "lookup": "SELECT user_id FROM sessions WHERE session_token = ?",
+        "key": lambda token: token,
+        "index": "sqlite_autoindex_sessions_1",
+    },
+    "digest": {
+        "schema": """
+            CREATE TABLE sessions (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                token_digest BLOB NOT NULL,
+                token_type SMALLINT NOT NULL,
+                created_at DATETIME,
+                expires_at DATETIME,
+                CONSTRAINT uq_sessions_token_digest UNIQUE (token_digest)
+            )""",
+        "insert": "INSERT INTO sessions (user_id, token_digest, token_type, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+        "row": lambda user_id, token, now: (
+            user_id, token_digest(token),
+            TOKEN_TYPE_RESET if token.startswith(RESET_TOKEN_PREFIX) else TOKEN_TYPE_SESSION, now, now),
+        "lookup": "SELECT user_id FROM sessions WHERE token_digest = ?",
+        "key": token_digest,
+        "index": "sqlite_autoindex_sessions_1",
+    },
+}
+
+
+def _token(rng: random.Random) -> str:
+    if rng.random() < 0.1:
+        return RESET_TOKEN_PREFIX + secrets.token_urlsafe(32)
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def build(path: str, layout: dict, rows: int, batch: int, seed: int, sample_every: int) -> tuple:
+    """Creates and fills one database; returns (build seconds, sampled tokens)."""
+    rng = random.Random(seed)
+    now = "2026-01-01 00:00:00.000000"
+    sample = []
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute(layout["schema"])
+    started = time.perf_counter()
+    written = 0
+    while written < rows:
+        tokens = [_token(rng) for _ in range(min(batch, rows - written))]
+        connection.executemany(layout["insert"], [layout["row"](1 + (written + i) % 10000, token, now)
+                                                  for i, token in enumerate(tokens)])
+        connection.commit()
+        sample.extend(tokens[::sample_every])
+        written += len(tokens)
+    elapsed = time.perf_counter() - started
+    connection.execute("ANALYZE")
+    connection.close()
+    return elapsed, sample
+
+
+def sizes(path: str, index: str) -> dict:
+    connection = sqlite3.connect(path)
+    try:
+        used = dict(connection.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+        depth = connection.execute(
+            "SELECT MAX(LENGTH(path) - LENGTH(REPLACE(path, '/', ''))) + 1 FROM dbstat WHERE name = ?",
+            (index,)).fetchone()[0]
+    finally:
+        connection.close()
+    return {
+        "index_mb": round(used.get(index, 0) / 2 ** 20, 1),
+        "table_mb": round(used.get("sessions", 0) / 2 ** 20, 1),
+        "file_mb": round(os.path.getsize(path) / 2 ** 20, 1),
+        "index_depth": depth,
+    }
+
+
+def measure_lookups(path: str, layout: dict, tokens: list) -> dict:
+    connection = sqlite3.connect(path)
+    samples = []
+    try:
+        for token in tokens:
+            started = time.perf_counter()
+            row = connection.execute(layout["lookup"], (layout["key"](token),)).fetchone()
+            samples.append(time.perf_counter() - started)
+            assert row is not None
+    finally:
+        connection.close()
+    ordered = sorted(samples)
+    return {
+        "lookups": len(ordered),
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 2),
+        "p50_us": round(ordered[len(ordered) // 2] * 1e6, 2),
+        "p99_us": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000, help="tokens per database")
+    parser.add_argument("--lookups", type=int, default=100_000, help="random lookups per layout")
+    parser.add_argument("--batch", type=int, default=50_000, help="rows per insert batch")
+    parser.add_argument("--dir", help="directory for the databases (default: a temporary one, removed afterwards)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = None if args.dir else tempfile.TemporaryDirectory()
+    directory = args.dir or tmp.name
+    sample_every = max(1, args.rows // (args.lookups * 2))
+    report = {"rows": args.rows, "layouts": {}}
+    try:
+        for name, layout in LAYOUTS.items():
+            path = os.path.join(directory, f"tokens_{name}.db")
+            if os.path.exists(path):
+                os.remove(path)
+            build_seconds, sample = build(path, layout, args.rows, args.batch, args.seed, sample_every)
+            lookup_tokens = random.Random(args.seed).sample(sample, min(args.lookups, len(sample)))
+            report["layouts"][name] = {
+                "build_seconds": round(build_seconds, 1),
+                **sizes(path, layout["index"]),
+                **measure_lookups(path, layout, lookup_tokens),
+            }
+            if tmp is not None:
+                os.remove(path)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+    string, digest = report["layouts"]["string"], report["layouts"]["digest"]
+    report["index_size_ratio"] = round(digest["index_mb"] / string["index_mb"], 3) if string["index_mb"] else None
+    report["p50_lookup_ratio"] = round(digest["p50_us"] / string["p50_us"], 3) if string["p50_us"] else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""add sessions.expires_at and backfill it
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:15:00.000000
+
+Adds the expires_at column the background sweeper deletes by, fills it in for existing
+rows and indexes it. Without the backfill, rows created before the column would keep a
+NULL expiry and never be swept.
+
+An existing row expires at created_at (or now, where that is NULL) plus its token kind's
+lifetime: `-x reset_ttl=N` seconds for password reset tokens (default 3600) and
+`-x session_ttl=N` for sessions (default 86400); match RESET_TOKEN_TTL and
+SESSION_TOKEN_TTL if they are configured. A signed-token revocation record expires with the
+token it revokes. Rows are updated with ChunkedBackfill in chunks of `-x batch_size=N`,
+optionally throttled with `-x max_rows_per_second=N`.
+
+Everything here runs against a live database: the column is added as nullable without a
+default (no table rewrite), each chunk is its own transaction, and the index is built with
+create_index_online. Databases that already got the column by hand are only backfilled and
+indexed.
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from tst_auth_svc.online_migrations import ChunkedBackfill, create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_BATCH_SIZE = 10000
+# Frozen copies of the RESET_TOKEN_TTL and SESSION_TOKEN_TTL defaults as of this revision
+DEFAULT_RESET_TTL = 3600
+DEFAULT_SESSION_TTL = 86400
+
+sessions = sa.table(
+    'sessions',
+    sa.column('id', sa.Integer),
+    sa.column('session_token', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('expires_at', sa.DateTime),
+)
+
+
+def _expiry(token: str, created_at, reset_ttl: int, session_ttl: int, now: datetime) -> datetime:
+    issued = created_at or now
+    if token.startswith('reset:'):
+        return issued + timedelta(seconds=reset_ttl)
+    if token.startswith('revoked:'):
+        try:
+            return datetime.utcfromtimestamp(int(token.rsplit(':', 1)[1]))
+        except (IndexError, ValueError):
+            pass
+    return issued + timedelta(seconds=session_ttl)
+
+
+def _backfill(x_args: dict) -> ChunkedBackfill:
+    reset_ttl = int(x_args.get('reset_ttl', DEFAULT_RESET_TTL))
+    session_ttl = int(x_args.get('session_ttl', DEFAULT_SESSION_TTL))
+    now = datetime.utcnow()
+    return ChunkedBackfill(
+        'sessions.expires_at',
+        source=(
+            sa.select(sessions.c.id, sessions.c.session_token, sessions.c.created_at)
+            .where(sessions.c.expires_at.is_(None))
+        ),
+        update=(
+            sa.update(sessions)
+            .where(sessions.c.id == sa.bindparam('row_id'))
+            .values(expires_at=sa.bindparam('expiry'))
+        ),
+        transform=lambda row: {'row_id': row.id,
+                               'expiry': _expiry(row.session_token, row.created_at, reset_ttl, session_ttl, now)},
+        batch_size=int(x_args.get('batch_size', DEFAULT_BATCH_SIZE)),
+        max_rows_per_second=float(x_args.get('max_rows_per_second', 0)),
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('sessions')}
+    if 'expires_at' not in columns:
+        op.add_column('sessions', sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    backfill = _backfill(context.get_x_argument(as_dictionary=True))
+    # One transaction per chunk rather than one for the whole table
+    with op.get_context().autocommit_block():
+        backfill.run(bind)
+
+    create_index_online('ix_sessions_expires_at', 'sessions', ['expires_at'])
+
+
+def downgrade() -> None:
+    drop_index_online('ix_sessions_expires_at', 'sessions')
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.drop_column('expires_at')
@@ -0,0 +1,117 @@
+"""store session tokens as fixed-width digests: expand
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:30:00.000000
+
+First step of replacing sessions.session_token (VARCHAR(255), holding uuid4, "reset:" and
+"revoked:" strings) with token_digest, a 16-byte BLAKE2b digest of the token, and a
+token_type discriminator (0 session, 1 password reset, 2 signed-token revocation). The
+change is made expand/contract, so the service keeps serving throughout:
+
+    0003  (this revision, while the previous release serves) adds token_digest and
+          token_type as nullable columns, builds the unique index on token_digest
+          concurrently, lets session_token be NULL and backfills the digests
+    ----  deploy this release with SESSION_TOKEN_LEGACY_COLUMN=true: it writes
+          session_token too, so instances still on the previous release see its sessions,
+          and also finds rows the previous release writes until 0005 backfills them
+    0005  once no instance of the previous release is left: backfills the rows it wrote
+          meanwhile and makes token_digest and token_type NOT NULL without a table scan
+    ----  restart without SESSION_TOKEN_LEGACY_COLUMN
+    0006  drops session_token
+
+Existing rows are converted with ChunkedBackfill in chunks of `-x batch_size=N` rows
+(default 10000), each committed on its own and optionally throttled with
+`-x max_rows_per_second=N`; an interrupted run picks up where it stopped.
+
+Downgrading drops the new columns. Rows without a plaintext token (written with
+SESSION_TOKEN_LEGACY_COLUMN unset) cannot be converted back and are deleted: those users
+have to log in again.
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from tst_auth_svc.online_migrations import ChunkedBackfill, create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Frozen copies of tst_auth_svc.models.session.token_digest / token_type as of this revision
+DIGEST_SIZE = 16
+
+sessions = sa.table(
+    'sessions',
+    sa.column('id', sa.Integer),
+    sa.column('session_token', sa.String),
+    sa.column('token_digest', sa.LargeBinary),
+    sa.column('token_type', sa.SmallInteger),
+)
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+def _token_type(token: str) -> int:
+    if token.startswith('reset:'):
+        return 1
+    if token.startswith('revoked:'):
+        return 2
+    return 0
+
+
+def _backfill(x_args: dict) -> ChunkedBackfill:
+    return ChunkedBackfill(
+        'sessions.token_digest',
+        source=(
+            sa.select(sessions.c.id, sessions.c.session_token)
+            .where(sessions.c.token_digest.is_(None))
+            .where(sessions.c.session_token.is_not(None))
+        ),
+        update=(
+            sa.update(sessions)
+            .where(sessions.c.id == sa.bindparam('row_id'))
+            .values(token_digest=sa.bindparam('digest'), token_type=sa.bindparam('kind'))
+        ),
+        transform=lambda row: {'row_id': row.id, 'digest': _digest(row.session_token),
+                               'kind': _token_type(row.session_token)},
+        batch_size=int(x_args.get('batch_size', DEFAULT_BATCH_SIZE)),
+        max_rows_per_second=float(x_args.get('max_rows_per_second', 0)),
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('sessions')}
+    if 'token_digest' not in columns:
+        # Nullable and without a default: no table rewrite
+        op.add_column('sessions', sa.Column('token_digest', sa.LargeBinary(DIGEST_SIZE), nullable=True))
+        op.add_column('sessions', sa.Column('token_type', sa.SmallInteger(), nullable=True))
+    # So this release can stop writing it before 0006 drops it (catalog-only on PostgreSQL)
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.alter_column('session_token', existing_type=sa.String(length=255), nullable=True)
+    # NULLs do not collide, so the index can be built before the backfill and guards it too
+    create_index_online('ix_sessions_token_digest', 'sessions', ['token_digest'], unique=True)
+
+    backfill = _backfill(context.get_x_argument(as_dictionary=True))
+    # One transaction per chunk rather than one for the whole table
+    with op.get_context().autocommit_block():
+        backfill.run(bind)
+
+
+def downgrade() -> None:
+    op.execute(sessions.delete().where(sessions.c.session_token.is_(None)))
+    drop_index_online('ix_sessions_token_digest', 'sessions')
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.drop_column('token_type')
+        batch_op.drop_column('token_digest')
+        batch_op.alter_column('session_token', existing_type=sa.String(length=255), nullable=False)
@@ -0,0 +1,46 @@
+"""index sessions.user_id, drop redundant indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:00:00.000000
+
+Adds ix_sessions_user_id for per-user session lookups and revocation (the sessions.user_id
+foreign key had no index, so those were full table scans).
+
+Drops indexes that duplicate another one on the same columns and only cost write
+amplification and cache space: ix_users_id and ix_sessions_id duplicate the primary keys,
+and ix_users_username and ix_users_email duplicate the uq_users_username and
+uq_users_email unique constraints.
+
+Expiry scans already use ix_sessions_expires_at, so created_at stays unindexed.
+
+Every change is made with create_index_online/drop_index_online (CONCURRENTLY on
+PostgreSQL), so the revision runs against a live database without blocking writes, and
+can be re-run if it fails part way through.
+"""
+from typing import Sequence, Union
+
+from tst_auth_svc.online_migrations import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_online('ix_sessions_user_id', 'sessions', ['user_id'])
+    drop_index_online('ix_sessions_id', 'sessions')
+    drop_index_online('ix_users_id', 'users')
+    drop_index_online('ix_users_username', 'users')
+    drop_index_online('ix_users_email', 'users')
+
+
+def downgrade() -> None:
+    create_index_online('ix_users_email', 'users', ['email'], unique=True)
+    create_index_online('ix_users_username', 'users', ['username'], unique=True)
+    create_index_online('ix_users_id', 'users', ['id'])
+    create_index_online('ix_sessions_id', 'sessions', ['id'])
+    drop_index_online('ix_sessions_user_id', 'sessions')
@@ -0,0 +1,88 @@
+"""store session tokens as fixed-width digests: make the digest required
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:30:00.000000
+
+Third step of the session token digest change (see 0003 for the whole sequence). Run it
+once no instance of the previous release is left: it digests the rows those instances
+wrote after 0003's backfill, then makes token_digest and token_type NOT NULL with
+set_not_null_online, so no table scan runs under an exclusive lock. session_token stays
+until 0006, as instances running with SESSION_TOKEN_LEGACY_COLUMN still write it.
+
+Takes the same `-x batch_size=N` and `-x max_rows_per_second=N` options as 0003.
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from tst_auth_svc.online_migrations import ChunkedBackfill, set_not_null_online
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Frozen copies of tst_auth_svc.models.session.token_digest / token_type as of this revision
+DIGEST_SIZE = 16
+
+sessions = sa.table(
+    'sessions',
+    sa.column('id', sa.Integer),
+    sa.column('session_token', sa.String),
+    sa.column('token_digest', sa.LargeBinary),
+    sa.column('token_type', sa.SmallInteger),
+)
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+def _token_type(token: str) -> int:
+    if token.startswith('reset:'):
+        return 1
+    if token.startswith('revoked:'):
+        return 2
+    return 0
+
+
+def _backfill(x_args: dict) -> ChunkedBackfill:
+    return ChunkedBackfill(
+        'sessions.token_digest',
+        source=(
+            sa.select(sessions.c.id, sessions.c.session_token)
+            .where(sessions.c.token_digest.is_(None))
+            .where(sessions.c.session_token.is_not(None))
+        ),
+        update=(
+            sa.update(sessions)
+            .where(sessions.c.id == sa.bindparam('row_id'))
+            .values(token_digest=sa.bindparam('digest'), token_type=sa.bindparam('kind'))
+        ),
+        transform=lambda row: {'row_id': row.id, 'digest': _digest(row.session_token),
+                               'kind': _token_type(row.session_token)},
+        batch_size=int(x_args.get('batch_size', DEFAULT_BATCH_SIZE)),
+        max_rows_per_second=float(x_args.get('max_rows_per_second', 0)),
+    )
+
+
+def upgrade() -> None:
+    backfill = _backfill(context.get_x_argument(as_dictionary=True))
+    with op.get_context().autocommit_block():
+        backfill.run(op.get_bind())
+
+    set_not_null_online('sessions', 'token_digest', sa.LargeBinary(DIGEST_SIZE))
+    set_not_null_online('sessions', 'token_type', sa.SmallInteger())
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.alter_column('token_type', existing_type=sa.SmallInteger(), nullable=True)
+        batch_op.alter_column('token_digest', existing_type=sa.LargeBinary(DIGEST_SIZE), nullable=True)
@@ -0,0 +1,36 @@
+"""store session tokens as fixed-width digests: drop the plaintext column
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 11:45:00.000000
+
+Last step of the session token digest change (see 0003 for the whole sequence): drops
+sessions.session_token, and with it the plaintext tokens. Run it only once every instance
+runs without SESSION_TOKEN_LEGACY_COLUMN, as those still write the column. On PostgreSQL
+dropping a column only changes the catalog; the space is reclaimed as rows are rewritten.
+
+Downgrading brings the column back empty and nullable: the tokens themselves are gone, and
+the previous release finds sessions by token_digest.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.drop_column('session_token')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sessions') as batch_op:
+        batch_op.add_column(sa.Column('session_token', sa.String(length=255), nullable=True))
+        batch_op.create_unique_constraint('uq_sessions_session_token', ['session_token'])
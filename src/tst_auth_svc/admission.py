@@ -0,0 +1,160 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+from fastapi import HTTPException, status
+
+from tst_auth_svc.config import ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_MS
+
+"""
+This module implements per-route admission control for the password-hashing endpoints.
+
+Each controller admits at most max_in_flight requests at a time. Further requests wait in a
+bounded FIFO queue for at most queue_timeout seconds; if they cannot start within that budget
+(or the queue is already full) they are shed with 503 and a Retry-After header before any
+database or bcrypt work is done, instead of queueing work nobody will wait for.
+"""
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted within the latency budget."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Max-in-flight limiter with a bounded, deadline-aware wait queue.
+
+    Args:
+        name (str): Route name used in counters.
+        max_in_flight (int): Requests allowed to run concurrently.
+        max_queue (int): Requests allowed to wait for a slot; 0 rejects as soon as all slots are busy.
+        queue_timeout (float): Seconds a request may wait for a slot before it is shed.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._counters = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+        self._wait_seconds = 0.0
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds a shed client should back off, advertised in the Retry-After header."""
+        return max(1, math.ceil(self.queue_timeout))
+
+    async def acquire(self) -> None:
+        """Waits for a free slot, raising AdmissionRejected if none frees up in time."""
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self._counters["admitted"] += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._counters["rejected_queue_full"] += 1
+                raise AdmissionRejected("queue full")
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._counters["queued"] += 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except BaseException:
+            # Cancelled while queued (e.g. client went away): give back a slot we may have been handed
+            with self._lock:
+                if waiter.done():
+                    self._release_locked()
+                else:
+                    waiter.cancel()
+                    self._waiters.remove(waiter)
+            raise
+
+        with self._lock:
+            self._wait_seconds += time.perf_counter() - started
+            if waiter.done():
+                # The slot was handed over by release(); in_flight already counts it
+                self._counters["admitted"] += 1
+                return
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self._counters["rejected_timeout"] += 1
+        raise AdmissionRejected("queue deadline exceeded")
+
+    def release(self) -> None:
+        """Frees a slot, handing it directly to the oldest waiter if there is one."""
+        with self._lock:
+            self._release_locked()
+
+    def _release_locked(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "queue_timeout_ms": self.queue_timeout * 1000,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "total_queue_wait_ms": self._wait_seconds * 1000,
+                **self._counters,
+            }
+
+
+_controllers = {}
+
+
+def get_controller(name: str) -> AdmissionController:
+    """Returns the admission controller for a route, creating it from config on first use."""
+    if name not in _controllers:
+        _controllers[name] = AdmissionController(
+            name,
+            max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+            max_queue=ADMISSION_MAX_QUEUE,
+            queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        )
+    return _controllers[name]
+
+
+def admission_stats() -> dict:
+    return {name: controller.stats() for name, controller in _controllers.items()}
+
+
+def admission_control(name: str):
+    """Builds a route dependency that holds an admission slot for the duration of the request.
+
+    Usage:
+        @router.post("/login", dependencies=[Depends(admission_control("login"))])
+    """
+    controller = get_controller(name)
+
+    async def dependency():
+        try:
+            await controller.acquire()
+        except AdmissionRejected:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Service is overloaded, please retry later",
+                                headers={"Retry-After": str(controller.retry_after)})
+        try:
+            yield
+        finally:
+            controller.release()
+
+    return dependency
@@ -1,7 +1,58 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from tst_auth_svc.models.base import get_db, get_secure_db
+from tst_auth_svc.google_oauth_client import google_client
+from tst_auth_svc.group_commit import shutdown_session_writer
+from tst_auth_svc.hashing import calibrate_hasher, shutdown_hasher
+from tst_auth_svc.metrics import MetricsMiddleware, instrument_engine
+from tst_auth_svc.models.base import ASYNC_DATABASE, get_async_secure_db, get_db, get_secure_db, init_engines
+from tst_auth_svc.profiling import ProfiledJSONResponse, ProfilingMiddleware, install_profiler
+from tst_auth_svc.rehash import stored_costs
+from tst_auth_svc.replicas import replica_set
+from tst_auth_svc.session_store import close_session_store
+from tst_auth_svc.settings import install_reload_signal, remove_reload_signal
+from tst_auth_svc.sweeper import session_sweeper
+from tst_auth_svc.warmup import warm_up, warmup
+
+
+def init_database() -> None:
+    """Creates the database engines and hooks metrics and profiling onto them (idempotent)."""
+    engine, _, replicas = init_engines()
+    for instrumented in [engine] + [getattr(e, "sync_engine", e) for e in replicas]:
+        instrument_engine(instrumented)
+        install_profiler(instrumented)
+
 
-app = FastAPI(debug=True)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engines are built here rather than at import, so importing the app stays cheap
+    init_database()
+    # Pick the bcrypt cost for this hardware before serving (only if BCRYPT_TARGET_MS is set)
+    await calibrate_hasher()
+    # Pay connection, statement compilation and model set-up costs before the first request
+    await warm_up(app)
+    session_sweeper.start()
+    stored_costs.start()
+    # SIGHUP re-reads the settings snapshot (e.g. a rotated OAuth client secret)
+    install_reload_signal()
+    yield
+    # /ready turns 503 first, so load balancers stop routing here while requests drain
+    await warmup.stop()
+    remove_reload_signal()
+    await session_sweeper.stop()
+    await stored_costs.stop()
+    # Commit any logins still waiting in the group-commit queue
+    await shutdown_session_writer()
+    await close_session_store()
+    await replica_set.close()
+    await google_client.close()
+    # Stop the bcrypt workers so no hashing threads or processes outlive the app
+    shutdown_hasher()
+
+
+app = FastAPI(debug=True, lifespan=lifespan, default_response_class=ProfiledJSONResponse)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 """
 Dependency Override Configuration:
@@ -13,10 +64,14 @@ session creation are caught, logged with detailed traceback (using logging.error
 re-raised. This ensures that FastAPI's dependency injection correctly manages the
 session lifecycle, including proper cleanup after each request.
 
+When DATABASE_URL names an asyncio driver (e.g. sqlite+aiosqlite, postgresql+asyncpg),
+get_async_secure_db is used instead and yields a native AsyncSession. Routers consume
+either through get_async_session, which presents both behind the AsyncSession API.
+
 Note: This override is applied only in the production environment. In tests, the dependency
 may be further overridden via fixtures.
 """
-app.dependency_overrides[get_db] = get_secure_db
+app.dependency_overrides[get_db] = get_async_secure_db if ASYNC_DATABASE else get_secure_db
 
 # add routers
 from tst_auth_svc.routers import registration
@@ -37,3 +92,21 @@ app.include_router(logout.router)
 # Include the new Google OAuth router with prefix
 from tst_auth_svc.routers import google_oauth
 app.include_router(google_oauth.router, prefix='/auth/google')
+
+from tst_auth_svc.routers import session
+app.include_router(session.router)
+
+from tst_auth_svc.routers import internal
+app.include_router(internal.router)
+
+from tst_auth_svc.routers import user_import
+app.include_router(user_import.router)
+
+from tst_auth_svc.routers import revocation
+app.include_router(revocation.router)
+
+from tst_auth_svc.routers import metrics
+app.include_router(metrics.router)
+
+from tst_auth_svc.routers import health
+app.include_router(health.router)
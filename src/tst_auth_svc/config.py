@@ -5,4 +5,135 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///:memory:")
 SERVICE_HOST = os.getenv("SERVICE_HOST", "0.0.0.0")
-SERVICE_PORT = os.getenv("SERVICE_PORT", 8000)
\ No newline at end of file
+SERVICE_PORT = os.getenv("SERVICE_PORT", 8000)
+
+# Password hashing executor: "thread" or "process"; 0 workers means one per CPU core
+HASH_EXECUTOR_KIND = os.getenv("HASH_EXECUTOR_KIND", "thread")
+HASH_EXECUTOR_WORKERS = int(os.getenv("HASH_EXECUTOR_WORKERS", 0))
+# bcrypt cost factor for newly hashed passwords (existing hashes keep the cost they were made with)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Startup calibration: pick the cost in [MIN, MAX] hashing in about BCRYPT_TARGET_MS (0 keeps BCRYPT_ROUNDS)
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", 0))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", 10))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", 16))
+# Re-hash a password at the current cost, in the background, when login verifies an older hash
+BCRYPT_REHASH_ON_LOGIN = os.getenv("BCRYPT_REHASH_ON_LOGIN", "true").lower() in ("1", "true", "yes")
+# Hashes at most this many rounds above the current cost are kept; cheaper ones are always re-hashed
+BCRYPT_REHASH_TOLERANCE = int(os.getenv("BCRYPT_REHASH_TOLERANCE", 2))
+# Seconds between counts of users per stored bcrypt cost (a full scan, run on a replica if any and in one
+# worker only) behind the bcrypt_stored_cost_users gauge; 0 disables the count
+BCRYPT_COST_CENSUS_INTERVAL = float(os.getenv("BCRYPT_COST_CENSUS_INTERVAL", 3600))
+
+# Admission control for the bcrypt-backed endpoints (/login, /register, /password-update)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 64))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 256))
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 1000))
+
+# Database connection pool (ignored for in-memory SQLite, which uses a single connection)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Read replicas: comma-separated URLs (sync or async driver, like DATABASE_URL); empty disables them
+DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+# Seconds a replica that failed a query is left out of the rotation
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", 30))
+
+# In-process cache behind /session/validate (TTLs in seconds; 0 disables that kind of entry)
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", 100000))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", 60))
+SESSION_CACHE_NEGATIVE_TTL = float(os.getenv("SESSION_CACHE_NEGATIVE_TTL", 10))
+
+# Session token format: "opaque" (random id stored in the sessions table) or "signed" (stateless HMAC token)
+SESSION_TOKEN_FORMAT = os.getenv("SESSION_TOKEN_FORMAT", "opaque")
+# Comma-separated kid:secret pairs; the first key signs, all keys verify
+SESSION_SIGNING_KEYS = os.getenv("SESSION_SIGNING_KEYS", "")
+# Session lifetime in seconds, for opaque and signed tokens alike
+SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", 86400))
+SESSION_REVOCATION_REFRESH_SECONDS = float(os.getenv("SESSION_REVOCATION_REFRESH_SECONDS", 5))
+# Each refresh re-reads the revocation rows of this many past seconds, catching rows committed out of id order
+SESSION_REVOCATION_OVERLAP_SECONDS = float(os.getenv("SESSION_REVOCATION_OVERLAP_SECONDS", 30))
+# Set while sessions still has the plaintext session_token column (between migrations 0003 and 0006):
+# new rows fill it too, and lookups also match rows whose token_digest is not backfilled yet
+SESSION_TOKEN_LEGACY_COLUMN = os.getenv("SESSION_TOKEN_LEGACY_COLUMN", "false").lower() in ("1", "true", "yes")
+
+# Lifetime of password reset tokens in seconds (sessions use SESSION_TOKEN_TTL)
+RESET_TOKEN_TTL = int(os.getenv("RESET_TOKEN_TTL", 3600))
+
+# Background sweeper deleting expired sessions rows (interval in seconds; 0 disables it)
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", 300))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", 1000))
+SESSION_SWEEP_MAX_ROWS_PER_SECOND = float(os.getenv("SESSION_SWEEP_MAX_ROWS_PER_SECOND", 5000))
+
+# Group commit for session inserts on login: queue rows and write them in one multi-row INSERT
+SESSION_GROUP_COMMIT = os.getenv("SESSION_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+SESSION_GROUP_COMMIT_MAX_ROWS = int(os.getenv("SESSION_GROUP_COMMIT_MAX_ROWS", 128))
+SESSION_GROUP_COMMIT_MAX_DELAY_MS = int(os.getenv("SESSION_GROUP_COMMIT_MAX_DELAY_MS", 5))
+
+# Prometheus metrics: request, bcrypt and database instrumentation served at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Opt-in request profiler: Server-Timing breakdown and a log of requests over budget (0 disables a budget)
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "false").lower() in ("1", "true", "yes")
+PROFILE_STATEMENT_BUDGET = int(os.getenv("PROFILE_STATEMENT_BUDGET", 20))
+PROFILE_LATENCY_BUDGET_MS = float(os.getenv("PROFILE_LATENCY_BUDGET_MS", 500))
+PROFILE_SLOW_REQUESTS = int(os.getenv("PROFILE_SLOW_REQUESTS", 50))
+
+# Backend for opaque session and reset tokens: "sql", "memory" (single node) or "redis"
+SESSION_STORE = os.getenv("SESSION_STORE", "sql")
+SESSION_STORE_SHARDS = int(os.getenv("SESSION_STORE_SHARDS", 64))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", 10))
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", 2.0))
+
+# Bulk user import (/internal/users/import and the tst_auth_svc_import script): rows per INSERT transaction,
+# plaintext passwords hashed concurrently on the shared hashing executor, and the longest accepted NDJSON line
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", 1000))
+BULK_IMPORT_HASH_CONCURRENCY = int(os.getenv("BULK_IMPORT_HASH_CONCURRENCY", 2))
+BULK_IMPORT_MAX_LINE_BYTES = int(os.getenv("BULK_IMPORT_MAX_LINE_BYTES", 65536))
+
+# Brute-force limiter for /login: failed attempts allowed per username and per client IP in a sliding window
+LOGIN_LIMIT_ENABLED = os.getenv("LOGIN_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+LOGIN_LIMIT_WINDOW_SECONDS = float(os.getenv("LOGIN_LIMIT_WINDOW_SECONDS", 300))
+LOGIN_LIMIT_PER_USERNAME = int(os.getenv("LOGIN_LIMIT_PER_USERNAME", 10))
+LOGIN_LIMIT_PER_IP = int(os.getenv("LOGIN_LIMIT_PER_IP", 100))
+# Count-min sketch size per key kind: width x depth 2-byte counters, kept for two windows (fixed memory)
+LOGIN_LIMIT_SKETCH_WIDTH = int(os.getenv("LOGIN_LIMIT_SKETCH_WIDTH", 131072))
+LOGIN_LIMIT_SKETCH_DEPTH = int(os.getenv("LOGIN_LIMIT_SKETCH_DEPTH", 4))
+
+# Google OAuth endpoints (override to point at a stand-in server) and ID token issuers accepted
+GOOGLE_TOKEN_URL = os.getenv("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_ISSUERS = os.getenv("GOOGLE_ISSUERS", "https://accounts.google.com,accounts.google.com")
+# Shared keep-alive HTTP client: overall deadline and connect timeout per call (seconds), pool size
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", 5))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv("GOOGLE_HTTP_CONNECT_TIMEOUT", 2))
+GOOGLE_HTTP_MAX_CONNECTIONS = int(os.getenv("GOOGLE_HTTP_MAX_CONNECTIONS", 20))
+# Signing keys are cached for the response's Cache-Control max-age, or this long without one
+GOOGLE_JWKS_DEFAULT_MAX_AGE = float(os.getenv("GOOGLE_JWKS_DEFAULT_MAX_AGE", 3600))
+# Clock skew tolerated on ID token exp/iat (seconds)
+GOOGLE_CLOCK_SKEW_SECONDS = int(os.getenv("GOOGLE_CLOCK_SKEW_SECONDS", 60))
+
+# Production server (tst_auth_svc; see tst_auth_svc.server): worker processes (0: one per CPU core),
+# event loop and HTTP parser ("auto" uses uvloop/httptools when installed) and per-worker SO_REUSEPORT sockets
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 1))
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")
+SERVER_REUSE_PORT = os.getenv("SERVER_REUSE_PORT", "false").lower() in ("1", "true", "yes")
+# Listen backlog per socket and idle keep-alive timeout (seconds)
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", 2048))
+SERVER_KEEP_ALIVE = int(os.getenv("SERVER_KEEP_ALIVE", 5))
+# Seconds a stopping worker may spend finishing in-flight requests (0: no limit), a worker has to answer
+# a health ping, and a new worker has to start serving during a rolling restart
+SERVER_GRACEFUL_TIMEOUT = float(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+SERVER_HEALTH_TIMEOUT = float(os.getenv("SERVER_HEALTH_TIMEOUT", 5))
+SERVER_BOOT_TIMEOUT = float(os.getenv("SERVER_BOOT_TIMEOUT", 60))
+
+# Startup warm-up (see tst_auth_svc.warmup): connections pre-opened per engine (capped by the pool size), time limit
+# in seconds, and whether to start serving at once and warm up behind /ready instead of delaying startup
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", DB_POOL_SIZE))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 30))
+WARMUP_BACKGROUND = os.getenv("WARMUP_BACKGROUND", "false").lower() in ("1", "true", "yes")
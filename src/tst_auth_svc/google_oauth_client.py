@@ -1,34 +1,292 @@
+import asyncio
+import functools
 import logging
+import re
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+from urllib.parse import urlencode
+
+from tst_auth_svc.config import (
+    GOOGLE_CLOCK_SKEW_SECONDS,
+    GOOGLE_HTTP_CONNECT_TIMEOUT,
+    GOOGLE_HTTP_MAX_CONNECTIONS,
+    GOOGLE_HTTP_TIMEOUT,
+    GOOGLE_ISSUERS,
+    GOOGLE_JWKS_DEFAULT_MAX_AGE,
+    GOOGLE_JWKS_URL,
+    GOOGLE_TOKEN_URL,
+)
+
+if TYPE_CHECKING:
+    import httpx
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
 
 """
-This module provides a dummy implementation of Google OAuth2 related functions.
-Note: This implementation is for development/testing purposes only.
-For production, integrate with actual Google OAuth2 API calls and proper error handling.
+This module talks to Google's OAuth2 endpoints for the Google sign-in flow.
+
+The authorization code is exchanged at GOOGLE_TOKEN_URL over one shared, keep-alive
+httpx.AsyncClient, so an OAuth login never blocks the event loop and does not pay for a
+new TLS handshake each time. Every call has a hard deadline of GOOGLE_HTTP_TIMEOUT.
+httpx itself is imported on the first exchange, so services that never use Google sign-in
+do not pay for it (and its CA bundle) at startup.
+
+The ID token in the response is verified locally with PyJWT (and cryptography for RS256):
+its signature against Google's published signing keys (GOOGLE_JWKS_URL), then issuer,
+audience, expiry and issue time. Like httpx, PyJWT is imported on first use. The keys are
+cached for as long as the JWKS response's Cache-Control max-age allows. When they expire
+(or a token names a key id not seen yet, at most once a minute) a single request refreshes
+them, shared by every login waiting on them; if that refresh fails, the cached keys keep
+being used until a retry succeeds.
 """
 
-def generate_auth_url(client_id: str, redirect_uri: str, scope: str = None) -> str:
+# Smallest RSA modulus accepted from the JWKS
+MIN_RSA_KEY_BITS = 2048
+# A token with an unknown key id triggers a refresh at most this often, so forged ids cannot hammer the JWKS
+JWKS_UNKNOWN_KID_REFRESH_SECONDS = 60
+# Seconds before retrying a failed refresh while the cached keys are still served
+JWKS_RETRY_SECONDS = 30
+
+
+class GoogleOAuthError(Exception):
+    """Google rejected the authorization code, or the ID token failed verification."""
+
+
+def _max_age(cache_control: str) -> Optional[float]:
+    if re.search(r"\b(no-cache|no-store)\b", cache_control):
+        return 0.0
+    match = re.search(r"\bmax-age\s*=\s*(\d+)", cache_control)
+    return float(match.group(1)) if match else None
+
+
+class JwksCache:
+    """Google's RS256 signing keys by key id, cached per Cache-Control and refreshed single-flight.
+
+    Args:
+        url (str): JWKS endpoint.
+        fetch (callable): Awaitable GET returning an httpx.Response.
+        default_max_age (float): Seconds to cache keys when the response has no max-age.
+        clock (callable, optional): Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, url: str, fetch: Callable[[str], Awaitable["httpx.Response"]], default_max_age: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.url = url
+        self._fetch = fetch
+        self.default_max_age = default_max_age
+        self._clock = clock
+        self._keys = {}
+        self._expires_at = float("-inf")
+        self._last_fetch = float("-inf")
+        self._refresh: Optional[asyncio.Task] = None
+        self.fetches = 0
+        self.failed_fetches = 0
+
+    async def get(self, kid: str) -> "RSAPublicKey":
+        """Returns a signing key, refreshing the cache if needed."""
+        now = self._clock()
+        unknown = kid not in self._keys and now - self._last_fetch >= JWKS_UNKNOWN_KID_REFRESH_SECONDS
+        if now >= self._expires_at or unknown:
+            await self.refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            raise GoogleOAuthError(f"ID token signed with unknown key {kid!r}")
+        return key
+
+    async def refresh(self) -> None:
+        """Reloads the keys; concurrent callers share one request."""
+        task = self._refresh
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._refresh = asyncio.ensure_future(self._load())
+        # Shielded so that a caller giving up does not cancel the request others wait on
+        await asyncio.shield(task)
+
+    async def _load(self) -> None:
+        import jwt
+
+        started = self._clock()
+        try:
+            response = await self._fetch(self.url)
+            response.raise_for_status()
+            keys = {}
+            for jwk in response.json().get("keys", []):
+                if jwk.get("kty") != "RSA" or jwk.get("alg", "RS256") != "RS256" or not jwk.get("kid"):
+                    continue
+                key = jwt.PyJWK(jwk, algorithm="RS256").key
+                if key.key_size < MIN_RSA_KEY_BITS:
+                    continue
+                keys[jwk["kid"]] = key
+        except Exception as e:
+            self.failed_fetches += 1
+            self._last_fetch = started
+            if not self._keys:
+                raise
+            logging.warning("Refreshing Google signing keys failed, keeping the cached ones: %s", e)
+            self._expires_at = started + JWKS_RETRY_SECONDS
+            return
+        max_age = _max_age(response.headers.get("cache-control", ""))
+        self._keys = keys
+        self._last_fetch = started
+        self._expires_at = started + (self.default_max_age if max_age is None else max_age)
+        self.fetches += 1
+
+    def stats(self) -> dict:
+        return {"keys": sorted(self._keys), "expires_in": max(0.0, self._expires_at - self._clock()),
+                "fetches": self.fetches, "failed_fetches": self.failed_fetches}
+
+
+class GoogleOAuthClient:
+    """Async client for the authorization code exchange, with local ID token verification.
+
+    Args:
+        token_url (str): OAuth2 token endpoint.
+        jwks_url (str): JWKS endpoint publishing the ID token signing keys.
+        issuers (list): Accepted values of the ID token's iss claim.
+        timeout (float): Deadline in seconds for each HTTP call, connection included.
+        connect_timeout (float): Seconds allowed for establishing a connection.
+        max_connections (int): Size of the keep-alive connection pool.
+        jwks_max_age (float): Key cache lifetime when the JWKS response has no max-age.
+        clock_skew (int): Seconds of leeway on exp and iat.
+        clock (callable, optional): Monotonic time source for the key cache, injectable for tests.
+    """
+
+    def __init__(self, token_url: str, jwks_url: str, issuers: list, timeout: float, connect_timeout: float,
+                 max_connections: int, jwks_max_age: float, clock_skew: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.token_url = token_url
+        self.issuers = set(issuers)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.clock_skew = clock_skew
+        self.jwks = JwksCache(jwks_url, self._get, jwks_max_age, clock)
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _client(self) -> "httpx.AsyncClient":
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            # Pooled connections belong to the event loop that opened them; a new loop needs a new pool
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._loop = loop
+        return self._http
+
+    async def _request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        client = self._client()
+        try:
+            return await asyncio.wait_for(client.request(method, url, **kwargs), self.timeout)
+        except asyncio.TimeoutError:
+            import httpx
+
+            raise httpx.TimeoutException(f"{method} {url} took longer than {self.timeout} s")
+
+    async def _get(self, url: str) -> "httpx.Response":
+        return await self._request("GET", url)
+
+    async def exchange_code(self, code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
+        """Redeems an authorization code; returns the tokens and the verified ID token claims.
+
+        email is only set when Google reports the address as verified.
+        """
+        response = await self._request("POST", self.token_url, data={
+            "code": code,
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "redirect_uri": redirect_uri,
+            "grant_type": "authorization_code",
+        })
+        if 400 <= response.status_code < 500:
+            try:
+                error = response.json().get("error", "unknown error")
+            except ValueError:
+                error = response.text[:200]
+            raise GoogleOAuthError(f"Token endpoint rejected the authorization code: {error}")
+        response.raise_for_status()
+        tokens = response.json()
+        id_token = tokens.get("id_token")
+        if not id_token:
+            raise GoogleOAuthError("Token response has no ID token")
+        claims = await self.verify_id_token(id_token, client_id)
+        verified = claims.get("email_verified") in (True, "true")
+        return {
+            "access_token": tokens.get("access_token"),
+            "id_token": id_token,
+            "email": claims.get("email") if verified else None,
+            "claims": claims,
+        }
+
+    async def verify_id_token(self, id_token: str, audience: str) -> dict:
+        """Verifies an ID token's signature, issuer, audience and lifetime; returns its claims."""
+        import jwt
+
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.DecodeError:
+            raise GoogleOAuthError("Malformed ID token")
+        if header.get("alg") != "RS256":
+            raise GoogleOAuthError(f"Unsupported ID token algorithm {header.get('alg')!r}")
+
+        key = await self.jwks.get(header.get("kid"))
+        try:
+            return jwt.decode(id_token, key, algorithms=["RS256"], audience=audience, issuer=self.issuers,
+                              leeway=self.clock_skew, options={"require": ["exp", "iss", "aud"]})
+        except jwt.InvalidSignatureError:
+            raise GoogleOAuthError("Invalid ID token signature")
+        except jwt.InvalidIssuerError:
+            raise GoogleOAuthError("ID token has an unexpected issuer")
+        except jwt.InvalidAudienceError:
+            raise GoogleOAuthError("ID token was issued to another client")
+        except jwt.ExpiredSignatureError:
+            raise GoogleOAuthError("ID token has expired")
+        except jwt.ImmatureSignatureError:
+            raise GoogleOAuthError("ID token is not valid yet")
+        except jwt.InvalidTokenError as e:
+            raise GoogleOAuthError(f"Invalid ID token: {e}")
+
+    async def close(self) -> None:
+        """Closes pooled connections; a new pool is opened lazily if used again."""
+        http, self._http = self._http, None
+        if http is not None and self._loop is asyncio.get_running_loop():
+            await http.aclose()
+
+
+google_client = GoogleOAuthClient(
+    GOOGLE_TOKEN_URL, GOOGLE_JWKS_URL, [issuer.strip() for issuer in GOOGLE_ISSUERS.split(",") if issuer.strip()],
+    GOOGLE_HTTP_TIMEOUT, GOOGLE_HTTP_CONNECT_TIMEOUT, GOOGLE_HTTP_MAX_CONNECTIONS, GOOGLE_JWKS_DEFAULT_MAX_AGE,
+    GOOGLE_CLOCK_SKEW_SECONDS,
+)
+
+
+@functools.lru_cache(maxsize=16)
+def generate_auth_url(client_id: str, redirect_uri: str, scope: str = "openid email") -> str:
     """Generates a Google authentication URL for initiating the OAuth2 login process.
-    
+
+    The URL only depends on the client configuration, so it is built once per configuration
+    (and again after a settings reload changes it) rather than on every login.
+
     Args:
         client_id (str): The Google OAuth2 client ID.
         redirect_uri (str): The URI to redirect to after authentication.
-        scope (str, optional): The space-delimited OAuth2 scopes. Defaults to None.
-    
+        scope (str, optional): The space-delimited OAuth2 scopes. Defaults to "openid email",
+            which makes Google return an ID token carrying the user's email.
+
     Returns:
         str: The URL to redirect the user for Google OAuth2 authentication.
     """
     base_url = "https://accounts.google.com/o/oauth2/auth"
-    url = f"{base_url}?client_id={client_id}&redirect_uri={redirect_uri}&response_type=code"
+    params = {"client_id": client_id, "redirect_uri": redirect_uri, "response_type": "code"}
     if scope:
-        url += f"&scope={scope}"
-    return url
+        params["scope"] = scope
+    return f"{base_url}?{urlencode(params)}"
 
 
-def exchange_code_for_tokens(code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
+async def exchange_code_for_tokens(code: str, client_id: str, client_secret: str, redirect_uri: str) -> dict:
     """Exchanges an authorization code for access and ID tokens from Google.
-    
-    Note: This is a dummy implementation. In production, this function should
-    make an HTTP request to Google's token endpoint and handle responses accordingly.
 
     Args:
         code (str): The authorization code returned by Google.
@@ -37,15 +295,11 @@ def exchange_code_for_tokens(code: str, client_id: str, client_secret: str, redi
         redirect_uri (str): The redirect URI used in the authentication request.
 
     Returns:
-        dict: A dictionary containing 'access_token', 'id_token', and 'email'.
-    
+        dict: 'access_token', 'id_token', the verified 'email' (None if Google has not
+        verified it) and the ID token's 'claims'.
+
     Raises:
-        Exception: If the provided code is invalid.
+        GoogleOAuthError: If Google rejects the code or the ID token fails verification.
+        httpx.HTTPError: If Google cannot be reached in time or answers with a server error.
     """
-    if code == "valid_code":
-        return {
-            "access_token": "dummy_access_token",
-            "id_token": "dummy_id_token",
-            "email": "testuser@example.com"
-        }
-    raise Exception("Invalid code")
+    return await google_client.exchange_code(code, client_id, client_secret, redirect_uri)
@@ -0,0 +1,192 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import insert
+
+from tst_auth_svc.config import (
+    SESSION_GROUP_COMMIT,
+    SESSION_GROUP_COMMIT_MAX_DELAY_MS,
+    SESSION_GROUP_COMMIT_MAX_ROWS,
+    SESSION_TOKEN_LEGACY_COLUMN,
+)
+from tst_auth_svc.models.base import AsyncDbSession, open_session
+from tst_auth_svc.models.session import SessionToken, token_expiry, token_type
+
+"""
+This module implements group commit for the session rows written on login.
+
+With SESSION_GROUP_COMMIT enabled, create_session hands its row to a SessionWriteQueue
+instead of committing it on the request's own session. A single flusher task writes queued
+rows with one multi-row INSERT and one commit, either once SESSION_GROUP_COMMIT_MAX_ROWS
+rows are waiting or SESSION_GROUP_COMMIT_MAX_DELAY_MS after the first one arrived. Each
+request is only answered once the commit containing its row has succeeded, so the
+durability of a returned session token is unchanged; a login burst just costs one fsync
+per batch instead of one per request.
+"""
+
+
+class SessionWriteQueue:
+    """Batches session inserts into group commits.
+
+    The flusher task is started lazily on the event loop of the first submit and is
+    stopped by close(), which first drains everything already queued.
+
+    Args:
+        max_rows (int): Flush as soon as this many rows are queued.
+        max_delay (float): Seconds the oldest queued row may wait before a flush.
+        session_factory (callable, optional): Returns the AsyncDbSession a batch is written on.
+    """
+
+    def __init__(self, max_rows: int, max_delay: float,
+                 session_factory: Callable[[], AsyncDbSession] = open_session):
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max_delay
+        self.session_factory = session_factory
+        self._pending = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._closing = False
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._errors = 0
+        self._max_batch = 0
+        self._total_write = 0.0
+
+    async def submit(self, user_id: int, session_token: str) -> None:
+        """Queues a session row and returns once the batch containing it is committed."""
+        if self._closing:
+            raise RuntimeError("Session write queue is shut down")
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            # Fresh context: the flusher outlives the request that happened to start it
+            self._task = asyncio.create_task(self._flusher(), context=contextvars.Context())
+
+        now = datetime.utcnow()
+        # Defaults are filled in here: column defaults cannot see a multi-row INSERT's rows
+        row = {"user_id": user_id, "session_token": session_token, "token_type": token_type(session_token),
+               "created_at": now, "expires_at": token_expiry(session_token, now)}
+        if SESSION_TOKEN_LEGACY_COLUMN:
+            row["legacy_session_token"] = session_token
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        await future
+
+    async def _flusher(self) -> None:
+        batch = []
+        try:
+            while True:
+                if not self._pending:
+                    if self._closing:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                # Give the batch until max_delay to fill up; a full batch or shutdown flushes at once
+                if len(self._pending) < self.max_rows and not self._closing:
+                    try:
+                        await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+                    except asyncio.TimeoutError:
+                        pass
+                batch = self._pending[:self.max_rows]
+                del self._pending[:self.max_rows]
+                if len(self._pending) < self.max_rows:
+                    self._full.clear()
+                await self._write(batch)
+                batch = []
+        except Exception as e:
+            # Fail the queued requests rather than leave them waiting; the next submit restarts the flusher
+            logging.error(e, exc_info=True)
+            with self._stats_lock:
+                self._errors += 1
+            failed, self._pending = batch + self._pending, []
+            for _, future in failed:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    async def _write(self, batch: list) -> None:
+        started = time.monotonic()
+        db = None
+        try:
+            db = self.session_factory()
+            await db.execute(insert(SessionToken).values([row for row, _ in batch]))
+            await db.commit()
+        except Exception as e:
+            logging.error(e, exc_info=True)
+            with self._stats_lock:
+                self._errors += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            if db is not None:
+                await db.close()
+
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._total_write += time.monotonic() - started
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def close(self) -> None:
+        """Flushes every queued row, then stops the flusher task."""
+        self._closing = True
+        if self._task is None:
+            return
+        self._wakeup.set()
+        self._full.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_rows": self.max_rows,
+                "max_delay_ms": self.max_delay * 1000,
+                "queued": len(self._pending),
+                "batches": self._batches,
+                "rows": self._rows,
+                "errors": self._errors,
+                "avg_batch_size": (self._rows / self._batches) if self._batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "avg_write_ms": (self._total_write / self._batches * 1000) if self._batches else 0.0,
+            }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_session_writer() -> Optional[SessionWriteQueue]:
+    """Returns the process-wide session write queue, or None when group commit is disabled."""
+    global _writer
+    with _writer_lock:
+        if _writer is None and SESSION_GROUP_COMMIT:
+            _writer = SessionWriteQueue(SESSION_GROUP_COMMIT_MAX_ROWS, SESSION_GROUP_COMMIT_MAX_DELAY_MS / 1000)
+        return _writer
+
+
+async def shutdown_session_writer() -> None:
+    """Drains and stops the session write queue; it is recreated lazily if used again."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        await writer.close()
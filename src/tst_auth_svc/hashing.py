@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+from tst_auth_svc.config import (
+    BCRYPT_MAX_ROUNDS,
+    BCRYPT_MIN_ROUNDS,
+    BCRYPT_REHASH_TOLERANCE,
+    BCRYPT_ROUNDS,
+    BCRYPT_TARGET_MS,
+    HASH_EXECUTOR_KIND,
+    HASH_EXECUTOR_WORKERS,
+)
+from tst_auth_svc.metrics import BCRYPT_DURATION, BCRYPT_ERRORS, BCRYPT_QUEUE_WAIT
+from tst_auth_svc.profiling import record_phase
+
+"""
+This module runs bcrypt hashing and verification on a dedicated, bounded executor.
+
+bcrypt is deliberately slow, so running it inline in an endpoint holds one of Starlette's
+threadpool slots for the whole hash and starves cheap endpoints such as /logout. Routers
+await hash_password/verify_password instead, which keeps the event loop and the shared
+threadpool free while the work runs on its own pool of threads or processes.
+
+New hashes use the executor's cost factor: BCRYPT_ROUNDS, or, when BCRYPT_TARGET_MS is
+set, the cost calibrate_hasher() measured at startup to take about that long on this
+hardware. Under the prefork server the supervisor calibrates once and pins the result in
+BCRYPT_ROUNDS for its workers (see tst_auth_svc.server), so they all agree on the cost.
+"""
+
+# Number of recent latency samples kept per operation for percentile reporting
+LATENCY_WINDOW = 1024
+
+
+# Cost used to time the hardware during calibration; each extra round doubles the work
+CALIBRATION_PROBE_ROUNDS = 8
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_cost(hashed: str) -> Optional[int]:
+    """Returns the cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if it is not one."""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def _timed(fn, *args):
+    # Runs inside the worker so the measured time excludes queueing in the executor
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+def _percentiles(samples) -> dict:
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {"p50_ms": percentile(0.50), "p99_ms": percentile(0.99), "max_ms": percentile(1.0)}
+
+
+class _OperationStats:
+    """Latency bookkeeping for a single hashing operation type."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.run_samples = deque(maxlen=LATENCY_WINDOW)
+        self.wait_samples = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, elapsed: float, run: float, failed: bool) -> None:
+        self.count += 1
+        if failed:
+            self.errors += 1
+            return
+        self.total_seconds += elapsed
+        self.run_samples.append(run)
+        self.wait_samples.append(max(0.0, elapsed - run))
+
+    def snapshot(self) -> dict:
+        succeeded = self.count - self.errors
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": (self.total_seconds / succeeded * 1000) if succeeded else 0.0,
+            "run": _percentiles(self.run_samples),
+            "queue_wait": _percentiles(self.wait_samples),
+        }
+
+
+class HashingExecutor:
+    """Bounded worker pool exposing bcrypt as an async API.
+
+    Args:
+        kind (str): "thread" or "process". bcrypt releases the GIL, so threads are the
+            cheaper default; processes isolate the work completely.
+        max_workers (int, optional): Pool size. Defaults to the number of CPU cores.
+        rounds (int, optional): bcrypt cost factor for new hashes.
+        rehash_tolerance (int, optional): Rounds a stored hash may exceed `rounds` by before
+            needs_rehash asks for it to be re-hashed down.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = None, rounds: int = BCRYPT_ROUNDS,
+                 rehash_tolerance: int = BCRYPT_REHASH_TOLERANCE):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported hashing executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.rounds = rounds
+        self.rehash_tolerance = rehash_tolerance
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {"hash": _OperationStats(), "verify": _OperationStats()}
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="bcrypt")
+            return self._executor
+
+    async def _run(self, operation: str, cost: Optional[int], fn, *args):
+        executor = self._get_executor()
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        result, run, failed = None, 0.0, False
+        try:
+            result, run = await asyncio.get_running_loop().run_in_executor(executor, _timed, fn, *args)
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._in_flight -= 1
+                self._stats[operation].record(elapsed, run, failed)
+            record_phase("hash", elapsed)
+            if failed:
+                BCRYPT_ERRORS.inc(operation)
+            else:
+                BCRYPT_DURATION.observe(run, operation, str(cost))
+                BCRYPT_QUEUE_WAIT.observe(max(0.0, elapsed - run), operation)
+
+    async def hash_password(self, password: str) -> str:
+        """Hashes a plaintext password with a freshly generated bcrypt salt."""
+        hashed = await self._run("hash", self.rounds, _hashpw, password.encode('utf-8'), self.rounds)
+        return hashed.decode('utf-8')
+
+    async def verify_password(self, password: str, hashed: str) -> bool:
+        """Checks a plaintext password against a stored bcrypt hash."""
+        return await self._run("verify", hash_cost(hashed), _checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if a stored hash is cheaper than new hashes, or costlier beyond the tolerance.
+
+        A calibrated cost can come out a round lower on another node or after a restart; the
+        tolerance keeps such noise from re-hashing passwords down and back up again.
+        """
+        cost = hash_cost(hashed)
+        return cost is None or cost < self.rounds or cost > self.rounds + self.rehash_tolerance
+
+    async def calibrate(self, target_ms: float, min_rounds: int, max_rounds: int, samples: int = 3) -> int:
+        """Sets rounds to the highest cost in [min_rounds, max_rounds] expected to hash within target_ms.
+
+        Times a few hashes at CALIBRATION_PROBE_ROUNDS on the executor's own workers and
+        extrapolates, since every extra round doubles the work.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        timings = []
+        for _ in range(samples):
+            _, run = await loop.run_in_executor(executor, _timed, _hashpw, b"calibration", CALIBRATION_PROBE_ROUNDS)
+            timings.append(run)
+        probe = sorted(timings)[len(timings) // 2]
+
+        rounds = min_rounds
+        for candidate in range(max_rounds, min_rounds - 1, -1):
+            if probe * 2 ** (candidate - CALIBRATION_PROBE_ROUNDS) * 1000 <= target_ms:
+                rounds = candidate
+                break
+        self.rounds = rounds
+        return rounds
+
+    def stats(self) -> dict:
+        """Returns queue depth, in-flight count and per-operation latency."""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "rounds": self.rounds,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "operations": {name: op.snapshot() for name, op in self._stats.items()},
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher() -> HashingExecutor:
+    """Returns the process-wide hashing executor, creating it from config on first use."""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = HashingExecutor(kind=HASH_EXECUTOR_KIND, max_workers=HASH_EXECUTOR_WORKERS)
+            logging.info("Hashing executor started: kind=%s workers=%s", _hasher.kind, _hasher.max_workers)
+        return _hasher
+
+
+def calibrated_rounds(target_ms: float, min_rounds: int, max_rounds: int) -> int:
+    """Measures the cost for target_ms on a throwaway executor, outside any event loop.
+
+    For a supervisor to calibrate once before it starts its workers.
+    """
+    hasher = HashingExecutor(kind="thread", max_workers=1)
+    try:
+        return asyncio.run(hasher.calibrate(target_ms, min_rounds, max_rounds))
+    finally:
+        hasher.shutdown()
+
+
+async def calibrate_hasher() -> None:
+    """Picks the bcrypt cost for BCRYPT_TARGET_MS at startup; a no-op when no target is set."""
+    if BCRYPT_TARGET_MS <= 0:
+        return
+    hasher = get_hasher()
+    rounds = await hasher.calibrate(BCRYPT_TARGET_MS, BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS)
+    logging.info("bcrypt calibrated: cost %s for a %s ms target", rounds, BCRYPT_TARGET_MS)
+
+
+def shutdown_hasher() -> None:
+    """Stops the hashing executor's workers; it is recreated lazily if used again."""
+    with _hasher_lock:
+        if _hasher is not None:
+            _hasher.shutdown()
+
+
+async def hash_password(password: str) -> str:
+    return await get_hasher().hash_password(password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await get_hasher().verify_password(password, hashed)
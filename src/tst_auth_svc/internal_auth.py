@@ -0,0 +1,35 @@
+import hmac
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, status
+
+from tst_auth_svc.settings import Settings, get_settings
+
+"""
+This module guards the /internal routes that change state (bulk import, session
+revocation, settings reload) with a shared secret.
+
+Callers send the secret in the X-Internal-Token header; it is compared with
+INTERNAL_API_TOKEN from the settings snapshot, so it can be rotated with a settings reload.
+Without INTERNAL_API_TOKEN the guarded routes answer 403 to everyone: they are never open
+by default.
+"""
+
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None),
+                           settings: Settings = Depends(get_settings)) -> None:
+    """Route dependency rejecting requests without the internal API token.
+
+    Raises:
+        HTTPException: 403 when no internal API token is configured, 401 when the request's
+            token is missing or wrong.
+    """
+    if settings.internal_api_token is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Internal API is disabled: INTERNAL_API_TOKEN is not set.")
+    expected = settings.internal_api_token.get_secret_value().encode("utf-8")
+    if x_internal_token is None or not hmac.compare_digest(x_internal_token.encode("utf-8"), expected):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid or missing internal API token.")
@@ -0,0 +1,223 @@
+import hashlib
+import math
+import threading
+import time
+from array import array
+
+from fastapi import HTTPException, Request, status
+
+from tst_auth_svc.config import (
+    LOGIN_LIMIT_ENABLED,
+    LOGIN_LIMIT_PER_IP,
+    LOGIN_LIMIT_PER_USERNAME,
+    LOGIN_LIMIT_SKETCH_DEPTH,
+    LOGIN_LIMIT_SKETCH_WIDTH,
+    LOGIN_LIMIT_WINDOW_SECONDS,
+)
+from tst_auth_svc.metrics import LOGIN_ATTEMPTS_LIMITED
+
+"""
+This module throttles password guessing on /login before any bcrypt work is done.
+
+Failed logins are counted per username and per client IP over a sliding window. Once a
+key has used up its allowance, further attempts for it are answered 429 with Retry-After
+straight away, without a database lookup or a hash, so credential-stuffing traffic cannot
+be turned into bcrypt CPU. Successful logins are not counted.
+
+Counts live in count-min sketches of fixed size, so memory does not grow with the number
+of distinct usernames or addresses an attacker cycles through. A sketch never undercounts;
+it can overcount when many keys share counters, which would throttle an innocent key
+early. With conservative updates and the default size that takes on the order of a
+million failures per window; stats() reports the error bound for the current load.
+
+The sliding window is approximated from two fixed windows, weighting the previous
+window's count by how much of it still overlaps the sliding one. Each worker process
+counts on its own, so with N workers an attacker gets up to N times the allowance.
+"""
+
+# Counters saturate instead of wrapping around
+_COUNTER_MAX = 0xFFFF
+
+
+class CountMinSketch:
+    """Fixed-size frequency sketch with conservative update.
+
+    Args:
+        width (int): Counters per row; the overcount bound shrinks as width grows.
+        depth (int): Independent rows; more rows lower the odds of exceeding that bound.
+    """
+
+    def __init__(self, width: int, depth: int):
+        self.width = max(1, width)
+        self.depth = max(1, depth)
+        self.counters = array("H", bytes(2 * self.width * self.depth))
+        self.total = 0
+
+    def _cells(self, key: str) -> list:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def estimate(self, key: str) -> int:
+        return min(self.counters[cell] for cell in self._cells(key))
+
+    def add(self, key: str) -> int:
+        """Counts one occurrence of key and returns its new estimate."""
+        cells = self._cells(key)
+        # Conservative update: only raise counters that are at the key's current minimum
+        estimate = min(min(self.counters[cell] for cell in cells) + 1, _COUNTER_MAX)
+        for cell in cells:
+            if self.counters[cell] < estimate:
+                self.counters[cell] = estimate
+        self.total += 1
+        return estimate
+
+    def clear(self) -> None:
+        self.counters = array("H", bytes(2 * self.width * self.depth))
+        self.total = 0
+
+
+class SlidingWindowCounter:
+    """Approximate per-key event counts over the last window seconds, in fixed memory."""
+
+    def __init__(self, window: float, width: int, depth: int, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._current = CountMinSketch(width, depth)
+        self._previous = CountMinSketch(width, depth)
+        self._started = math.floor(clock() / window) * window
+
+    def _rotate(self, now: float) -> float:
+        """Moves to the window containing now; returns the elapsed fraction of it."""
+        elapsed = now - self._started
+        if elapsed >= self.window:
+            if elapsed < 2 * self.window:
+                self._previous, self._current = self._current, self._previous
+            else:
+                self._previous.clear()
+            self._current.clear()
+            self._started = math.floor(now / self.window) * self.window
+            elapsed = now - self._started
+        return elapsed / self.window
+
+    def count(self, key: str) -> float:
+        fraction = self._rotate(self._clock())
+        return self._previous.estimate(key) * (1 - fraction) + self._current.estimate(key)
+
+    def add(self, key: str) -> None:
+        self._rotate(self._clock())
+        self._current.add(key)
+
+    def clear(self) -> None:
+        self._current.clear()
+        self._previous.clear()
+
+    def reset_after(self) -> float:
+        """Seconds until the current fixed window ends."""
+        return self._started + self.window - self._clock()
+
+    def error_bound(self) -> float:
+        """Overcount per key that the sketches stay within with high probability (e/width x events)."""
+        return math.e / self._current.width * (self._current.total + self._previous.total)
+
+    def memory_bytes(self) -> int:
+        return sum(sketch.counters.itemsize * len(sketch.counters) for sketch in (self._current, self._previous))
+
+
+class LoginLimiter:
+    """Per-username and per-IP failed-login limiter.
+
+    Args:
+        window (float): Sliding window length in seconds.
+        per_username (int): Failed attempts allowed per username in a window (0: unlimited).
+        per_ip (int): Failed attempts allowed per client IP in a window (0: unlimited).
+        width (int): Count-min sketch width, per key kind.
+        depth (int): Count-min sketch depth, per key kind.
+        clock (callable, optional): Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, window: float, per_username: int, per_ip: int, width: int, depth: int,
+                 clock=time.monotonic):
+        self.window = window
+        self.limits = {"username": per_username, "ip": per_ip}
+        self._lock = threading.Lock()
+        self._counters = {kind: SlidingWindowCounter(window, width, depth, clock) for kind in self.limits}
+        self._stats = {"checked": 0, "allowed": 0, "rejected_username": 0, "rejected_ip": 0, "failures": 0}
+
+    def _keys(self, username: str, ip: str) -> dict:
+        return {"username": username, "ip": ip or "unknown"}
+
+    def check(self, username: str, ip: str) -> float:
+        """Returns 0 if an attempt may proceed, else the seconds the client should wait."""
+        with self._lock:
+            self._stats["checked"] += 1
+            for kind, key in self._keys(username, ip).items():
+                limit = self.limits[kind]
+                if limit and self._counters[kind].count(key) >= limit:
+                    self._stats[f"rejected_{kind}"] += 1
+                    LOGIN_ATTEMPTS_LIMITED.inc(kind)
+                    return max(1.0, self._counters[kind].reset_after())
+            self._stats["allowed"] += 1
+            return 0.0
+
+    def record_failure(self, username: str, ip: str) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            for kind, key in self._keys(username, ip).items():
+                self._counters[kind].add(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for counter in self._counters.values():
+                counter.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            checked = self._stats["checked"]
+            rejected = self._stats["rejected_username"] + self._stats["rejected_ip"]
+            return {
+                "enabled": LOGIN_LIMIT_ENABLED,
+                "window_seconds": self.window,
+                "limits": dict(self.limits),
+                **self._stats,
+                "rejection_rate": rejected / checked if checked else 0.0,
+                "sketches": {kind: {"memory_bytes": counter.memory_bytes(),
+                                    "error_bound": round(counter.error_bound(), 3)}
+                             for kind, counter in self._counters.items()},
+            }
+
+
+login_limiter = LoginLimiter(LOGIN_LIMIT_WINDOW_SECONDS, LOGIN_LIMIT_PER_USERNAME, LOGIN_LIMIT_PER_IP,
+                             LOGIN_LIMIT_SKETCH_WIDTH, LOGIN_LIMIT_SKETCH_DEPTH)
+
+
+async def login_rate_limit(request: Request):
+    """Route dependency rejecting throttled /login attempts with 429 and counting failed ones.
+
+    It runs before admission control, reading the username from the already received JSON
+    body; malformed bodies are left to request validation. The client IP is the connection's
+    peer address (run uvicorn with --proxy-headers behind a trusted proxy).
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    username = body.get("username") if isinstance(body, dict) else None
+    if not LOGIN_LIMIT_ENABLED or not isinstance(username, str):
+        yield
+        return
+
+    ip = request.client.host if request.client else None
+    retry_after = login_limiter.check(username, ip)
+    if retry_after:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many failed login attempts, please retry later",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+    try:
+        yield
+    except HTTPException as e:
+        if e.status_code == status.HTTP_401_UNAUTHORIZED:
+            login_limiter.record_failure(username, ip)
+        raise
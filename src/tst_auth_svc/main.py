@@ -1,8 +1,20 @@
+import argparse
 import logging
 
-import uvicorn
-from tst_auth_svc.app import app
-from tst_auth_svc.config import SERVICE_HOST, SERVICE_PORT
+from tst_auth_svc.config import (
+    SERVER_BACKLOG,
+    SERVER_BOOT_TIMEOUT,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_HEALTH_TIMEOUT,
+    SERVER_HTTP,
+    SERVER_KEEP_ALIVE,
+    SERVER_LOOP,
+    SERVER_REUSE_PORT,
+    SERVER_WORKERS,
+    SERVICE_HOST,
+    SERVICE_PORT,
+)
+from tst_auth_svc.server import serve
 
 
 # Set up logging for the application
@@ -11,11 +23,27 @@ logger = logging.getLogger(__name__)
 
 
 def main():
-    service_host = SERVICE_HOST
-    service_port = int(SERVICE_PORT)
-    uvicorn.run(app, host=service_host, port=service_port)
+    parser = argparse.ArgumentParser(description="Run the authentication service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=int(SERVICE_PORT))
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                        help="worker processes (0: one per CPU core)")
+    parser.add_argument("--loop", choices=["auto", "uvloop", "asyncio"], default=SERVER_LOOP)
+    parser.add_argument("--http", choices=["auto", "httptools", "h11"], default=SERVER_HTTP)
+    parser.add_argument("--reuse-port", action=argparse.BooleanOptionalAction, default=SERVER_REUSE_PORT,
+                        help="give each worker its own SO_REUSEPORT socket")
+    parser.add_argument("--backlog", type=int, default=SERVER_BACKLOG)
+    parser.add_argument("--keep-alive", type=int, default=SERVER_KEEP_ALIVE,
+                        help="idle keep-alive timeout in seconds")
+    parser.add_argument("--graceful-timeout", type=float, default=SERVER_GRACEFUL_TIMEOUT,
+                        help="seconds a stopping worker may spend on in-flight requests (0: no limit)")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, workers=args.workers, loop=args.loop, http=args.http, reuse_port=args.reuse_port,
+          backlog=args.backlog, keep_alive=args.keep_alive, graceful_timeout=args.graceful_timeout,
+          health_timeout=SERVER_HEALTH_TIMEOUT, boot_timeout=SERVER_BOOT_TIMEOUT)
 
 
 if __name__ == "__main__":
     # Entry point for the application
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,307 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from starlette.routing import Match
+
+from tst_auth_svc.config import METRICS_ENABLED
+
+"""
+This module collects service metrics and renders them in the Prometheus text format.
+
+Recording has to stay cheap on the request path, so every metric keeps one shard of values
+per thread: a thread only ever writes to its own shard, which needs no lock (a lock is
+only taken the first time a thread records into a metric). A scrape merges the shards, and
+folds those of threads that have exited into one, so threadpool churn does not pile them up.
+Label values are passed positionally in the order of the metric's label names.
+"""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latency buckets in seconds; bcrypt at the default cost lands in the upper half
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class holding per-thread shards of {label values: value}."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) pairs
+        self._retired = {}  # merged values of threads that have exited
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _collect(self) -> list:
+        """Returns the shards to merge, first folding those of exited threads into _retired."""
+        with self._lock:
+            if not all(thread.is_alive() for thread, _ in self._shards):
+                live = []
+                for thread, shard in self._shards:
+                    if thread.is_alive():
+                        live.append((thread, shard))
+                        continue
+                    # A thread that has exited no longer writes to its shard
+                    for labels, value in shard.items():
+                        self._retired[labels] = self._combine(self._retired.get(labels), value)
+                self._shards = live
+            return [self._retired] + [shard for _, shard in self._shards]
+
+    def _combine(self, total, value):
+        raise NotImplementedError
+
+    def _merged(self) -> dict:
+        merged = {}
+        for shard in self._collect():
+            for labels, value in dict(shard).items():
+                merged[labels] = self._combine(merged.get(labels), value)
+        return merged
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._merged().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local = threading.local()
+            self._shards = []
+            self._retired = {}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _combine(self, total, value):
+        return value if total is None else total + value
+
+    def value(self, *labels) -> float:
+        return self._merged().get(labels, 0)
+
+
+class Gauge(Counter):
+    """Up/down gauge; per-thread deltas sum to the current value."""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose values are read from a callback at scrape time.
+
+    The callback returns either a number (no labels) or a {label values tuple: number} dict.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _merged(self) -> dict:
+        value = self.callback()
+        return value if isinstance(value, dict) else {(): value}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket (non-cumulative) counts with a trailing +Inf slot, then sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _combine(self, total, series):
+        return list(series) if total is None else [a + b for a, b in zip(total, series)]
+
+    def count(self, *labels) -> int:
+        series = self._merged().get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, series in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return "\n".join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            for metric in self._metrics:
+                metric.clear()
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and status code.",
+    ("method", "route", "status")))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method", "route")))
+BCRYPT_DURATION = REGISTRY.register(Histogram(
+    "bcrypt_duration_seconds", "bcrypt run time on the hashing executor, excluding queueing, by cost factor.",
+    ("operation", "cost")))
+BCRYPT_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "bcrypt_queue_wait_seconds", "Time bcrypt operations waited for a hashing worker.", ("operation",)))
+BCRYPT_ERRORS = REGISTRY.register(Counter(
+    "bcrypt_errors_total", "bcrypt operations that raised.", ("operation",)))
+BCRYPT_REHASHES = REGISTRY.register(Counter(
+    "bcrypt_rehash_total", "Background re-hashes on login, by outcome (upgrade, downgrade, stale, failed).",
+    ("result",)))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Database statement execution time by statement type.", ("statement",)))
+DB_QUERY_ERRORS = REGISTRY.register(Counter(
+    "db_query_errors_total", "Database statements that raised.", ("statement",)))
+SESSIONS_CREATED = REGISTRY.register(Counter(
+    "sessions_created_total", "Session tokens issued, by token format.", ("format",)))
+SESSIONS_REVOKED = REGISTRY.register(Counter(
+    "sessions_revoked_total", "Session tokens revoked through logout or bulk revocation, by token format.", ("format",)))
+LOGIN_ATTEMPTS_LIMITED = REGISTRY.register(Counter(
+    "login_attempts_limited_total", "Login attempts rejected by the brute-force limiter, by key kind.", ("key",)))
+
+
+def _statement_type(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """Records count and duration of every statement run on a (sync) Engine."""
+    from sqlalchemy import event
+
+    if not METRICS_ENABLED or engine.__dict__.get("_metrics_instrumented"):
+        return
+    engine._metrics_instrumented = True
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_query_start"].pop()
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, _statement_type(statement))
+
+    def handle_error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        DB_QUERY_ERRORS.inc(_statement_type(context.statement or ""))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency per route and status plus in-flight requests.
+
+    The route label is the route's path template (so /users/{id} is one series); requests
+    that match no route are labelled "unmatched" to keep the label set bounded. The
+    in-flight gauge is recorded before routing, so it resolves the template the way the
+    router will, through each route's matches().
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _known_route(self, scope) -> str:
+        partial = None
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                return getattr(route, "path", None) or "unmatched"
+            if match is Match.PARTIAL and partial is None:
+                # Right path, wrong method: the router answers 405 from this route
+                partial = route
+        return getattr(partial, "path", None) or "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight_route = self._known_route(scope)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method, in_flight_route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method, in_flight_route)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or in_flight_route
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method, route_path, str(status_code))
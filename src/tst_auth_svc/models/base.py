@@ -1,19 +1,175 @@
+from fastapi import Depends
 from sqlalchemy import Column, PrimaryKeyConstraint, String, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import scoped_session, sessionmaker, Session
-from typing import Generator
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncGenerator, Generator, Optional, Union
 import logging
+import threading
+import time
 
-from tst_auth_svc.config import DATABASE_URL
+from tst_auth_svc.config import (
+    DATABASE_REPLICA_URLS,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+)
 
 Base = declarative_base()
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection."""
+
+    _stats_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Checkout-timing pool for async drivers (asyncpg, aiosqlite)."""
+
+
+def is_async_url(url: str) -> bool:
+    """True when the URL names an asyncio driver, e.g. sqlite+aiosqlite or postgresql+asyncpg."""
+    return make_url(url).get_dialect().is_async
+
+
+def _engine_options(url: str) -> dict:
+    """Builds pool settings from config; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async_url(url) else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# The driver in DATABASE_URL selects the mode: an asyncio driver gives routers a native
+# AsyncSession, anything else a blocking Session that get_async_session runs in the threadpool.
+ASYNC_DATABASE = is_async_url(DATABASE_URL)
+
+# Single session factories shared by every request; sessions are cheap, the factories are not.
+# They are bound to the engine when init_engines creates it.
+SessionLocal = sessionmaker()
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False) if ASYNC_DATABASE else None
+
+_engines = None
+_engines_lock = threading.Lock()
+
+
+def _create_replica_engine(url: str):
+    if is_async_url(url) != ASYNC_DATABASE:
+        raise RuntimeError("DATABASE_REPLICA_URLS must use an async driver exactly when DATABASE_URL does")
+    if ASYNC_DATABASE:
+        return create_async_engine(url, **_engine_options(url))
+    return create_engine(url, **_engine_options(url))
+
+
+def init_engines() -> tuple:
+    """Creates the primary and replica engines on first call and binds the session factories.
+
+    Engines are not created at import, so importing the app stays cheap; the lifespan
+    startup calls this, and so does anything that needs a session before it.
+
+    Returns:
+        tuple: The primary Engine, the primary AsyncEngine (None with a sync driver) and the
+        list of replica engines (Engine or AsyncEngine, matching the primary).
+    """
+    global _engines
+    engines = _engines
+    if engines is not None:
+        return engines
+    with _engines_lock:
+        if _engines is None:
+            if ASYNC_DATABASE:
+                async_engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+                engine = async_engine.sync_engine
+                AsyncSessionLocal.configure(bind=async_engine)
+            else:
+                async_engine = None
+                engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+            SessionLocal.configure(bind=engine)
+            # Read replicas; routing lives in tst_auth_svc.replicas
+            replicas = [_create_replica_engine(url.strip()) for url in DATABASE_REPLICA_URLS.split(",")
+                        if url.strip()]
+            _engines = (engine, async_engine, replicas)
+        return _engines
+
+
+def get_engine() -> Engine:
+    """The primary database Engine (the AsyncEngine's sync_engine with an asyncio driver)."""
+    return init_engines()[0]
+
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    return init_engines()[1]
+
+
+def get_replica_engines() -> list:
+    return init_engines()[2]
+
+
+def pool_stats(bind=None) -> dict:
+    """Returns connection pool occupancy and checkout wait statistics (global engine by default)."""
+    pool = (bind or get_engine()).pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "checkout_timeouts": pool.timeouts,
+                "avg_wait_ms": (pool.total_wait / pool.checkouts * 1000) if pool.checkouts else 0.0,
+                "max_wait_ms": pool.max_wait * 1000,
+            })
+    return stats
 
 
 def get_db() -> Generator[Session, None, None]:
-    session = scoped_session(sessionmaker(bind=engine))
+    init_engines()
+    session = SessionLocal()
     try:
         yield session
     finally:
@@ -23,20 +179,20 @@ def get_db() -> Generator[Session, None, None]:
 def get_secure_db() -> Generator[Session, None, None]:
     """Creates a secure database session with enhanced error management.
 
-    This function attempts to create a new session using SQLAlchemy's sessionmaker bound
-    to the global engine. In case of any exception during session creation, the error
+    This function creates a new session from the shared SessionLocal factory bound to the
+    global, pooled engine. In case of any exception during session creation, the error
     is logged with detailed traceback and then re-raised to signal failure.
 
-    It uses a scoped session factory for thread safety. This generator function yields a
-    proper SQLAlchemy Session instance, ensuring that FastAPI's dependency injection can
-    manage the connection lifecycle. Any errors encountered during session creation are
-    logged and propagated, ensuring robust error handling.
+    This generator function yields a proper SQLAlchemy Session instance, ensuring that
+    FastAPI's dependency injection can manage the connection lifecycle and return the
+    connection to the pool. Any errors encountered during session creation are logged and
+    propagated, ensuring robust error handling.
     """
     session_instance = None
     try:
-        # Create a scoped session factory and obtain a Session instance
-        session_factory = scoped_session(sessionmaker(bind=engine))
-        session_instance = session_factory()
+        # Obtain a Session instance from the shared factory
+        init_engines()
+        session_instance = SessionLocal()
         yield session_instance
     except Exception as e:
         logging.error(e, exc_info=True)
@@ -44,3 +200,104 @@ def get_secure_db() -> Generator[Session, None, None]:
     finally:
         if session_instance:
             session_instance.close()
+
+
+async def get_async_secure_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async counterpart of get_secure_db, used as the get_db override when ASYNC_DATABASE is set.
+
+    Yields a native AsyncSession from the shared AsyncSessionLocal factory; errors while
+    creating the session are logged with traceback and re-raised.
+    """
+    session_instance = None
+    try:
+        init_engines()
+        session_instance = AsyncSessionLocal()
+        yield session_instance
+    except Exception as e:
+        logging.error(e, exc_info=True)
+        raise
+    finally:
+        if session_instance:
+            await session_instance.close()
+
+
+class SyncSessionAdapter:
+    """Exposes a blocking Session through the awaitable subset of the AsyncSession API.
+
+    Each call that may touch the database runs in the threadpool, so routers can be written
+    once against AsyncSession and still work with sync drivers (and with test overrides of
+    get_db that yield a plain Session).
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    def _execute(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+        # Buffer rows inside the worker thread so consuming the result never touches the driver
+        # on the event loop; DML results without rows keep their rowcount
+        return result.freeze()() if getattr(result, "returns_rows", True) else result
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self._execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return (await self.execute(statement, params, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def flush(self, objects=None) -> None:
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+AsyncDbSession = Union[AsyncSession, SyncSessionAdapter]
+
+
+def open_session() -> AsyncDbSession:
+    """Opens a session on the application database for work outside of a request.
+
+    The caller owns it and must close it.
+    """
+    init_engines()
+    if ASYNC_DATABASE:
+        return AsyncSessionLocal()
+    return SyncSessionAdapter(SessionLocal())
+
+
+async def get_async_session(db=Depends(get_db)) -> AsyncDbSession:
+    """Router-facing dependency: the request's get_db session behind the AsyncSession API.
+
+    A native AsyncSession is passed through unchanged; a blocking Session is wrapped in a
+    SyncSessionAdapter. Its lifecycle stays with get_db (or whatever overrides it).
+    """
+    if isinstance(db, AsyncSession):
+        return db
+    return SyncSessionAdapter(db)
@@ -1,14 +1,145 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
-from datetime import datetime
+import hashlib
 
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, LargeBinary, SmallInteger, String, TypeDecorator, and_, false, or_,
+)
+from datetime import datetime, timedelta
+
+from tst_auth_svc.config import RESET_TOKEN_TTL, SESSION_TOKEN_LEGACY_COLUMN, SESSION_TOKEN_TTL
 from tst_auth_svc.models.base import Base
 
+# Password reset tokens share the sessions table and are told apart by this prefix
+RESET_TOKEN_PREFIX = "reset:"
+# Rows persisting the revocation of a stateless signed token (see tst_auth_svc.signed_tokens)
+REVOKED_TOKEN_PREFIX = "revoked:"
+
+# sessions.token_type discriminator values
+TOKEN_TYPE_SESSION = 0
+TOKEN_TYPE_RESET = 1
+TOKEN_TYPE_REVOKED = 2
+# Revokes every signed token of user_id issued up to created_at (see tst_auth_svc.signed_tokens)
+TOKEN_TYPE_REVOKED_USER = 3
+# Bytes stored per token; 128 bits keep the unique index collision-free at any realistic size
+TOKEN_DIGEST_SIZE = 16
+
+
+def token_digest(token: str) -> bytes:
+    """Fixed-width digest under which a token is stored and looked up."""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=TOKEN_DIGEST_SIZE).digest()
+
+
+def token_type(token: str) -> int:
+    if token.startswith(RESET_TOKEN_PREFIX):
+        return TOKEN_TYPE_RESET
+    if token.startswith(REVOKED_TOKEN_PREFIX):
+        return TOKEN_TYPE_REVOKED
+    return TOKEN_TYPE_SESSION
+
+
+class TokenDigest(TypeDecorator):
+    """Binary column that stores token strings as their digest.
+
+    Bound string values (inserts and equality lookups alike) are digested on the way in, so
+    `SessionToken.session_token == token` keeps working; bytes are taken to be a digest
+    already. Values read back are the digests, never the tokens.
+    """
+
+    impl = LargeBinary(TOKEN_DIGEST_SIZE)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return token_digest(value)
+        return value
+
+
+def token_expiry(session_token: str, now: datetime = None) -> datetime:
+    """Returns when a sessions row expires, based on the kind of token it stores.
+
+    Reset tokens live for RESET_TOKEN_TTL and sessions for SESSION_TOKEN_TTL; a revocation
+    record only matters until the signed token it revokes would have expired anyway.
+    """
+    now = now or datetime.utcnow()
+    if session_token.startswith(RESET_TOKEN_PREFIX):
+        return now + timedelta(seconds=RESET_TOKEN_TTL)
+    if session_token.startswith(REVOKED_TOKEN_PREFIX):
+        try:
+            return datetime.utcfromtimestamp(int(session_token.rsplit(":", 1)[1]))
+        except (IndexError, ValueError):
+            pass
+    return now + timedelta(seconds=SESSION_TOKEN_TTL)
+
+
+def _token_parameter(context) -> str:
+    # Column defaults see the parameters before bind processing, i.e. the token itself
+    return context.get_current_parameters()["token_digest"]
+
+
+def _default_expiry(context) -> datetime:
+    return token_expiry(_token_parameter(context))
+
+
+def _default_token_type(context) -> int:
+    return token_type(_token_parameter(context))
+
+
+def _legacy_type_is(column, kind: int):
+    # token_type() as SQL, for rows that only have the plaintext session_token column
+    reset, revoked = column.startswith(RESET_TOKEN_PREFIX), column.startswith(REVOKED_TOKEN_PREFIX)
+    if kind == TOKEN_TYPE_RESET:
+        return reset
+    if kind == TOKEN_TYPE_REVOKED:
+        return revoked
+    if kind == TOKEN_TYPE_SESSION:
+        return and_(~reset, ~revoked)
+    return false()
+
 
 class SessionToken(Base):
     """Model for storing user session tokens."""
     __tablename__ = 'sessions'
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    session_token = Column(String(255), nullable=False, unique=True)
+    id = Column(Integer, primary_key=True)
+    # Indexed for per-user session lookups and revocation
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    # Stored as a fixed-width digest in the token_digest column (see TokenDigest), under a unique index
+    session_token = Column("token_digest", TokenDigest(), nullable=False, unique=True, index=True)
+    token_type = Column(SmallInteger, nullable=False, default=_default_token_type)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Indexed so the sweeper can range-delete expired rows; NULL never expires (migration 0002
+    # backfills the rows that predate the column)
+    expires_at = Column(DateTime, default=_default_expiry, index=True)
+    if SESSION_TOKEN_LEGACY_COLUMN:
+        # Dual write during the token digest rollout, so instances still on the previous
+        # release (which only read session_token) see sessions created by this one
+        legacy_session_token = Column("session_token", String(255), default=_token_parameter)
+
+    @classmethod
+    def token_is(cls, token: str):
+        """SQL criterion matching the row of a token.
+
+        With SESSION_TOKEN_LEGACY_COLUMN it also matches a row written by the previous release
+        whose digest has not been backfilled yet.
+        """
+        return cls._or_legacy(cls.session_token == token, lambda legacy: legacy == token)
+
+    @classmethod
+    def token_in(cls, tokens: list):
+        """SQL criterion matching the rows of the given tokens (see token_is)."""
+        return cls._or_legacy(cls.session_token.in_(tokens), lambda legacy: legacy.in_(tokens))
+
+    @classmethod
+    def type_is(cls, kind: int):
+        """SQL criterion matching rows of one token type (see token_is for legacy rows)."""
+        return cls._or_legacy(cls.token_type == kind, lambda legacy: _legacy_type_is(legacy, kind))
+
+    @classmethod
+    def _or_legacy(cls, criterion, legacy_criterion):
+        if not SESSION_TOKEN_LEGACY_COLUMN:
+            return criterion
+        return or_(criterion, and_(cls.session_token.is_(None), legacy_criterion(cls.legacy_session_token)))
+
+    @classmethod
+    def not_expired(cls, now: datetime = None):
+        """SQL criterion matching rows that have not expired yet."""
+        return or_(cls.expires_at.is_(None), cls.expires_at > (now or datetime.utcnow()))
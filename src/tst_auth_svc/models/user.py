@@ -9,7 +9,8 @@ class User(Base):
         UniqueConstraint('email', name='uq_users_email'),
     )
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String(50), nullable=False, unique=True, index=True)
-    email = Column(String(255), nullable=False, unique=True, index=True)
+    # The unique constraints above already index username and email, and the primary key indexes id
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50), nullable=False)
+    email = Column(String(255), nullable=False)
     password = Column(String(255), nullable=False)  # stores bcrypt hashed password
@@ -0,0 +1,127 @@
+import logging
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import Connection, Executable, Select
+
+"""
+This module holds helpers for Alembic revisions that must run against a populated
+production database while the service keeps serving.
+
+ChunkedBackfill rewrites rows in primary-key order, a bounded chunk at a time, each chunk
+in its own transaction and throttled to a rows-per-second budget, so no statement locks
+many rows for long and replicas and the WAL are not flooded. It selects only rows that
+still need migrating, so a run that is interrupted (or killed on purpose because it
+competes with peak traffic) simply continues where it stopped when started again.
+
+create_index_online and drop_index_online build and drop indexes without blocking writes:
+on PostgreSQL they use CREATE/DROP INDEX CONCURRENTLY, which cannot run in a transaction,
+so they step out of the revision's transaction for the duration. They are idempotent, so
+a revision can be re-run after a failure part way through; a concurrent build that failed
+leaves an INVALID index behind, though, which has to be dropped before re-running.
+
+set_not_null_online adds a NOT NULL constraint without the full-table scan under an
+ACCESS EXCLUSIVE lock that ALTER COLUMN ... SET NOT NULL does on its own: on PostgreSQL it
+first validates an equivalent CHECK constraint, which only blocks schema changes.
+"""
+
+
+class ChunkedBackfill:
+    """Rewrites a large table in key-ordered, separately committed, rate-limited chunks.
+
+    Args:
+        name (str): Label for progress logging.
+        source (Select): Reads rows still to migrate. Its first selected column must be the
+            table's integer primary key, and its WHERE clause must stop matching a row once
+            the update has been applied to it; that is what makes runs resumable.
+        update (Executable): Statement executed once per chunk, with one parameter set per row.
+        transform (callable): Maps a source row to the update's parameter dict.
+        batch_size (int): Rows read and written per chunk (and per transaction).
+        max_rows_per_second (float): Rate cap across chunks; 0 means unthrottled.
+        sleep (callable, optional): Pause function, injectable for tests.
+    """
+
+    def __init__(self, name: str, source: Select, update: Executable, transform: Callable[..., dict],
+                 batch_size: int = 10000, max_rows_per_second: float = 0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.key = source.selected_columns[0]
+        self.source = source
+        self.update = update
+        self.transform = transform
+        self.batch_size = max(1, batch_size)
+        self.max_rows_per_second = max_rows_per_second
+        self.sleep = sleep
+
+    def chunks(self, connection: Connection, start_after: int = 0) -> Iterable[int]:
+        """Migrates chunk by chunk, yielding the number of rows in each."""
+        last_key = start_after
+        while True:
+            rows = connection.execute(
+                self.source.where(self.key > last_key).order_by(self.key).limit(self.batch_size)
+            ).all()
+            if not rows:
+                return
+            started = time.monotonic()
+            connection.execute(self.update, [self.transform(row) for row in rows])
+            if connection.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+                connection.commit()
+            last_key = rows[-1][0]
+            yield len(rows)
+            if self.max_rows_per_second > 0:
+                pause = len(rows) / self.max_rows_per_second - (time.monotonic() - started)
+                if pause > 0:
+                    self.sleep(pause)
+
+    def run(self, connection: Connection, start_after: int = 0) -> dict:
+        """Migrates every pending row and returns totals.
+
+        The connection must not be inside a transaction the caller wants to keep: each chunk
+        is committed. In an Alembic revision, run it inside op.get_context().autocommit_block().
+        """
+        started = time.monotonic()
+        rows = chunks = 0
+        for count in self.chunks(connection, start_after):
+            rows += count
+            chunks += 1
+            logging.info("Backfill %s: %d rows in %d chunks", self.name, rows, chunks)
+        return {"rows": rows, "chunks": chunks, "duration_seconds": time.monotonic() - started}
+
+
+def create_index_online(name: str, table: str, columns: list, unique: bool = False) -> None:
+    """Creates an index without blocking writes (CONCURRENTLY on PostgreSQL); no-op if it exists."""
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True, postgresql_concurrently=True)
+
+
+def drop_index_online(name: str, table: str) -> None:
+    """Drops an index without blocking writes (CONCURRENTLY on PostgreSQL); no-op if it is gone."""
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+
+def set_not_null_online(table: str, column: str, existing_type) -> None:
+    """Makes a column NOT NULL without blocking writes for a table scan (PostgreSQL 12 or later).
+
+    On PostgreSQL a NOT VALID CHECK constraint is added and validated first (validation
+    takes a SHARE UPDATE EXCLUSIVE lock, so reads and writes go on), and SET NOT NULL then
+    relies on it instead of scanning. Each step commits on its own so the brief exclusive
+    locks are not held together. Other dialects fall back to a plain (batch) ALTER.
+    """
+    from alembic import op
+
+    if op.get_bind().dialect.name != "postgresql":
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, existing_type=existing_type, nullable=False)
+        return
+    check = f"ck_{table}_{column}_not_null"
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID")
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {check}")
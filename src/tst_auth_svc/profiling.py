@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+
+from tst_auth_svc.config import (
+    PROFILE_LATENCY_BUDGET_MS,
+    PROFILE_SLOW_REQUESTS,
+    PROFILE_STATEMENT_BUDGET,
+    REQUEST_PROFILING,
+)
+
+"""
+This module implements the opt-in per-request profiler (REQUEST_PROFILING=true).
+
+ProfilingMiddleware puts a RequestProfile in a context variable for the duration of the
+request. SQLAlchemy cursor and session events, the hashing executor and the JSON response
+class add their time to it by phase:
+
+    db-query   statements executed on the connection (count in the desc)
+    db-commit  COMMIT itself, excluding the statements flushed by it
+    hash       bcrypt hashing/verification, including queueing for a worker
+    serialize  rendering the JSON response body
+
+The breakdown is returned in a Server-Timing header. Requests over PROFILE_STATEMENT_BUDGET
+statements or PROFILE_LATENCY_BUDGET_MS are logged as a warning and kept, with their
+slowest statements, in a ring buffer served at /internal/profile.
+"""
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+PHASES = ("db-query", "db-commit", "hash", "serialize")
+# Slowest statements kept per reported request, and how much of their SQL
+TOP_STATEMENTS = 5
+STATEMENT_PREVIEW = 200
+
+
+class RequestProfile:
+    """Time spent per phase and the statements executed while serving one request."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.statements = []
+        self.total = None
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def add_statement(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.phases["db-query"] += seconds
+            self.statements.append((seconds, statement))
+
+    def finish(self) -> None:
+        if self.total is None:
+            self.total = time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        entries = []
+        for phase, seconds in self.phases.items():
+            entry = f"{phase};dur={seconds * 1000:.3f}"
+            if phase == "db-query":
+                entry += f';desc="{len(self.statements)} statements"'
+            entries.append(entry)
+        entries.append(f"total;dur={(self.total or 0.0) * 1000:.3f}")
+        return ", ".join(entries)
+
+    def over_budget(self) -> list:
+        reasons = []
+        if PROFILE_STATEMENT_BUDGET and len(self.statements) > PROFILE_STATEMENT_BUDGET:
+            reasons.append(f"{len(self.statements)} statements > {PROFILE_STATEMENT_BUDGET}")
+        if PROFILE_LATENCY_BUDGET_MS and (self.total or 0.0) * 1000 > PROFILE_LATENCY_BUDGET_MS:
+            reasons.append(f"{self.total * 1000:.1f} ms > {PROFILE_LATENCY_BUDGET_MS} ms")
+        return reasons
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Adds time to a phase of the current request's profile, if the request is being profiled."""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add(phase, seconds)
+
+
+class SlowRequestLog:
+    """Ring buffer of the most recent requests that exceeded a profiling budget."""
+
+    def __init__(self, capacity: int):
+        self._entries = deque(maxlen=max(1, capacity))
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self) -> list:
+        """Returns the buffered requests, slowest first."""
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_requests = SlowRequestLog(PROFILE_SLOW_REQUESTS)
+
+
+def _report(profile: RequestProfile, route: str, status_code: int) -> None:
+    reasons = profile.over_budget()
+    if not reasons:
+        return
+    slowest = sorted(profile.statements, key=lambda item: item[0], reverse=True)[:TOP_STATEMENTS]
+    entry = {
+        "method": profile.method,
+        "route": route,
+        "status": status_code,
+        "total_ms": profile.total * 1000,
+        "phases_ms": {phase: seconds * 1000 for phase, seconds in profile.phases.items()},
+        "statement_count": len(profile.statements),
+        "slowest_statements": [{"ms": seconds * 1000, "sql": " ".join(sql.split())[:STATEMENT_PREVIEW]}
+                               for seconds, sql in slowest],
+        "over_budget": reasons,
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    slow_requests.add(entry)
+    logging.warning("Request over profiling budget: %s %s (%s)", profile.method, route, "; ".join(reasons))
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling each request and adding a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REQUEST_PROFILING:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                profile.finish()
+                MutableHeaders(scope=message).append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            profile.finish()
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            _report(profile, route, status_code)
+
+
+class ProfiledJSONResponse(JSONResponse):
+    """JSONResponse that books body rendering to the "serialize" phase."""
+
+    def render(self, content) -> bytes:
+        if _current_profile.get() is None:
+            return super().render(content)
+        started = time.perf_counter()
+        body = super().render(content)
+        record_phase("serialize", time.perf_counter() - started)
+        return body
+
+
+def install_profiler(engine) -> None:
+    """Hooks statement timing onto an Engine and commit timing onto every ORM Session."""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if engine.__dict__.get("_profiler_installed"):
+        return
+    engine._profiler_installed = True
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        starts = conn.info.get("profile_query_start")
+        if profile is not None and starts:
+            profile.add_statement(statement, time.perf_counter() - starts.pop())
+
+    def handle_error(context):
+        starts = context.connection.info.get("profile_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+    _install_session_hooks(Session)
+
+
+_session_hooks_installed = False
+
+
+def _install_session_hooks(session_class) -> None:
+    global _session_hooks_installed
+    from sqlalchemy import event
+
+    if _session_hooks_installed:
+        return
+    _session_hooks_installed = True
+
+    def before_commit(session):
+        profile = _current_profile.get()
+        if profile is not None:
+            session.info["profile_commit"] = (time.perf_counter(), profile.phases["db-query"])
+
+    def after_commit(session):
+        profile = _current_profile.get()
+        mark = session.info.pop("profile_commit", None)
+        if profile is not None and mark is not None:
+            started, query_time = mark
+            # Statements flushed by the commit are already booked as db-query
+            flushed = profile.phases["db-query"] - query_time
+            profile.add("db-commit", max(0.0, time.perf_counter() - started - flushed))
+
+    event.listen(session_class, "before_commit", before_commit)
+    event.listen(session_class, "after_commit", after_commit)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import sys
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import func, select, update
+
+from tst_auth_svc.config import BCRYPT_COST_CENSUS_INTERVAL
+from tst_auth_svc.hashing import get_hasher, hash_cost, hash_password
+from tst_auth_svc.metrics import BCRYPT_REHASHES
+from tst_auth_svc.models.base import AsyncDbSession, open_session
+from tst_auth_svc.models.user import User
+from tst_auth_svc.replicas import ReplicaSet, replica_set
+
+"""
+This module keeps stored password hashes at the current bcrypt cost.
+
+When login verifies a password whose stored hash is cheaper than new hashes, or costlier
+beyond BCRYPT_REHASH_TOLERANCE (see HashingExecutor.needs_rehash), the router schedules
+PasswordRehasher.rehash as a background task: the password is hashed again at the current
+cost and swapped in only if the stored hash is still the one that was verified, so a
+concurrent password change always wins. StoredCostCensus counts users per stored cost for
+the bcrypt_stored_cost_users gauge, in a background task off the request path.
+"""
+
+
+class PasswordRehasher:
+    """Re-hashes verified passwords at the current cost, one job per user at a time.
+
+    Args:
+        session_factory (callable, optional): Returns the AsyncDbSession the update runs on.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncDbSession] = open_session):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._in_progress = set()
+
+    async def rehash(self, user_id: int, password: str, verified_hash: str) -> None:
+        with self._lock:
+            if user_id in self._in_progress:
+                return
+            self._in_progress.add(user_id)
+        try:
+            target = get_hasher().rounds
+            direction = "upgrade" if (hash_cost(verified_hash) or 0) < target else "downgrade"
+            new_hash = await hash_password(password)
+            db = self.session_factory()
+            try:
+                result = await db.execute(
+                    update(User)
+                    .where(User.id == user_id, User.password == verified_hash)
+                    .values(password=new_hash)
+                )
+                await db.commit()
+            finally:
+                await db.close()
+            BCRYPT_REHASHES.inc(direction if result.rowcount else "stale")
+        except Exception as e:
+            BCRYPT_REHASHES.inc("failed")
+            logging.error(e, exc_info=True)
+        finally:
+            with self._lock:
+                self._in_progress.discard(user_id)
+
+
+class StoredCostCensus:
+    """Background count of users per stored bcrypt cost, for the bcrypt_stored_cost_users gauge.
+
+    The count is a full scan of users, so it never runs inside a scrape: a background task
+    refreshes it every interval, on a read replica when one is configured, and only in the
+    first worker of the prefork server (tst_auth_svc.server), whose /metrics is the one
+    that reports the gauge.
+
+    Args:
+        interval (float): Seconds between counts; 0 disables the background task.
+        initial_delay (float, optional): Seconds before the first count, keeping it out of
+            startup and warm-up.
+        session_factory (callable, optional): Returns the AsyncDbSession used when no
+            replica is available.
+        replicas (ReplicaSet, optional): Replicas the count is read from.
+    """
+
+    def __init__(self, interval: float, initial_delay: float = 60.0,
+                 session_factory: Callable[[], AsyncDbSession] = open_session,
+                 replicas: ReplicaSet = replica_set):
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self.session_factory = session_factory
+        self.replicas = replicas
+        self.counts = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh_once(self) -> None:
+        # "$2b$12$..." -> "12"
+        cost = func.substr(User.password, 5, 2)
+        db = self.session_factory()
+        try:
+            rows = await self.replicas.all(db, select(cost, func.count()).group_by(cost))
+        finally:
+            await db.close()
+        self.counts = {(str(int(value)) if value and value.isdigit() else "unknown",): count
+                       for value, count in rows}
+
+    async def _run(self) -> None:
+        delay = self.initial_delay
+        while True:
+            await asyncio.sleep(delay)
+            delay = self.interval
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                # The gauge keeps the last known counts
+                logging.error(e, exc_info=True)
+
+    def start(self) -> None:
+        """Starts the background task on the running event loop (no-op if disabled or running).
+
+        Only the first worker counts; the others report no stored_cost series.
+        """
+        if self.interval > 0 and self._task is None and _first_worker():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def _first_worker() -> bool:
+    # The prefork server module is only loaded in its worker processes (it pulls in uvicorn)
+    server = sys.modules.get("tst_auth_svc.server")
+    return getattr(server, "_worker_index", None) in (None, 0)
+
+
+password_rehasher = PasswordRehasher()
+stored_costs = StoredCostCensus(BCRYPT_COST_CENSUS_INTERVAL)
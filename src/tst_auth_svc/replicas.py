@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional, Union
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+from tst_auth_svc.config import REPLICA_EJECT_SECONDS
+from tst_auth_svc.models.base import AsyncDbSession, get_replica_engines
+
+"""
+This module routes selected read-only queries to the read replicas in DATABASE_REPLICA_URLS.
+
+Only reads sent through ReplicaSet.first or ReplicaSet.all go to a replica; everything
+else, writes included, keeps using the request's session on the primary. Replicas are
+used round-robin. One that fails a query is ejected for REPLICA_EJECT_SECONDS and the
+query is answered by the primary instead, so a dead replica costs one failed attempt per
+ejection period rather than an error per request.
+
+Replicas lag behind the primary, so a replica miss is not trusted: when a replica returns
+no row, the primary is asked too. That keeps read-your-writes flows such as register
+followed by login, or a Google sign-in right after sign-up, working. The same goes for a
+stale value a caller rejects: a login whose password does not match the replica's hash is
+re-checked against the primary's.
+"""
+
+
+class _Replica:
+    __slots__ = ("name", "engine", "ejected_until", "reads", "errors", "ejections")
+
+    def __init__(self, engine):
+        self.engine = engine
+        sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        self.name = sync_engine.url.render_as_string(hide_password=True)
+        self.ejected_until = 0.0
+        self.reads = 0
+        self.errors = 0
+        self.ejections = 0
+
+
+def _first_row(engine, statement):
+    with engine.connect() as connection:
+        return connection.execute(statement).first()
+
+
+def _all_rows(engine, statement):
+    with engine.connect() as connection:
+        return connection.execute(statement).all()
+
+
+class ReplicaSet:
+    """Round-robin read routing over replica engines with failure-based ejection.
+
+    Args:
+        engines (list or callable): Engines (or AsyncEngines) connected to the replicas, or a
+            function returning them, called on first use so the engines can be created late.
+        eject_seconds (float): How long a replica that failed a query is skipped.
+        clock (callable, optional): Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, engines: Union[list, Callable[[], list]], eject_seconds: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self._engines = engines
+        self._resolved: Optional[list] = None
+        self.eject_seconds = eject_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+        self._misses = 0
+        self._unavailable = 0
+
+    @property
+    def _replicas(self) -> list:
+        replicas = self._resolved
+        if replicas is None:
+            engines = self._engines() if callable(self._engines) else self._engines
+            replicas = self._resolved = [_Replica(engine) for engine in engines]
+        return replicas
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._replicas)
+
+    def engines(self) -> list:
+        return [replica.engine for replica in self._replicas]
+
+    def pick(self) -> Optional[_Replica]:
+        """Returns the next replica in rotation that is not ejected, or None."""
+        now = self._clock()
+        with self._lock:
+            for _ in range(len(self._replicas)):
+                replica = self._replicas[self._next % len(self._replicas)]
+                self._next += 1
+                if replica.ejected_until <= now:
+                    return replica
+            if self._replicas:
+                self._unavailable += 1
+        return None
+
+    def eject(self, replica: _Replica, error: Exception) -> None:
+        with self._lock:
+            replica.errors += 1
+            replica.ejections += 1
+            replica.ejected_until = self._clock() + self.eject_seconds
+        logging.warning("Ejecting read replica %s for %.0f s after error: %s", replica.name, self.eject_seconds, error)
+
+    async def first(self, db: AsyncDbSession, statement):
+        """Returns the first row of a read-only statement, read from a replica when possible.
+
+        Falls back to the request's session (the primary) when no replica is available,
+        when the replica fails, and when the replica has no matching row.
+        """
+        replica = self.pick()
+        if replica is not None:
+            try:
+                if isinstance(replica.engine, AsyncEngine):
+                    async with replica.engine.connect() as connection:
+                        row = (await connection.execute(statement)).first()
+                else:
+                    row = await run_in_threadpool(_first_row, replica.engine, statement)
+            except SQLAlchemyError as e:
+                self.eject(replica, e)
+            else:
+                with self._lock:
+                    replica.reads += 1
+                    if row is None:
+                        self._misses += 1
+                if row is not None:
+                    return row
+        return (await db.execute(statement)).first()
+
+    async def all(self, db: AsyncDbSession, statement) -> list:
+        """Returns all rows of a read-only statement, read from a replica when possible.
+
+        For reads that tolerate lag, such as aggregates for metrics: an empty result is
+        returned as is, and only an unavailable or failing replica sends the read to the
+        primary through db.
+        """
+        replica = self.pick()
+        if replica is not None:
+            try:
+                if isinstance(replica.engine, AsyncEngine):
+                    async with replica.engine.connect() as connection:
+                        rows = (await connection.execute(statement)).all()
+                else:
+                    rows = await run_in_threadpool(_all_rows, replica.engine, statement)
+            except SQLAlchemyError as e:
+                self.eject(replica, e)
+            else:
+                with self._lock:
+                    replica.reads += 1
+                return rows
+        return (await db.execute(statement)).all()
+
+    def stats(self) -> dict:
+        now = self._clock()
+        with self._lock:
+            return {
+                "replicas": [{
+                    "name": replica.name,
+                    "healthy": replica.ejected_until <= now,
+                    "reads": replica.reads,
+                    "errors": replica.errors,
+                    "ejections": replica.ejections,
+                } for replica in self._replicas],
+                "misses_read_from_primary": self._misses,
+                "no_healthy_replica": self._unavailable,
+            }
+
+    async def close(self) -> None:
+        """Closes the replicas' pooled connections; they are reopened lazily if used again."""
+        for replica in self._resolved or []:
+            if isinstance(replica.engine, AsyncEngine):
+                await replica.engine.dispose()
+            else:
+                replica.engine.dispose()
+
+
+replica_set = ReplicaSet(get_replica_engines, REPLICA_EJECT_SECONDS)
@@ -1,39 +1,35 @@
-import os
-import uuid
 import logging
 
 from fastapi import APIRouter, Request, HTTPException, status, Depends
 from fastapi.responses import RedirectResponse
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
-from tst_auth_svc.models.session import SessionToken
-from tst_auth_svc.models.base import get_db
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
 from tst_auth_svc.models.user import User
+from tst_auth_svc.replicas import replica_set
+from tst_auth_svc.sessions import create_session
+from tst_auth_svc.settings import Settings, get_settings
 
 # Import functions from the google_oauth_client module
-from tst_auth_svc.google_oauth_client import generate_auth_url, exchange_code_for_tokens
+from tst_auth_svc.google_oauth_client import GoogleOAuthError, generate_auth_url, exchange_code_for_tokens
 
 router = APIRouter()
 
 
 @router.get('/google-login')
-async def google_login() -> RedirectResponse:
+async def google_login(settings: Settings = Depends(get_settings)) -> RedirectResponse:
     """
-    Initiates Google OAuth2 login by generating an authentication URL using client configuration
-    from environment variables and redirects the user.
+    Initiates Google OAuth2 login by generating an authentication URL using the client
+    configuration from the settings snapshot and redirects the user.
     """
     try:
-        client_id = os.getenv('GOOGLE_CLIENT_ID')
-        client_secret = os.getenv('GOOGLE_CLIENT_SECRET')
-        redirect_uri = os.getenv('GOOGLE_REDIRECT_URI')
-
-        if not all([client_id, client_secret, redirect_uri]):
+        if not settings.google_configured:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail='Google OAuth configuration is incomplete.')
 
-        # Generate the Google authentication URL using the external module
-        auth_url = generate_auth_url(client_id, redirect_uri)
+        # Generate the Google authentication URL using the external module (cached per client)
+        auth_url = generate_auth_url(settings.google_client_id, settings.google_redirect_uri)
         return RedirectResponse(url=auth_url)
     except Exception as e:
         logging.error(e, exc_info=True)
@@ -42,7 +38,8 @@ async def google_login() -> RedirectResponse:
 
 
 @router.get('/google-callback')
-async def google_callback(request: Request, db: Session = Depends(get_db)):
+async def google_callback(request: Request, db: AsyncDbSession = Depends(get_async_session),
+                          settings: Settings = Depends(get_settings)):
     """
     Handles the OAuth2 callback by exchanging the authorization code for tokens, validating
     the token response, and creating a user session upon successful authentication.
@@ -54,17 +51,21 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail='Authorization code is missing.')
 
-        client_id = os.getenv('GOOGLE_CLIENT_ID')
-        client_secret = os.getenv('GOOGLE_CLIENT_SECRET')
-        redirect_uri = os.getenv('GOOGLE_REDIRECT_URI')
-
-        if not all([client_id, client_secret, redirect_uri]):
+        if not settings.google_configured:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail='Google OAuth configuration is incomplete.')
+        client_id = settings.google_client_id
+        client_secret = settings.google_client_secret.get_secret_value()
+        redirect_uri = settings.google_redirect_uri
 
         # Exchange the authorization code for tokens
         try:
-            token_response = exchange_code_for_tokens(code, client_id, client_secret, redirect_uri)
+            token_response = await exchange_code_for_tokens(code, client_id, client_secret, redirect_uri)
+        except GoogleOAuthError as e:
+            # The code was rejected or the ID token did not verify: the client's fault, not ours
+            logging.warning("Google OAuth token exchange rejected: %s", e)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail='Invalid token exchange response.')
         except Exception as e:
             logging.error(e, exc_info=True)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -73,25 +74,21 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
         # Validate token response
         access_token = token_response.get('access_token')
         id_token = token_response.get('id_token')
-        email = token_response.get('email')  # Assuming the token response includes user's email
+        email = token_response.get('email')  # Taken from the verified ID token, None unless Google verified it
 
         if not (access_token and id_token and email):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail='Invalid token exchange response.')
 
         # Retrieve the user from the database using the email from token response
-        user = db.query(User).filter(User.email == email).first()
+        user = await replica_set.first(db, select(User.id).where(User.email == email))
         if not user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail='User not found for the provided Google account.')
 
         # Generate a secure session token
-        session_token_str = str(uuid.uuid4())
-        new_session = SessionToken(user_id=user.id, session_token=session_token_str)
-
         try:
-            db.add(new_session)
-            db.commit()
+            session_token_str = await create_session(db, user.id)
         except Exception as e:
             logging.error(e, exc_info=True)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, status
+
+from tst_auth_svc.warmup import warmup
+
+router = APIRouter()
+
+
+@router.get("/ready")
+def ready() -> dict:
+    """Readiness probe: 200 once the startup warm-up is over, 503 while warming up or shutting down.
+
+    The body reports each warm-up step's duration and any failure.
+    """
+    if not warmup.ready:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=warmup.stats())
+    return warmup.stats()
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from tst_auth_svc.admission import admission_stats
+from tst_auth_svc.config import PROFILE_LATENCY_BUDGET_MS, PROFILE_STATEMENT_BUDGET, REQUEST_PROFILING
+from tst_auth_svc.group_commit import get_session_writer
+from tst_auth_svc.hashing import get_hasher
+from tst_auth_svc.internal_auth import require_internal_token
+from tst_auth_svc.login_limiter import login_limiter
+from tst_auth_svc.models.base import pool_stats
+from tst_auth_svc.profiling import slow_requests
+from tst_auth_svc.replicas import replica_set
+from tst_auth_svc.session_cache import session_cache
+from tst_auth_svc.session_store import get_session_store
+from tst_auth_svc.settings import reload_settings, settings_stats
+from tst_auth_svc.sweeper import session_sweeper
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/hashing")
+def hashing_stats() -> dict:
+    """Reports the hashing executor's queue depth and per-operation latency."""
+    return get_hasher().stats()
+
+
+@router.get("/admission")
+def admission_counters() -> dict:
+    """Reports per-route admission controller counters (admitted, queued and shed requests)."""
+    return admission_stats()
+
+
+@router.get("/login-limiter")
+def login_limiter_stats() -> dict:
+    """Reports brute-force limiter checks, rejections per key kind, rejection rate and sketch error bounds."""
+    return login_limiter.stats()
+
+
+@router.get("/pool")
+def connection_pool_stats() -> dict:
+    """Reports database pool occupancy: checked-out and overflow connections and checkout wait time."""
+    return pool_stats()
+
+
+@router.get("/replicas")
+def replica_stats() -> dict:
+    """Reports per-replica health, reads and ejections, and how many reads fell back to the primary."""
+    return replica_set.stats()
+
+
+@router.get("/session-cache")
+def session_cache_stats() -> dict:
+    """Reports session validation cache size and hit/miss/eviction counters."""
+    return session_cache.stats()
+
+
+@router.get("/session-store")
+def session_store_stats() -> dict:
+    """Reports which session store backend is in use and its size or connection counters."""
+    return get_session_store().stats()
+
+
+@router.get("/sweeper")
+def sweeper_stats() -> dict:
+    """Reports expired-session sweeper progress, including rows swept in the last cycle."""
+    return session_sweeper.stats()
+
+
+@router.get("/group-commit")
+def group_commit_stats() -> dict:
+    """Reports session group-commit batching (batches, rows per batch, write time), if enabled."""
+    writer = get_session_writer()
+    return {"enabled": True, **writer.stats()} if writer is not None else {"enabled": False}
+
+
+@router.get("/profile")
+def slow_request_profiles() -> dict:
+    """Lists recent requests that exceeded a profiling budget, slowest first, with per-phase timings."""
+    return {
+        "enabled": REQUEST_PROFILING,
+        "statement_budget": PROFILE_STATEMENT_BUDGET,
+        "latency_budget_ms": PROFILE_LATENCY_BUDGET_MS,
+        "requests": slow_requests.entries(),
+    }
+
+
+@router.get("/settings")
+def settings_generation() -> dict:
+    """Reports the settings snapshot generation and which settings are set, without their values."""
+    return settings_stats()
+
+
+@router.post("/settings/reload", dependencies=[Depends(require_internal_token)])
+def settings_reload() -> dict:
+    """Reloads the settings in this worker process, like SIGHUP (needs X-Internal-Token)."""
+    if not reload_settings():
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail="Settings reload failed, the current settings are kept.")
+    return settings_stats()
+
+
+@router.get("/worker")
+def worker_health() -> dict:
+    """Reports which worker process answered, its pid and uptime (per-worker health under the prefork server)."""
+    # Imported here: the server module pulls in uvicorn, which a worker has loaded already anyway
+    from tst_auth_svc.server import worker_info
+
+    return worker_info()
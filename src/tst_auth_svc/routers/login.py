@@ -1,13 +1,18 @@
-import uuid
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-import bcrypt
+from sqlalchemy import select
 
-from tst_auth_svc.models.base import get_db
+from tst_auth_svc.admission import admission_control
+from tst_auth_svc.config import BCRYPT_REHASH_ON_LOGIN
+from tst_auth_svc.hashing import get_hasher, verify_password
+from tst_auth_svc.login_limiter import login_rate_limit
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
 from tst_auth_svc.models.user import User
+from tst_auth_svc.rehash import password_rehasher
+from tst_auth_svc.replicas import replica_set
+from tst_auth_svc.sessions import create_session
 
 router = APIRouter()
 
@@ -22,41 +27,60 @@ class LoginResponse(BaseModel):
     message: str = "Login successful"
 
 
-@router.post("/login", response_model=LoginResponse)
-
-def login_user(login_data: LoginRequest, db: Session = Depends(get_db)) -> LoginResponse:
+@router.post("/login", response_model=LoginResponse,
+             dependencies=[Depends(login_rate_limit), Depends(admission_control("login"))])
+async def login_user(login_data: LoginRequest, background_tasks: BackgroundTasks,
+                     db: AsyncDbSession = Depends(get_async_session)) -> LoginResponse:
     """Handles user login by verifying credentials and generating a session token.
 
     This endpoint accepts a username and plaintext password, verifies them against the
     stored credentials, and upon successful authentication, generates a session token.
-    The token is stored in the sessions table for session management.
+    Opaque tokens are stored in the sessions table; with SESSION_TOKEN_FORMAT=signed a
+    stateless signed token is returned instead. Password verification
+    runs on the dedicated hashing executor and database access is awaited, so a burst of
+    logins never blocks the event loop. If the stored hash is cheaper than new hashes (or
+    costlier beyond BCRYPT_REHASH_TOLERANCE), it is re-hashed at the current cost after the
+    response is sent.
+    Usernames and client IPs with too many recent failures are turned away with 429 before
+    any of that (see tst_auth_svc.login_limiter).
 
     Args:
         login_data (LoginRequest): Contains username and password in plaintext.
-        db (Session): Database session provided via dependency injection.
+        background_tasks (BackgroundTasks): Runs the re-hash after the response.
+        db (AsyncDbSession): Database session provided via dependency injection.
 
     Returns:
         LoginResponse: Contains the generated session token and success message.
 
     Raises:
-        HTTPException: With 401 status if credentials are invalid, or 500 for internal errors.
+        HTTPException: With 401 status if credentials are invalid, 429 if the username or client
+            IP is throttled, or 500 for internal errors.
     """
     try:
-        user = db.query(User).filter(User.username == login_data.username).first()
+        user = await replica_set.first(
+            db, select(User.id, User.password).where(User.username == login_data.username))
+        # End the read transaction so the pooled connection is not held while bcrypt runs
+        await db.rollback()
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-        
-        if not bcrypt.checkpw(login_data.password.encode('utf-8'), user.password.encode('utf-8')):
+
+        password_hash = user.password
+        valid = await verify_password(login_data.password, password_hash)
+        if not valid and replica_set.enabled:
+            # A replica may lag behind a password change: a mismatch is re-checked against the
+            # primary's hash, so a new password works at once (the old one does until it catches up)
+            current_hash = (await db.execute(select(User.password).where(User.id == user.id))).scalar()
+            if current_hash is not None and current_hash != password_hash:
+                password_hash = current_hash
+                valid = await verify_password(login_data.password, current_hash)
+        if not valid:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-        
-        # Generate session token using uuid4
-        session_token = str(uuid.uuid4())
 
-        # Import the SessionToken model and store the token in the sessions table
-        from tst_auth_svc.models.session import SessionToken
-        new_session = SessionToken(user_id=user.id, session_token=session_token)
-        db.add(new_session)
-        db.commit()
+        if BCRYPT_REHASH_ON_LOGIN and get_hasher().needs_rehash(password_hash):
+            background_tasks.add_task(password_rehasher.rehash, user.id, login_data.password, password_hash)
+        
+        # Issue the session token (stored in the sessions table unless signed tokens are enabled)
+        session_token = await create_session(db, user.id)
         
         return LoginResponse(session_token=session_token)
     except HTTPException:
@@ -2,10 +2,9 @@ import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
 
-from tst_auth_svc.models.session import SessionToken
-from tst_auth_svc.models.base import get_db
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
+from tst_auth_svc.sessions import resolve_session, revoke_session, revoke_user_sessions
 
 router = APIRouter()
 
@@ -18,17 +17,39 @@ class LogoutResponse(BaseModel):
     message: str
 
 
+class LogoutAllResponse(BaseModel):
+    message: str
+    sessions_revoked: int
+
+
 @router.post("/logout", response_model=LogoutResponse)
-def logout(request: LogoutRequest, db: Session = Depends(get_db)) -> LogoutResponse:
+async def logout(request: LogoutRequest, db: AsyncDbSession = Depends(get_async_session)) -> LogoutResponse:
     try:
-        session_record = db.query(SessionToken).filter(SessionToken.session_token == request.session_token).first()
-        if not session_record:
+        if not await revoke_session(db, request.session_token):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or missing session token")
-        db.delete(session_record)
-        db.commit()
         return LogoutResponse(message="Logout successful")
     except HTTPException as he:
         raise he
     except Exception as e:
         logging.error(e, exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.post("/logout/all", response_model=LogoutAllResponse)
+async def logout_everywhere(request: LogoutRequest,
+                            db: AsyncDbSession = Depends(get_async_session)) -> LogoutAllResponse:
+    """Revokes every session of the user owning the given session token, that one included.
+
+    sessions_revoked counts stored sessions; signed tokens are revoked too, but uncounted.
+    """
+    try:
+        user_id = await resolve_session(db, request.session_token)
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or missing session token")
+        revoked = await revoke_user_sessions(db, [user_id])
+        return LogoutAllResponse(message="Logged out of all sessions", sessions_revoked=revoked)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logging.error(e, exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
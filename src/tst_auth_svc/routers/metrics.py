@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from tst_auth_svc.admission import admission_stats
+from tst_auth_svc.hashing import get_hasher
+from tst_auth_svc.metrics import CONTENT_TYPE, REGISTRY, CallbackGauge
+from tst_auth_svc.models.base import pool_stats
+from tst_auth_svc.rehash import stored_costs
+
+router = APIRouter()
+
+# Point-in-time gauges read from the components that already track them
+REGISTRY.register(CallbackGauge(
+    "bcrypt_in_flight", "bcrypt operations running or queued on the hashing executor.",
+    lambda: get_hasher().stats()["in_flight"]))
+REGISTRY.register(CallbackGauge(
+    "db_pool_checked_out", "Database connections currently checked out of the pool.",
+    lambda: pool_stats().get("checked_out", 0)))
+REGISTRY.register(CallbackGauge(
+    "admission_in_flight", "Requests admitted past admission control, by route.",
+    lambda: {(name,): stats["in_flight"] for name, stats in admission_stats().items()}, ("route",)))
+REGISTRY.register(CallbackGauge(
+    "bcrypt_target_cost", "bcrypt cost factor given to new password hashes.",
+    lambda: get_hasher().rounds))
+REGISTRY.register(CallbackGauge(
+    "bcrypt_stored_cost_users", "Users by the bcrypt cost of their stored password hash.",
+    lambda: stored_costs.counts, ("cost",)))
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Serves all service metrics in the Prometheus text exposition format."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,13 +1,12 @@
-import secrets
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
 from tst_auth_svc.models.user import User
-from tst_auth_svc.models.session import SessionToken
-from tst_auth_svc.models.base import get_db
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
+from tst_auth_svc.sessions import issue_reset_token
 
 
 router = APIRouter()
@@ -23,21 +22,20 @@ class PasswordResetResponse(BaseModel):
 
 
 @router.post("/password-reset", response_model=PasswordResetResponse)
-def password_reset(request: PasswordResetRequest, db: Session = Depends(get_db)) -> PasswordResetResponse:
+async def password_reset(request: PasswordResetRequest,
+                         db: AsyncDbSession = Depends(get_async_session)) -> PasswordResetResponse:
     try:
         # Query the user by username or email
-        user = db.query(User).filter((User.username == request.identifier) | (User.email == request.identifier)).first()
+        result = await db.execute(
+            select(User.id).where((User.username == request.identifier) | (User.email == request.identifier))
+        )
+        user = result.first()
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-        # Generate a secure reset token with a prefix to indicate its type
-        token = "reset:" + secrets.token_urlsafe(32)
-
         try:
-            # Store the token using the existing SessionToken model
-            new_session = SessionToken(user_id=user.id, session_token=token)
-            db.add(new_session)
-            db.commit()
+            # Generate a secure reset token and persist it in the session store
+            token = await issue_reset_token(db, user.id)
         except Exception as e:
             logging.error(e, exc_info=True)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error storing reset token")
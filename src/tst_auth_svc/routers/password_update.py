@@ -1,12 +1,14 @@
 import logging
-import bcrypt
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import update
 
-from tst_auth_svc.models.base import get_db
-from tst_auth_svc.models.session import SessionToken
+from tst_auth_svc.admission import admission_control
+from tst_auth_svc.hashing import hash_password
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
 from tst_auth_svc.models.user import User
+from tst_auth_svc.session_cache import session_cache
+from tst_auth_svc.sessions import consume_reset_token, resolve_reset_token, revoke_user_sessions
 
 
 router = APIRouter()
@@ -15,39 +17,55 @@ router = APIRouter()
 class PasswordUpdateRequest(BaseModel):
     reset_token: str
     new_password: str = Field(..., min_length=6, description="New password, at least 6 characters long")
+    revoke_sessions: bool = Field(False, description="Also log the user out of every existing session")
 
 
 class PasswordUpdateResponse(BaseModel):
     message: str
 
 
-@router.post("/password-update", response_model=PasswordUpdateResponse)
-def update_password(request: PasswordUpdateRequest, db: Session = Depends(get_db)) -> PasswordUpdateResponse:
+@router.post("/password-update", response_model=PasswordUpdateResponse,
+             dependencies=[Depends(admission_control("password_update"))])
+async def update_password(request: PasswordUpdateRequest,
+                          db: AsyncDbSession = Depends(get_async_session)) -> PasswordUpdateResponse:
+    """Sets a new password for the user a reset token was issued for, consuming the token.
+
+    Three statements: the token lookup, which rejects unknown tokens before any bcrypt work,
+    then, after hashing, DELETE ... RETURNING of the token and the UPDATE of the user it
+    returned, committed together. Whether the user still exists is told by the UPDATE.
+    With revoke_sessions, one more DELETE of all the user's sessions joins that transaction.
+    """
     try:
-        # Find the reset token in the database
-        token_record = db.query(SessionToken).filter(SessionToken.session_token == request.reset_token).first()
-        if not token_record:
+        # Reject unknown or expired tokens cheaply, before paying for bcrypt
+        if await resolve_reset_token(db, request.reset_token) is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired reset token")
-
-        # Find the associated user
-        user = db.query(User).filter(User.id == token_record.user_id).first()
-        if not user:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User not found for the provided token")
+        # End the read transaction so the pooled connection is not held while bcrypt runs
+        await db.rollback()
 
         try:
-            # Hash the new password using bcrypt
-            hashed_pw = bcrypt.hashpw(request.new_password.encode('utf-8'), bcrypt.gensalt())
-            hashed_pw_str = hashed_pw.decode('utf-8')
+            # Hash the new password using bcrypt on the dedicated hashing executor
+            hashed_pw_str = await hash_password(request.new_password)
         except Exception as e:
             logging.error(e, exc_info=True)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error hashing the new password")
 
+        # Consume the reset token; a concurrent update may already have done so.
+        # With the SQL store the delete commits together with the password change below.
+        user_id = await consume_reset_token(db, request.reset_token, commit=False)
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired reset token")
+
         # Update user's password
-        user.password = hashed_pw_str
+        updated = await db.execute(update(User).where(User.id == user_id).values(password=hashed_pw_str))
+        if not updated.rowcount:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User not found for the provided token")
+        if request.revoke_sessions:
+            await revoke_user_sessions(db, [user_id], commit=False)
+        await db.commit()
 
-        # Invalidate the used reset token
-        db.delete(token_record)
-        db.commit()
+        # Drop cached validation results for the user's sessions
+        session_cache.invalidate_user(user_id)
 
         return PasswordUpdateResponse(message="Password updated successfully")
     except HTTPException as he:
@@ -2,10 +2,11 @@ import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, EmailStr, validator
-from sqlalchemy.orm import Session
-import bcrypt
+from sqlalchemy.exc import IntegrityError
 
-from tst_auth_svc.models.base import get_db
+from tst_auth_svc.admission import admission_control
+from tst_auth_svc.hashing import hash_password
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
 from tst_auth_svc.models.user import User
 
 router = APIRouter()
@@ -28,24 +29,19 @@ class UserRegistrationResponse(BaseModel):
     message: str
 
 
-@router.post('/register', response_model=UserRegistrationResponse)
-def register_user(registration: UserRegistrationRequest, db: Session = Depends(get_db)):
-    try:
-        # Check for duplicate user by username or email
-        existing_user = db.query(User).filter(
-            (User.username == registration.username) | (User.email == registration.email)
-        ).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this username or email already exists."
-            )
+@router.post('/register', response_model=UserRegistrationResponse,
+             dependencies=[Depends(admission_control('register'))])
+async def register_user(registration: UserRegistrationRequest, db: AsyncDbSession = Depends(get_async_session)):
+    """Creates a user account with a single INSERT.
 
-        # Hash the password using bcrypt
+    Duplicates are detected by the uq_users_username and uq_users_email constraints rather
+    than by a prior SELECT, which also closes the race between two concurrent sign-ups for
+    the same name.
+    """
+    try:
+        # Hash the password using bcrypt on the dedicated hashing executor
         try:
-            hashed_pw = bcrypt.hashpw(registration.password.encode('utf-8'), bcrypt.gensalt())
-            # bcrypt.hashpw returns bytes, decode to string for storage
-            hashed_pw_str = hashed_pw.decode('utf-8')
+            hashed_pw_str = await hash_password(registration.password)
         except Exception as e:
             logging.error(e, exc_info=True)
             raise HTTPException(
@@ -53,15 +49,20 @@ def register_user(registration: UserRegistrationRequest, db: Session = Depends(g
                 detail="Error processing password encryption."
             )
 
-        # Create new user instance
-        new_user = User(
+        # Create new user instance; the unique constraints reject an existing username or email
+        db.add(User(
             username=registration.username,
             email=registration.email,
             password=hashed_pw_str
-        )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User with this username or email already exists."
+            )
 
         return UserRegistrationResponse(message="User registered successfully")
     except HTTPException:
@@ -0,0 +1,55 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+
+from tst_auth_svc.internal_auth import require_internal_token
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
+from tst_auth_svc.sessions import revoke_sessions, revoke_user_sessions
+
+# Both routes can log out any user: they require the internal API token
+router = APIRouter(prefix="/internal/sessions", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+# Keeps each request's DELETE within database bind-parameter limits; send larger sets in several requests
+MAX_ITEMS_PER_REQUEST = 10000
+
+
+class RevokeUsersRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=MAX_ITEMS_PER_REQUEST)
+
+
+class RevokeTokensRequest(BaseModel):
+    session_tokens: List[str] = Field(..., min_length=1, max_length=MAX_ITEMS_PER_REQUEST)
+
+
+class RevocationResponse(BaseModel):
+    message: str
+    sessions_revoked: int
+
+
+@router.post("/revoke-users", response_model=RevocationResponse)
+async def revoke_users(request: RevokeUsersRequest,
+                       db: AsyncDbSession = Depends(get_async_session)) -> RevocationResponse:
+    """Revokes every session of the listed users with a single DELETE on sessions.user_id.
+
+    sessions_revoked counts stored sessions; signed tokens are revoked too, but uncounted.
+    """
+    try:
+        revoked = await revoke_user_sessions(db, request.user_ids)
+        return RevocationResponse(message="Sessions revoked", sessions_revoked=revoked)
+    except Exception as e:
+        logging.error(e, exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+
+@router.post("/revoke-tokens", response_model=RevocationResponse)
+async def revoke_tokens(request: RevokeTokensRequest,
+                        db: AsyncDbSession = Depends(get_async_session)) -> RevocationResponse:
+    """Revokes the listed session tokens with a single DELETE; unknown tokens are ignored."""
+    try:
+        revoked = await revoke_sessions(db, request.session_tokens)
+        return RevocationResponse(message="Sessions revoked", sessions_revoked=revoked)
+    except Exception as e:
+        logging.error(e, exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
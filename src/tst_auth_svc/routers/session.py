@@ -0,0 +1,41 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+
+from tst_auth_svc.models.base import AsyncDbSession, get_async_session
+from tst_auth_svc.sessions import resolve_session
+
+router = APIRouter()
+
+
+class SessionValidateRequest(BaseModel):
+    session_token: str
+
+
+class SessionValidateResponse(BaseModel):
+    valid: bool = True
+    user_id: int
+
+
+@router.post("/session/validate", response_model=SessionValidateResponse)
+async def validate_session(request: SessionValidateRequest,
+                           db: AsyncDbSession = Depends(get_async_session)) -> SessionValidateResponse:
+    """Resolves a session token to its user id for downstream services.
+
+    Opaque tokens go through the in-process session cache first, so a hit (including a
+    cached "unknown token") never touches the database; signed tokens are verified in
+    memory. Password reset tokens are never accepted as sessions.
+
+    Raises:
+        HTTPException: With 401 status if the token is not a valid session, or 500 for internal errors.
+    """
+    try:
+        user_id = await resolve_session(db, request.session_token)
+    except Exception as e:
+        logging.error(e, exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired session token")
+    return SessionValidateResponse(user_id=user_id)
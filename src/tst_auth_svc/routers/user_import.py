@@ -0,0 +1,40 @@
+import json
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from tst_auth_svc.internal_auth import require_internal_token
+from tst_auth_svc.user_import import ndjson_rows, user_importer
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator is still reading the request body.
+
+    For ASGI servers older than spec 2.4 (uvicorn included) StreamingResponse watches for
+    client disconnects by reading receive() while it streams, which would take request body
+    chunks away from the iterator. Here only the iterator reads receive(); a disconnect
+    surfaces there as ClientDisconnect.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/users/import", response_class=StreamingResponse)
+async def import_users(request: Request) -> StreamingResponse:
+    """Bulk-creates users from an NDJSON request body, one object per line (needs X-Internal-Token).
+
+    Each line has username, email and either password or password_hash (an existing bcrypt
+    hash). The body is imported while it is still being received, in committed batches, and
+    the response streams one NDJSON line per row that was not imported (invalid, conflict
+    on username or email, or error) followed by a summary line with the totals.
+    """
+    async def results():
+        async for result in user_importer.run(ndjson_rows(request.stream())):
+            yield json.dumps(result) + "\n"
+
+    return RequestStreamingResponse(results(), media_type="application/x-ndjson")
@@ -0,0 +1,291 @@
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import Callable, List, Optional
+
+import uvicorn
+from uvicorn.supervisors.multiprocess import Multiprocess, Process
+
+from tst_auth_svc.config import BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS, BCRYPT_TARGET_MS
+
+"""
+This module runs the service in production mode: a supervisor process and N uvicorn
+worker processes, each with its own event loop, database pool and hashing executor, so a
+node's cores are all used for bcrypt and request handling without an external process
+manager.
+
+Listening sockets are bound by the supervisor and inherited by the workers, either
+
+    shared     one socket all workers accept from (default), or
+    reuseport  one SO_REUSEPORT socket per worker, so the kernel spreads new connections
+               evenly across workers instead of waking them all on each one. A worker's
+               socket outlives it: connections queued while it is being replaced wait for
+               its successor rather than being refused.
+
+The event loop and HTTP parser default to "auto": uvloop and httptools when installed
+(pip install uvloop httptools), the pure-Python asyncio loop and h11 otherwise.
+
+The supervisor pings every worker over a pipe twice a second; a worker that has exited or
+does not answer within the health check timeout is killed and replaced. Signals to the
+supervisor:
+
+    SIGHUP          rolling restart: each worker is replaced by a new one, which must be
+                    serving before the old one is stopped (it finishes its in-flight
+                    requests within the graceful shutdown timeout)
+    SIGTTIN/TTOU    add or remove a worker
+    SIGUSR1         log per-worker health
+    SIGINT/SIGTERM  graceful shutdown
+
+Workers still reload their settings on a SIGHUP sent to them directly.
+
+Each worker holds its own pools: the database needs room for workers x (DB_POOL_SIZE +
+DB_MAX_OVERFLOW) connections. Unless HASH_EXECUTOR_WORKERS is set, the CPU cores are split
+between the workers' hashing executors instead of every worker starting one hashing thread
+per core. With BCRYPT_TARGET_MS set, the supervisor calibrates the bcrypt cost once and
+passes it to every worker it starts, replacements included, in BCRYPT_ROUNDS.
+"""
+
+logger = logging.getLogger("uvicorn.error")
+
+_spawn = multiprocessing.get_context("spawn")
+
+# Index of this worker process under the supervisor, None when not run by one
+_worker_index: Optional[int] = None
+_worker_started = time.time()
+
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def worker_count(requested: int) -> int:
+    """Resolves a worker count setting; 0 means one worker per CPU core."""
+    return requested if requested > 0 else os.cpu_count() or 1
+
+
+def reuse_port_socket(host: str, port: int) -> socket.socket:
+    """Binds an SO_REUSEPORT socket that other sockets in this process group can bind too."""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def pin_bcrypt_cost(target_ms: float = BCRYPT_TARGET_MS, min_rounds: int = BCRYPT_MIN_ROUNDS,
+                    max_rounds: int = BCRYPT_MAX_ROUNDS) -> Optional[int]:
+    """Calibrates the bcrypt cost here and pins it in the environment the workers inherit.
+
+    Workers calibrating on their own could each settle on a different cost and keep
+    re-hashing each other's hashes. Returns the pinned cost, or None without a target.
+    """
+    if target_ms <= 0:
+        return None
+    from tst_auth_svc.hashing import calibrated_rounds
+
+    rounds = calibrated_rounds(target_ms, min_rounds, max_rounds)
+    os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    os.environ["BCRYPT_TARGET_MS"] = "0"
+    logger.info("bcrypt calibrated by the supervisor: cost %s for a %s ms target", rounds, target_ms)
+    return rounds
+
+
+def worker_info() -> dict:
+    """Reports this process's worker index, pid and uptime, for per-worker health checks."""
+    return {
+        "worker": _worker_index,
+        "pid": os.getpid(),
+        "supervisor_pid": os.getppid() if _worker_index is not None else None,
+        "uptime_seconds": round(time.time() - _worker_started, 3),
+    }
+
+
+class WorkerProcess(Process):
+    """A uvicorn worker process that knows its index and reports when it is serving."""
+
+    def __init__(self, config: uvicorn.Config, target: Callable, sockets: List[socket.socket], index: int):
+        self.index = index
+        self.ready = _spawn.Event()
+        self.started_at = time.monotonic()
+        super().__init__(config, target, sockets)
+
+    def target(self, sockets: Optional[List[socket.socket]] = None):
+        # Runs in the child process
+        global _worker_index
+        _worker_index = self.index
+        server = getattr(self.real_target, "__self__", None)
+        if server is not None:
+            threading.Thread(target=self._report_ready, args=(server,), daemon=True).start()
+        return super().target(sockets)
+
+    def _report_ready(self, server: uvicorn.Server) -> None:
+        while not server.started:
+            if server.should_exit:
+                return
+            time.sleep(0.05)
+        self.ready.set()
+
+
+class PreforkSupervisor(Multiprocess):
+    """uvicorn's multiprocess supervisor with per-worker sockets, rolling restarts and health stats.
+
+    Args:
+        config (uvicorn.Config): Server configuration; config.workers is the initial worker count.
+        target (callable): The server's run method, called in each worker.
+        sockets (list): One shared socket, or one SO_REUSEPORT socket per worker.
+        reuse_port (bool): Whether sockets holds one socket per worker.
+        health_timeout (float): Seconds a worker has to answer a health ping.
+        boot_timeout (float): Seconds a new worker has to start serving during a rolling restart.
+    """
+
+    def __init__(self, config: uvicorn.Config, target: Callable, sockets: List[socket.socket],
+                 reuse_port: bool = False, health_timeout: float = 5, boot_timeout: float = 60):
+        super().__init__(config, target, sockets)
+        self.reuse_port = reuse_port
+        self.health_timeout = health_timeout
+        self.boot_timeout = boot_timeout
+        self._restarts = {}
+        self._last_ping_ms = {}
+
+    def _sockets_for(self, index: int) -> List[socket.socket]:
+        if not self.reuse_port:
+            return self.sockets
+        while len(self.sockets) <= index:
+            self.sockets.append(reuse_port_socket(self.config.host, self.config.port))
+        return [self.sockets[index]]
+
+    def _spawn(self, index: int) -> WorkerProcess:
+        process = WorkerProcess(self.config, self.target, self._sockets_for(index), index)
+        process.start()
+        return process
+
+    def init_processes(self) -> None:
+        for index in range(self.processes_num):
+            self.processes.append(self._spawn(index))
+
+    def restart_all(self) -> None:
+        """Replaces the workers one at a time, starting each successor before stopping its predecessor."""
+        for index, old in enumerate(list(self.processes)):
+            new = self._spawn(index)
+            if not new.ready.wait(self.boot_timeout):
+                logger.error("Worker %d [%s] did not start serving within %ss; rolling restart aborted",
+                             index, new.pid, self.boot_timeout)
+                new.terminate()
+                new.join()
+                return
+            self.processes[index] = new
+            old.terminate()
+            old.join()
+            logger.info("Worker %d replaced: [%s] -> [%s]", index, old.pid, new.pid)
+
+    def keep_subprocess_alive(self) -> None:
+        if self.should_exit.is_set():
+            return
+        for index, process in enumerate(self.processes):
+            started = time.monotonic()
+            if process.is_alive(self.health_timeout):
+                self._last_ping_ms[index] = round((time.monotonic() - started) * 1000, 3)
+                continue
+            logger.warning("Worker %d [%s] failed its health check; replacing it", index, process.pid)
+            process.kill()
+            process.join()
+            if self.should_exit.is_set():
+                return
+            self._restarts[index] = self._restarts.get(index, 0) + 1
+            self.processes[index] = self._spawn(index)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "workers": [{
+                "worker": index,
+                "pid": process.pid,
+                "serving": process.ready.is_set(),
+                "uptime_seconds": round(now - process.started_at, 3),
+                "last_ping_ms": self._last_ping_ms.get(index),
+                "restarts": self._restarts.get(index, 0),
+            } for index, process in enumerate(self.processes)],
+            "reuse_port": self.reuse_port,
+        }
+
+    def handle_usr1(self) -> None:
+        logger.info("Worker health: %s", json.dumps(self.stats()))
+
+    def handle_ttin(self) -> None:
+        logger.info("Received SIGTTIN, adding a worker.")
+        self.processes_num += 1
+        self.processes.append(self._spawn(len(self.processes)))
+
+    def handle_ttou(self) -> None:
+        if self.processes_num <= 1:
+            logger.info("Received SIGTTOU, but only one worker is left.")
+            return
+        logger.info("Received SIGTTOU, removing a worker.")
+        self.processes_num -= 1
+        process = self.processes.pop()
+        process.terminate()
+        process.join()
+        if self.reuse_port:
+            # Nothing accepts on the removed worker's socket any more; stop the kernel routing to it
+            self.sockets.pop().close()
+
+
+def serve(host: str, port: int, workers: int = 1, loop: str = "auto", http: str = "auto",
+          reuse_port: bool = False, backlog: int = 2048, keep_alive: int = 5, graceful_timeout: float = 30,
+          health_timeout: float = 5, boot_timeout: float = 60) -> None:
+    """Serves the application until SIGINT/SIGTERM.
+
+    With one worker and a shared socket the server runs in this process, as a plain uvicorn
+    server; otherwise this process supervises the worker processes.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        workers (int): Worker processes; 0 means one per CPU core.
+        loop (str): Event loop: "auto", "uvloop" or "asyncio".
+        http (str): HTTP implementation: "auto", "httptools" or "h11".
+        reuse_port (bool): Give each worker its own SO_REUSEPORT socket.
+        backlog (int): Listen backlog per socket.
+        keep_alive (int): Seconds an idle keep-alive connection is held open.
+        graceful_timeout (float): Seconds a stopping worker may spend on in-flight requests (0: no limit).
+        health_timeout (float): Seconds a worker has to answer a health ping.
+        boot_timeout (float): Seconds a new worker has to start serving during a rolling restart.
+    """
+    workers = worker_count(workers)
+    if workers > 1 and "HASH_EXECUTOR_WORKERS" not in os.environ:
+        # Inherited by the workers: split the cores between their hashing executors
+        os.environ["HASH_EXECUTOR_WORKERS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+    if workers > 1 or reuse_port:
+        pin_bcrypt_cost()
+
+    config = uvicorn.Config("tst_auth_svc.app:app", host=host, port=port, workers=workers, loop=loop, http=http,
+                            backlog=backlog, timeout_keep_alive=keep_alive,
+                            timeout_graceful_shutdown=graceful_timeout or None)
+    server = uvicorn.Server(config)
+    logger.info("Serving on %s:%d with %d worker(s), loop=%s (uvloop %s), http=%s (httptools %s), %s socket",
+                host, port, workers, loop, "available" if available("uvloop") else "not installed",
+                http, "available" if available("httptools") else "not installed",
+                "SO_REUSEPORT" if reuse_port else "shared")
+    if workers == 1 and not reuse_port:
+        server.run()
+        return
+
+    if reuse_port:
+        sockets = [reuse_port_socket(host, port) for _ in range(workers)]
+    else:
+        sockets = [config.bind_socket()]
+    try:
+        PreforkSupervisor(config, server.run, sockets, reuse_port=reuse_port,
+                          health_timeout=health_timeout, boot_timeout=boot_timeout).run()
+    finally:
+        for sock in sockets:
+            sock.close()
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+from tst_auth_svc.config import SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_NEGATIVE_TTL, SESSION_CACHE_TTL
+
+"""
+This module provides the in-process cache behind /session/validate.
+
+Entries map a session token to its user id (or to None for tokens known not to exist) and
+live in a bounded LRU with per-entry expiry. Logout and password updates evict entries
+in this process immediately; other worker processes converge within the TTL.
+"""
+
+# Returned by SessionCache.get when the token is not cached (None is a cached "invalid")
+MISS = object()
+
+
+class SessionCache:
+    """Bounded LRU of token -> user id with TTL and negative caching.
+
+    Args:
+        max_entries (int): Capacity; the least recently used entry is evicted beyond it.
+        ttl (float): Seconds a positive (valid token) entry is served from cache.
+        negative_ttl (float): Seconds an unknown-token entry is served from cache.
+        clock (callable, optional): Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+        self._counters = {"hits": 0, "negative_hits": 0, "misses": 0, "expirations": 0,
+                          "evictions": 0, "invalidations": 0}
+
+    def get(self, token: str):
+        """Returns the cached user id, None for a cached invalid token, or MISS."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self._counters["misses"] += 1
+                return MISS
+            user_id, expires_at = entry
+            if expires_at <= self._clock():
+                self._remove(token)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return MISS
+            self._entries.move_to_end(token)
+            self._counters["hits" if user_id is not None else "negative_hits"] += 1
+            return user_id
+
+    def put(self, token: str, user_id) -> None:
+        """Caches a lookup result; pass user_id=None to remember that the token is invalid."""
+        ttl = self.ttl if user_id is not None else self.negative_ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (user_id, self._clock() + ttl)
+            if user_id is not None:
+                self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+                self._counters["invalidations"] += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drops every cached token belonging to a user."""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+                self._counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        user_id, _ = self._entries.pop(token)
+        if user_id is not None:
+            tokens = self._tokens_by_user.get(user_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[user_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["negative_hits"] + self._counters["misses"]
+            hits = self._counters["hits"] + self._counters["negative_hits"]
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_ratio": (hits / lookups) if lookups else 0.0,
+                **self._counters,
+            }
+
+
+session_cache = SessionCache(SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_TTL, SESSION_CACHE_NEGATIVE_TTL)
@@ -0,0 +1,51 @@
+import threading
+
+from tst_auth_svc.config import REDIS_POOL_SIZE, REDIS_TIMEOUT, REDIS_URL, SESSION_STORE, SESSION_STORE_SHARDS
+from tst_auth_svc.session_store.base import SessionStore
+from tst_auth_svc.session_store.memory import MemorySessionStore
+from tst_auth_svc.session_store.redis_store import RedisSessionStore
+from tst_auth_svc.session_store.resp import RespPool
+from tst_auth_svc.session_store.sql import SqlSessionStore
+
+"""
+This package holds the backends that persist opaque session and password reset tokens.
+
+SESSION_STORE selects one of:
+
+    sql     the sessions table in the application database (default)
+    memory  a sharded in-process store, for single-node deployments
+    redis   any Redis-protocol server at REDIS_URL
+
+Signed-token revocation records always live in the sessions table (see
+tst_auth_svc.signed_tokens), whichever store holds the tokens.
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def create_session_store(backend: str) -> SessionStore:
+    if backend == "sql":
+        return SqlSessionStore()
+    if backend == "memory":
+        return MemorySessionStore(shards=SESSION_STORE_SHARDS)
+    if backend == "redis":
+        return RedisSessionStore(RespPool(REDIS_URL, max_connections=REDIS_POOL_SIZE, timeout=REDIS_TIMEOUT))
+    raise ValueError(f"Unsupported SESSION_STORE: {backend}")
+
+
+def get_session_store() -> SessionStore:
+    """Returns the process-wide session store, creating it from config on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_session_store(SESSION_STORE)
+        return _store
+
+
+async def close_session_store() -> None:
+    """Releases the store's connections; pooled clients reconnect lazily if used again."""
+    with _store_lock:
+        store = _store
+    if store is not None:
+        await store.close()
@@ -0,0 +1,53 @@
+from typing import Optional
+
+from tst_auth_svc.models.base import AsyncDbSession
+
+
+class SessionStore:
+    """Persistence for opaque session and password reset tokens.
+
+    Every method receives the request's database session so the SQL store can take part in
+    the request's transaction; other stores ignore it. Tokens are stored with a lifetime in
+    seconds, after which lookup no longer returns them.
+    """
+
+    name = "abstract"
+    # Whether lookups are slow enough to be worth fronting with the in-process session cache
+    cacheable = True
+
+    async def create(self, db: AsyncDbSession, user_id: int, token: str, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def lookup(self, db: AsyncDbSession, token: str) -> Optional[int]:
+        """Returns the user id owning a live token, or None."""
+        raise NotImplementedError
+
+    async def delete(self, db: AsyncDbSession, token: str, commit: bool = True) -> Optional[int]:
+        """Removes a token and returns the user id it belonged to, in a single round trip.
+
+        Returns None if the token did not exist (e.g. a concurrent delete won) or has expired.
+
+        With commit=False the SQL store leaves the delete in the request's open transaction
+        so the caller can commit it together with other changes.
+        """
+        raise NotImplementedError
+
+    async def delete_many(self, db: AsyncDbSession, tokens: list, commit: bool = True) -> int:
+        """Removes the given session tokens in one round trip; returns how many existed.
+
+        Reset tokens in the list are left alone. commit works as for delete.
+        """
+        raise NotImplementedError
+
+    async def delete_for_users(self, db: AsyncDbSession, user_ids: list, commit: bool = True) -> int:
+        """Removes every session of the given users in one round trip; returns how many existed.
+
+        Their password reset tokens are left alone. commit works as for delete.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        """Releases connections; the store reconnects lazily if used again."""
@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Optional
+
+from tst_auth_svc.models.base import AsyncDbSession
+from tst_auth_svc.models.session import RESET_TOKEN_PREFIX
+from tst_auth_svc.session_store.base import SessionStore
+
+
+class _Shard:
+    __slots__ = ("lock", "entries", "prune_at")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.prune_at = 1024
+
+
+class MemorySessionStore(SessionStore):
+    """In-process token store split into independently locked shards.
+
+    Suitable for single-node deployments: sessions do not survive a restart and are not
+    shared between processes. Concurrent requests only contend when their tokens hash to
+    the same shard. Expired tokens are dropped when looked up, and a shard is swept
+    whenever it has doubled in size since its last sweep. There is no per-user index:
+    revoking a user's sessions scans every shard, one shard lock at a time.
+
+    Args:
+        shards (int): Number of shards (and locks).
+        clock (callable, optional): Monotonic time source, injectable for tests.
+    """
+
+    name = "memory"
+    cacheable = False
+
+    def __init__(self, shards: int = 64, clock=time.monotonic):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._clock = clock
+
+    def _shard(self, token: str) -> _Shard:
+        return self._shards[hash(token) % len(self._shards)]
+
+    async def create(self, db: AsyncDbSession, user_id: int, token: str, ttl: int) -> None:
+        shard = self._shard(token)
+        now = self._clock()
+        with shard.lock:
+            shard.entries[token] = (user_id, now + ttl)
+            if len(shard.entries) >= shard.prune_at:
+                expired = [key for key, (_, expires_at) in shard.entries.items() if expires_at <= now]
+                for key in expired:
+                    del shard.entries[key]
+                shard.prune_at = max(1024, 2 * len(shard.entries))
+
+    async def lookup(self, db: AsyncDbSession, token: str) -> Optional[int]:
+        shard = self._shard(token)
+        with shard.lock:
+            entry = shard.entries.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                del shard.entries[token]
+                return None
+            return entry[0]
+
+    async def delete(self, db: AsyncDbSession, token: str, commit: bool = True) -> Optional[int]:
+        shard = self._shard(token)
+        with shard.lock:
+            entry = shard.entries.pop(token, None)
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    async def delete_many(self, db: AsyncDbSession, tokens: list, commit: bool = True) -> int:
+        now = self._clock()
+        deleted = 0
+        for token in tokens:
+            if token.startswith(RESET_TOKEN_PREFIX):
+                continue
+            shard = self._shard(token)
+            with shard.lock:
+                entry = shard.entries.pop(token, None)
+            if entry is not None and entry[1] > now:
+                deleted += 1
+        return deleted
+
+    async def delete_for_users(self, db: AsyncDbSession, user_ids: list, commit: bool = True) -> int:
+        users = set(user_ids)
+        now = self._clock()
+        deleted = 0
+        for shard in self._shards:
+            with shard.lock:
+                tokens = [token for token, (user_id, _) in shard.entries.items()
+                          if user_id in users and not token.startswith(RESET_TOKEN_PREFIX)]
+                for token in tokens:
+                    if shard.entries.pop(token)[1] > now:
+                        deleted += 1
+        return deleted
+
+    def stats(self) -> dict:
+        sizes = [len(shard.entries) for shard in self._shards]
+        return {"backend": self.name, "shards": len(sizes), "tokens": sum(sizes), "largest_shard": max(sizes)}
@@ -0,0 +1,91 @@
+from typing import Optional
+
+from tst_auth_svc.models.base import AsyncDbSession
+from tst_auth_svc.models.session import RESET_TOKEN_PREFIX
+from tst_auth_svc.session_store.base import SessionStore
+from tst_auth_svc.session_store.resp import RespError, RespPool
+
+
+class RedisSessionStore(SessionStore):
+    """Stores tokens in a Redis-protocol server, with expiry handled by the server.
+
+    Each token is a key holding its user id. A per-user set of session tokens is kept
+    alongside so that all of a user's sessions can be found; it may list tokens that
+    have already expired or been deleted. Its expiry is only ever extended, so it lives
+    as long as the user's longest-lived session. Reset tokens are not listed: they are
+    never revoked per user. EXPIRE NX/GT needs Redis 7.0 (or Valkey).
+
+    Args:
+        pool (RespPool): Connection pool to the server.
+        key_prefix (str): Namespace for all keys written by the store.
+    """
+
+    name = "redis"
+
+    def __init__(self, pool: RespPool, key_prefix: str = "tst_auth:"):
+        self.pool = pool
+        self.key_prefix = key_prefix
+
+    def _token_key(self, token: str) -> str:
+        return f"{self.key_prefix}session:{token}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}user_sessions:{user_id}"
+
+    async def create(self, db: AsyncDbSession, user_id: int, token: str, ttl: int) -> None:
+        commands = [("SET", self._token_key(token), user_id, "EX", ttl)]
+        if not token.startswith(RESET_TOKEN_PREFIX):
+            user_key = self._user_key(user_id)
+            commands += [
+                ("SADD", user_key, token),
+                # NX sets the expiry of a new set, GT extends an existing one but never shortens it
+                ("EXPIRE", user_key, ttl, "NX"),
+                ("EXPIRE", user_key, ttl, "GT"),
+            ]
+        replies = await self.pool.pipeline(commands)
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+
+    async def lookup(self, db: AsyncDbSession, token: str) -> Optional[int]:
+        value = await self.pool.execute("GET", self._token_key(token))
+        return int(value) if value is not None else None
+
+    async def delete(self, db: AsyncDbSession, token: str, commit: bool = True) -> Optional[int]:
+        # GETDEL (Redis 6.2+) reads and removes the key atomically
+        value = await self.pool.execute("GETDEL", self._token_key(token))
+        return int(value) if value is not None else None
+
+    async def delete_many(self, db: AsyncDbSession, tokens: list, commit: bool = True) -> int:
+        keys = [self._token_key(token) for token in tokens if not token.startswith(RESET_TOKEN_PREFIX)]
+        if not keys:
+            return 0
+        # Stale entries in the per-user sets are tolerated; they expire with the set
+        return await self.pool.execute("DEL", *keys)
+
+    async def delete_for_users(self, db: AsyncDbSession, user_ids: list, commit: bool = True) -> int:
+        user_keys = [self._user_key(user_id) for user_id in user_ids]
+        if not user_keys:
+            return 0
+        members = await self.pool.pipeline([("SMEMBERS", user_key) for user_key in user_keys])
+        keys, commands = [], []
+        for user_key, tokens in zip(user_keys, members):
+            if isinstance(tokens, RespError):
+                raise tokens
+            sessions = [token for token in map(bytes.decode, tokens) if not token.startswith(RESET_TOKEN_PREFIX)]
+            if sessions:
+                keys.extend(self._token_key(token) for token in sessions)
+                commands.append(("SREM", user_key, *sessions))
+        if not keys:
+            return 0
+        replies = await self.pool.pipeline([("DEL", *keys)] + commands)
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies[0]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self.pool.stats()}
+
+    async def close(self) -> None:
+        await self.pool.close()
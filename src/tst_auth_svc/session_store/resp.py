@@ -0,0 +1,164 @@
+import asyncio
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+"""
+This module is a minimal asyncio client for the Redis serialization protocol (RESP2).
+
+It implements only what the session store needs: encoding commands, parsing replies, a
+bounded pool of connections, and pipelining, which writes a batch of commands in a single
+send and then reads their replies in order. Any server speaking RESP (Redis, Valkey,
+KeyDB, ...) works.
+"""
+
+
+class RespError(Exception):
+    """Error reply (-ERR ...) returned by the server."""
+
+
+def encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode("utf-8")
+        else:
+            data = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Reads one reply; bulk strings come back as bytes, errors are returned as RespError."""
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the RESP server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode("utf-8")
+    if kind == b"-":
+        return RespError(payload.decode("utf-8"))
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected RESP reply type: {kind!r}")
+
+
+class RespConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def pipeline(self, commands: list) -> list:
+        """Sends all commands in one write and returns their replies (RespError instances included)."""
+        self.writer.write(b"".join(encode_command(*command) for command in commands))
+        await self.writer.drain()
+        return [await read_reply(self.reader) for _ in commands]
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RespPool:
+    """Bounded pool of RESP connections, created lazily on the running event loop.
+
+    Connections belong to the loop they were opened on; if the pool is used from a
+    different loop, the old connections are abandoned and new ones opened.
+
+    Args:
+        url (str): redis://[:password@]host[:port][/db]
+        max_connections (int): Upper bound on open connections.
+        timeout (float): Seconds allowed for connecting, waiting for a free connection
+            and each round trip.
+    """
+
+    def __init__(self, url: str, max_connections: int = 10, timeout: float = 2.0):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported RESP URL scheme: {parsed.scheme}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._open = 0
+
+    async def _connect(self) -> RespConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = RespConnection(reader, writer)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            for reply in await connection.pipeline(setup):
+                if isinstance(reply, RespError):
+                    connection.close()
+                    raise reply
+        return connection
+
+    async def execute(self, *command):
+        """Runs a single command and returns its reply, raising RespError for error replies."""
+        reply = (await self.pipeline([command]))[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def pipeline(self, commands: list) -> list:
+        """Runs commands as one pipeline on a pooled connection and returns all replies."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reset(loop)
+        await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        connection = None
+        try:
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = await asyncio.wait_for(self._connect(), self.timeout)
+                self._open += 1
+            replies = await asyncio.wait_for(connection.pipeline(commands), self.timeout)
+            self._idle.append(connection)
+            return replies
+        except BaseException:
+            # The reply stream may be out of sync; never reuse this connection
+            if connection is not None:
+                connection.close()
+                self._open -= 1
+            raise
+        finally:
+            self._semaphore.release()
+
+    def _reset(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            try:
+                connection.close()
+            except RuntimeError:
+                # Its event loop is already closed; the transport went with it
+                pass
+        self._open = 0
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_connections) if loop is not None else None
+
+    def stats(self) -> dict:
+        return {"open_connections": self._open, "idle_connections": len(self._idle),
+                "max_connections": self.max_connections}
+
+    async def close(self) -> None:
+        self._reset(None)
@@ -0,0 +1,67 @@
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from tst_auth_svc.group_commit import get_session_writer
+from tst_auth_svc.models.base import AsyncDbSession
+from tst_auth_svc.models.session import TOKEN_TYPE_SESSION, SessionToken
+from tst_auth_svc.session_store.base import SessionStore
+
+
+class SqlSessionStore(SessionStore):
+    """Stores tokens in the sessions table of the application database.
+
+    Rows get their expiry from the expires_at column default and are removed by the
+    background sweeper. With SESSION_GROUP_COMMIT enabled, new sessions are written through
+    the group-commit queue instead of the request's session.
+    """
+
+    name = "sql"
+
+    async def create(self, db: AsyncDbSession, user_id: int, token: str, ttl: int) -> None:
+        writer = get_session_writer()
+        if writer is not None:
+            await writer.submit(user_id, token)
+            return
+        db.add(SessionToken(user_id=user_id, session_token=token))
+        await db.commit()
+
+    async def lookup(self, db: AsyncDbSession, token: str) -> Optional[int]:
+        result = await db.execute(
+            select(SessionToken.user_id)
+            .where(SessionToken.token_is(token))
+            .where(SessionToken.not_expired())
+        )
+        return result.scalar()
+
+    async def delete(self, db: AsyncDbSession, token: str, commit: bool = True) -> Optional[int]:
+        result = await db.execute(
+            delete(SessionToken)
+            .where(SessionToken.token_is(token))
+            .where(SessionToken.not_expired())
+            .returning(SessionToken.user_id)
+        )
+        user_id = result.scalar()
+        if user_id is None:
+            # With commit=False the transaction is the caller's, other changes included
+            if commit:
+                await db.rollback()
+            return None
+        if commit:
+            await db.commit()
+        return user_id
+
+    async def delete_many(self, db: AsyncDbSession, tokens: list, commit: bool = True) -> int:
+        return await self._delete_sessions(db, SessionToken.token_in(tokens), commit)
+
+    async def delete_for_users(self, db: AsyncDbSession, user_ids: list, commit: bool = True) -> int:
+        # Served by the sessions.user_id index
+        return await self._delete_sessions(db, SessionToken.user_id.in_(user_ids), commit)
+
+    async def _delete_sessions(self, db: AsyncDbSession, criterion, commit: bool) -> int:
+        result = await db.execute(
+            delete(SessionToken).where(criterion).where(SessionToken.type_is(TOKEN_TYPE_SESSION))
+        )
+        if commit:
+            await db.commit()
+        return result.rowcount
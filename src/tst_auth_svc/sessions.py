@@ -0,0 +1,177 @@
+import secrets
+import time
+import uuid
+from typing import Optional
+
+from tst_auth_svc.config import RESET_TOKEN_TTL, SESSION_TOKEN_TTL
+from tst_auth_svc.metrics import SESSIONS_CREATED, SESSIONS_REVOKED
+from tst_auth_svc.models.base import AsyncDbSession
+from tst_auth_svc.models.session import RESET_TOKEN_PREFIX, REVOKED_TOKEN_PREFIX, SessionToken
+from tst_auth_svc.session_cache import MISS, session_cache
+from tst_auth_svc.session_store import get_session_store
+from tst_auth_svc.signed_tokens import (
+    is_signed_token,
+    revocation_record,
+    revocations,
+    signed_tokens_enabled,
+    token_signer,
+    user_revocation,
+)
+
+"""
+This module is the single place where user sessions and password reset tokens are issued,
+revoked and resolved.
+
+Depending on SESSION_TOKEN_FORMAT a session is either an opaque uuid4 kept in the session
+store (see tst_auth_svc.session_store) or a stateless signed token (see
+tst_auth_svc.signed_tokens). Both kinds are accepted
+by revoke_session and resolve_session regardless of the current format, so switching the
+format does not invalidate sessions that are already out there.
+
+revoke_sessions and revoke_user_sessions revoke many sessions at once with one set-based
+DELETE on the store, for logout-everywhere, password changes and incident response.
+"""
+
+
+async def create_session(db: AsyncDbSession, user_id: int) -> str:
+    """Issues a new session token for an authenticated user.
+
+    Opaque tokens are persisted by the session store before this returns.
+    """
+    if signed_tokens_enabled():
+        token = token_signer.issue(user_id)
+        SESSIONS_CREATED.inc("signed")
+        return token
+
+    session_token = str(uuid.uuid4())
+    await get_session_store().create(db, user_id, session_token, SESSION_TOKEN_TTL)
+    SESSIONS_CREATED.inc("opaque")
+    return session_token
+
+
+async def revoke_session(db: AsyncDbSession, session_token: str) -> bool:
+    """Revokes a session token; returns False if it was not a live session."""
+    if is_signed_token(session_token):
+        claims = token_signer.verify(session_token)
+        if claims is None or revocations.is_revoked(claims):
+            return False
+        db.add(SessionToken(user_id=claims.user_id, session_token=revocation_record(claims)))
+        await db.commit()
+        revocations.add(claims)
+        SESSIONS_REVOKED.inc("signed")
+        return True
+
+    if session_token.startswith(REVOKED_TOKEN_PREFIX):
+        # Revocation records are bookkeeping rows, never sessions a client may delete
+        return False
+    if await get_session_store().delete(db, session_token) is None:
+        return False
+    session_cache.invalidate(session_token)
+    SESSIONS_REVOKED.inc("opaque")
+    return True
+
+
+async def revoke_sessions(db: AsyncDbSession, session_tokens: list) -> int:
+    """Revokes a list of session tokens of either format; returns how many were live sessions."""
+    signed = {}
+    opaque = []
+    for token in dict.fromkeys(session_tokens):
+        if is_signed_token(token):
+            claims = token_signer.verify(token)
+            if claims is not None and not revocations.is_revoked(claims):
+                signed[revocation_record(claims)] = claims
+        elif not token.startswith((RESET_TOKEN_PREFIX, REVOKED_TOKEN_PREFIX)):
+            opaque.append(token)
+
+    db.add_all([SessionToken(user_id=claims.user_id, session_token=record) for record, claims in signed.items()])
+    deleted = await get_session_store().delete_many(db, opaque, commit=False) if opaque else 0
+    await db.commit()
+    for claims in signed.values():
+        revocations.add(claims)
+    for token in opaque:
+        session_cache.invalidate(token)
+    SESSIONS_REVOKED.inc("signed", amount=len(signed))
+    SESSIONS_REVOKED.inc("opaque", amount=deleted)
+    return len(signed) + deleted
+
+
+async def revoke_user_sessions(db: AsyncDbSession, user_ids: list, commit: bool = True) -> int:
+    """Revokes every session of the given users; returns how many stored sessions were deleted.
+
+    Signed tokens cannot be enumerated, so when signing keys are configured a per-user
+    revocation is recorded as well; those tokens are not counted. With commit=False the
+    changes are left in the request's transaction (the SQL store's DELETE included) for
+    the caller to commit together with its own, e.g. a password change.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return 0
+    deleted = await get_session_store().delete_for_users(db, user_ids, commit=False)
+    cutoff = int(time.time())
+    if token_signer.active_kid is not None:
+        db.add_all([user_revocation(user_id, cutoff, token_signer.ttl) for user_id in user_ids])
+    if commit:
+        await db.commit()
+    for user_id in user_ids:
+        if token_signer.active_kid is not None:
+            revocations.add_user(user_id, cutoff, cutoff + token_signer.ttl)
+        session_cache.invalidate_user(user_id)
+    SESSIONS_REVOKED.inc("opaque", amount=deleted)
+    return deleted
+
+
+async def resolve_session(db: AsyncDbSession, session_token: str) -> Optional[int]:
+    """Returns the user id owning a live session token, or None.
+
+    Signed tokens are verified in memory against the key set and the revocation set.
+    Opaque tokens go through the session cache (unless the store is in-process anyway),
+    so a hit never touches the store.
+    """
+    if session_token.startswith((RESET_TOKEN_PREFIX, REVOKED_TOKEN_PREFIX)):
+        return None
+
+    if is_signed_token(session_token):
+        claims = token_signer.verify(session_token)
+        if claims is None:
+            return None
+        await revocations.maybe_refresh(db)
+        return None if revocations.is_revoked(claims) else claims.user_id
+
+    store = get_session_store()
+    if not store.cacheable:
+        return await store.lookup(db, session_token)
+    user_id = session_cache.get(session_token)
+    if user_id is MISS:
+        user_id = await store.lookup(db, session_token)
+        session_cache.put(session_token, user_id)
+    return user_id
+
+
+async def issue_reset_token(db: AsyncDbSession, user_id: int) -> str:
+    """Issues a single-use password reset token, valid for RESET_TOKEN_TTL seconds."""
+    token = RESET_TOKEN_PREFIX + secrets.token_urlsafe(32)
+    await get_session_store().create(db, user_id, token, RESET_TOKEN_TTL)
+    return token
+
+
+async def resolve_reset_token(db: AsyncDbSession, token: str) -> Optional[int]:
+    """Returns the user id a live reset token was issued for, or None."""
+    if not token.startswith(RESET_TOKEN_PREFIX):
+        return None
+    return await get_session_store().lookup(db, token)
+
+
+async def consume_reset_token(db: AsyncDbSession, token: str, commit: bool = True) -> Optional[int]:
+    """Deletes a reset token and returns the user id it was issued for.
+
+    None means it was already used (or never existed).
+
+    With commit=False an SQL store leaves the delete in the request's transaction, so the
+    caller can commit it atomically with the password change.
+    """
+    if not token.startswith(RESET_TOKEN_PREFIX):
+        return None
+    user_id = await get_session_store().delete(db, token, commit=commit)
+    if user_id is not None:
+        session_cache.invalidate(token)
+    return user_id
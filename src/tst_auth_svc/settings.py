@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Mapping, Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, ConfigDict, SecretStr, ValidationError, field_validator
+
+"""
+This module holds the settings that request handlers need, as one validated snapshot.
+
+The snapshot is read from the environment once, when the module is first imported, and
+handed to routes through the get_settings dependency, so no request reads os.environ.
+A setting NAME can also be given as NAME_FILE, the path of a file holding the value
+(e.g. a mounted secret); the file is read at load time.
+
+To rotate a secret without restarting the workers, update the file and send SIGHUP to each
+worker process (or POST /internal/settings/reload with the internal API token, see
+tst_auth_svc.internal_auth). The new snapshot replaces the old one in a single assignment,
+so a request sees either the old settings or the new ones, never a mix. If the new values
+fail validation the old snapshot stays in place.
+"""
+
+
+class Settings(BaseModel):
+    """Immutable snapshot of the request-time settings.
+
+    Args:
+        google_client_id (str, optional): The Google OAuth2 client ID.
+        google_client_secret (SecretStr, optional): The Google OAuth2 client secret.
+        google_redirect_uri (str, optional): Absolute http(s) URL Google redirects back to.
+        internal_api_token (SecretStr, optional): Shared secret the /internal write routes require;
+            unset, those routes are disabled.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    google_client_id: Optional[str] = None
+    google_client_secret: Optional[SecretStr] = None
+    google_redirect_uri: Optional[str] = None
+    internal_api_token: Optional[SecretStr] = None
+
+    @field_validator("google_client_id", "google_client_secret", "google_redirect_uri", "internal_api_token",
+                     mode="before")
+    @classmethod
+    def blank_as_unset(cls, value):
+        if isinstance(value, str):
+            value = value.strip()
+        return value or None
+
+    @field_validator("google_redirect_uri")
+    @classmethod
+    def absolute_http_url(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            parts = urlsplit(value)
+            if parts.scheme not in ("http", "https") or not parts.netloc:
+                raise ValueError("must be an absolute http(s) URL")
+        return value
+
+    @property
+    def google_configured(self) -> bool:
+        return bool(self.google_client_id and self.google_client_secret and self.google_redirect_uri)
+
+
+def _read(environ: Mapping[str, str], name: str) -> Optional[str]:
+    path = environ.get(f"{name}_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return environ.get(name)
+
+
+def load_settings(environ: Optional[Mapping[str, str]] = None) -> Settings:
+    """Builds a settings snapshot from environ (default: os.environ).
+
+    Raises:
+        ValidationError: If a value is invalid.
+        OSError: If a NAME_FILE setting names a file that cannot be read.
+    """
+    environ = os.environ if environ is None else environ
+    return Settings(
+        google_client_id=_read(environ, "GOOGLE_CLIENT_ID"),
+        google_client_secret=_read(environ, "GOOGLE_CLIENT_SECRET"),
+        google_redirect_uri=_read(environ, "GOOGLE_REDIRECT_URI"),
+        internal_api_token=_read(environ, "INTERNAL_API_TOKEN"),
+    )
+
+
+_settings = load_settings()
+_generation = 1
+_loaded_at = time.time()
+_reload_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """Route dependency returning the current settings snapshot."""
+    return _settings
+
+
+def reload_settings() -> bool:
+    """Re-reads the settings; returns False (keeping the current ones) if they are invalid."""
+    global _settings, _generation, _loaded_at
+    with _reload_lock:
+        try:
+            settings = load_settings()
+        except (ValidationError, OSError) as e:
+            logging.error("Settings reload failed, keeping generation %d: %s", _generation, e)
+            return False
+        _settings = settings
+        _generation += 1
+        _loaded_at = time.time()
+        logging.info("Settings reloaded (generation %d)", _generation)
+        return True
+
+
+def settings_stats() -> dict:
+    """Reports the snapshot generation and load time, and which settings are set (never their values)."""
+    settings = _settings
+    return {
+        "generation": _generation,
+        "loaded_at": _loaded_at,
+        "set": {name: getattr(settings, name) is not None for name in Settings.model_fields},
+    }
+
+
+def install_reload_signal() -> bool:
+    """Makes SIGHUP reload the settings in the running event loop's process.
+
+    Returns False where that is not possible: off the main thread (e.g. under a test client)
+    or on platforms without SIGHUP.
+    """
+    if not hasattr(signal, "SIGHUP"):
+        return False
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_settings)
+    except (NotImplementedError, RuntimeError, ValueError):
+        return False
+    return True
+
+
+def remove_reload_signal() -> None:
+    if hasattr(signal, "SIGHUP"):
+        try:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
@@ -0,0 +1,258 @@
+import base64
+import calendar
+import hashlib
+import hmac
+import logging
+import secrets
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from tst_auth_svc.config import (
+    SESSION_REVOCATION_OVERLAP_SECONDS,
+    SESSION_REVOCATION_REFRESH_SECONDS,
+    SESSION_SIGNING_KEYS,
+    SESSION_TOKEN_FORMAT,
+    SESSION_TOKEN_TTL,
+)
+from tst_auth_svc.models.session import (
+    REVOKED_TOKEN_PREFIX,
+    TOKEN_TYPE_REVOKED,
+    TOKEN_TYPE_REVOKED_USER,
+    SessionToken,
+    token_digest,
+)
+
+"""
+This module implements stateless, HMAC-signed session tokens.
+
+A signed token carries the user id, issue time, expiry and a random token id, so it can be
+verified in pure CPU without a database round trip. Tokens look like
+
+    v1.<kid>.<base64url payload>.<base64url HMAC-SHA256>
+
+where kid names the key that signed it. The first configured key signs new tokens and every
+configured key is accepted for verification, which allows keys to be rotated by prepending
+a new one and dropping the old one once its tokens have expired.
+
+Logout revokes a signed token by writing a "revoked:" row to the sessions table and adding
+its token id to an in-memory RevocationSet; other workers pick the row up on their next
+periodic refresh. A row id is assigned at insert but the row only becomes visible at
+commit, so ids do not become visible in order; each refresh therefore re-reads an overlap
+of SESSION_REVOCATION_OVERLAP_SECONDS worth of rows it has read before. Revoking all of a
+user's sessions writes one row per user instead, revoking every token of that user issued
+up to (and within the same second as) the revocation.
+"""
+
+TOKEN_VERSION = "v1"
+_PAYLOAD = struct.Struct(">QII8s")  # user_id, issued_at, expires_at, token_id
+
+
+class SessionClaims(NamedTuple):
+    user_id: int
+    issued_at: int
+    expires_at: int
+    token_id: bytes
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def parse_key_set(spec: str) -> dict:
+    """Parses "kid1:secret1,kid0:secret0" into an ordered {kid: secret} dict (first key signs)."""
+    keys = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        kid, sep, secret = item.partition(":")
+        if not sep or not kid or not secret or "." in kid:
+            raise ValueError("Signing keys must be given as kid:secret pairs and kids may not contain '.'")
+        keys[kid] = secret.encode("utf-8")
+    return keys
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_VERSION + ".")
+
+
+class TokenSigner:
+    """Issues and verifies signed session tokens with a rotating HMAC key set.
+
+    Args:
+        keys (dict): Ordered {kid: secret bytes}; the first entry signs new tokens.
+        ttl (int): Lifetime of issued tokens in seconds.
+    """
+
+    def __init__(self, keys: dict, ttl: int):
+        self.keys = dict(keys)
+        self.ttl = ttl
+        self.active_kid = next(iter(self.keys), None)
+
+    def _sign(self, secret: bytes, signing_input: str) -> str:
+        return _b64encode(hmac.new(secret, signing_input.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, user_id: int, now: Optional[float] = None) -> str:
+        if self.active_kid is None:
+            raise RuntimeError("No session signing key is configured")
+        issued_at = int(now if now is not None else time.time())
+        payload = _PAYLOAD.pack(user_id, issued_at, issued_at + self.ttl, secrets.token_bytes(8))
+        signing_input = f"{TOKEN_VERSION}.{self.active_kid}.{_b64encode(payload)}"
+        return f"{signing_input}.{self._sign(self.keys[self.active_kid], signing_input)}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[SessionClaims]:
+        """Returns the token's claims, or None if it is malformed, forged, signed by an unknown key or expired."""
+        parts = token.split(".")
+        if len(parts) != 4 or parts[0] != TOKEN_VERSION:
+            return None
+        secret = self.keys.get(parts[1])
+        if secret is None:
+            return None
+        signing_input = token[:token.rindex(".")]
+        if not hmac.compare_digest(self._sign(secret, signing_input), parts[3]):
+            return None
+        try:
+            claims = SessionClaims(*_PAYLOAD.unpack(_b64decode(parts[2])))
+        except (ValueError, struct.error):
+            return None
+        if claims.expires_at <= (now if now is not None else time.time()):
+            return None
+        return claims
+
+
+def revocation_record(claims: SessionClaims) -> str:
+    """sessions.session_token value persisting the revocation of a signed token."""
+    return f"{REVOKED_TOKEN_PREFIX}{claims.token_id.hex()}:{claims.expires_at}"
+
+
+def user_revocation(user_id: int, cutoff: int, ttl: int = SESSION_TOKEN_TTL) -> SessionToken:
+    """sessions row revoking every signed token of a user issued at or before cutoff.
+
+    It expires once the last of those tokens would have.
+    """
+    record = f"{REVOKED_TOKEN_PREFIX}user:{user_id}:{cutoff}:{secrets.token_hex(4)}"
+    return SessionToken(user_id=user_id, session_token=record,
+                        token_type=TOKEN_TYPE_REVOKED_USER, created_at=datetime.utcfromtimestamp(cutoff),
+                        expires_at=datetime.utcfromtimestamp(cutoff + ttl))
+
+
+class RevocationSet:
+    """Compact in-memory set of revoked signed tokens, mirrored from the sessions table.
+
+    Entries are the digests of the tokens' revocation records (the form in which the
+    sessions table stores them) mapped to their expiry, and are pruned once the token
+    would have expired anyway, so the set only holds revocations that still matter.
+    Per-user revocations are kept as user id -> (issued-at cutoff, expiry).
+
+    Args:
+        refresh_interval (float): Minimum seconds between two refreshes from the database.
+        overlap (float): Seconds of already-read id range each refresh reads again, so a
+            row that commits after rows with higher ids were read is still picked up, as
+            long as its transaction took less than this.
+        clock (callable, optional): Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, refresh_interval: float, overlap: float = SESSION_REVOCATION_OVERLAP_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.refresh_interval = refresh_interval
+        self.overlap = overlap
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._users = {}
+        self._last_row_id = 0
+        # (time a refresh finished, highest id read by then), oldest first
+        self._marks = deque([(float("-inf"), 0)])
+        self._last_refresh = float("-inf")
+
+    def add(self, claims: SessionClaims) -> None:
+        with self._lock:
+            self._revoked[token_digest(revocation_record(claims))] = claims.expires_at
+
+    def add_user(self, user_id: int, cutoff: int, expires_at: int) -> None:
+        with self._lock:
+            self._add_user(user_id, cutoff, expires_at)
+
+    def _add_user(self, user_id: int, cutoff: int, expires_at: int) -> None:
+        if cutoff > self._users.get(user_id, (-1, 0))[0]:
+            self._users[user_id] = (cutoff, expires_at)
+
+    def is_revoked(self, claims: SessionClaims) -> bool:
+        user = self._users.get(claims.user_id)
+        if user is not None and claims.issued_at <= user[0]:
+            return True
+        return token_digest(revocation_record(claims)) in self._revoked
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+            self._users.clear()
+            self._last_row_id = 0
+            self._marks = deque([(float("-inf"), 0)])
+            self._last_refresh = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._revoked) + len(self._users)
+
+    async def maybe_refresh(self, db) -> None:
+        """Loads revocations written by other workers, at most once per refresh interval.
+
+        A row that became visible since the previous refresh started got its id at most
+        `overlap` seconds before that (if its transaction was shorter), so its id is above
+        every id read by a refresh that had finished by then. The scan starts at that
+        high-water mark (at 0 until there is one); rows read before are merged again harmlessly.
+        """
+        started = self.clock()
+        previous = self._last_refresh
+        if started - previous < self.refresh_interval:
+            return
+        self._last_refresh = started
+        with self._lock:
+            while len(self._marks) > 1 and self._marks[1][0] <= previous - self.overlap:
+                self._marks.popleft()
+            start_after = self._marks[0][1]
+        result = await db.execute(
+            select(SessionToken.id, SessionToken.session_token, SessionToken.expires_at, SessionToken.token_type,
+                   SessionToken.user_id, SessionToken.created_at)
+            .where(SessionToken.id > start_after)
+            .where(SessionToken.token_type.in_((TOKEN_TYPE_REVOKED, TOKEN_TYPE_REVOKED_USER)))
+            .order_by(SessionToken.id)
+        )
+        now = time.time()
+        with self._lock:
+            for row_id, digest, expires_at, kind, user_id, created_at in result.all():
+                self._last_row_id = max(self._last_row_id, row_id)
+                if expires_at is None:
+                    logging.warning("Ignoring revocation record %s without an expiry", row_id)
+                    continue
+                expires_at = calendar.timegm(expires_at.utctimetuple())
+                if kind == TOKEN_TYPE_REVOKED_USER:
+                    self._add_user(user_id, calendar.timegm(created_at.utctimetuple()), expires_at)
+                else:
+                    self._revoked[digest] = expires_at
+            for token_id in [t for t, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[token_id]
+            for user_id in [u for u, (_, expires_at) in self._users.items() if expires_at <= now]:
+                del self._users[user_id]
+            self._marks.append((self.clock(), self._last_row_id))
+
+
+token_signer = TokenSigner(parse_key_set(SESSION_SIGNING_KEYS), SESSION_TOKEN_TTL)
+revocations = RevocationSet(SESSION_REVOCATION_REFRESH_SECONDS)
+
+
+def signed_tokens_enabled() -> bool:
+    return SESSION_TOKEN_FORMAT == "signed"
+
+
+if SESSION_TOKEN_FORMAT not in ("opaque", "signed"):
+    raise RuntimeError(f"Unsupported SESSION_TOKEN_FORMAT: {SESSION_TOKEN_FORMAT}")
+if signed_tokens_enabled() and token_signer.active_kid is None:
+    raise RuntimeError("SESSION_TOKEN_FORMAT=signed requires SESSION_SIGNING_KEYS")
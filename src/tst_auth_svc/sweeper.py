@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import delete, select
+
+from tst_auth_svc.config import SESSION_SWEEP_BATCH_SIZE, SESSION_SWEEP_INTERVAL, SESSION_SWEEP_MAX_ROWS_PER_SECOND
+from tst_auth_svc.models.base import AsyncDbSession, open_session
+from tst_auth_svc.models.session import SessionToken
+
+"""
+This module deletes expired rows (sessions, reset tokens and revocation records) from the
+sessions table in the background.
+
+Each cycle removes rows whose expires_at has passed in batches of at most
+SESSION_SWEEP_BATCH_SIZE, committing after every batch so no delete holds its locks for
+long, and pauses between batches to stay under SESSION_SWEEP_MAX_ROWS_PER_SECOND.
+"""
+
+
+class SessionSweeper:
+    """Periodically range-deletes expired sessions rows in bounded, rate-limited batches.
+
+    Args:
+        interval (float): Seconds between sweep cycles; 0 disables the background task.
+        batch_size (int): Maximum rows deleted per statement (and per transaction).
+        max_rows_per_second (float): Deletion rate cap across batches; 0 means unthrottled.
+        session_factory (callable, optional): Returns the AsyncDbSession a cycle runs on.
+    """
+
+    def __init__(self, interval: float, batch_size: int, max_rows_per_second: float,
+                 session_factory: Callable[[], AsyncDbSession] = open_session):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_rows_per_second = max_rows_per_second
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._cycles = 0
+        self._errors = 0
+        self._rows_swept = 0
+        self._last_cycle = None
+
+    async def sweep_once(self, now: Optional[datetime] = None) -> dict:
+        """Runs one sweep cycle and returns what it removed."""
+        now = now or datetime.utcnow()
+        started = time.monotonic()
+        rows = batches = 0
+        db = self.session_factory()
+        try:
+            while True:
+                # Walk the expires_at index for a bounded batch, then delete by primary key
+                ids = (await db.execute(
+                    select(SessionToken.id)
+                    .where(SessionToken.expires_at <= now)
+                    .order_by(SessionToken.expires_at)
+                    .limit(self.batch_size)
+                )).scalars().all()
+                if not ids:
+                    await db.rollback()
+                    break
+                await db.execute(delete(SessionToken).where(SessionToken.id.in_(ids)))
+                await db.commit()
+                rows += len(ids)
+                batches += 1
+                if len(ids) < self.batch_size:
+                    break
+                if self.max_rows_per_second > 0:
+                    await asyncio.sleep(len(ids) / self.max_rows_per_second)
+        finally:
+            await db.close()
+
+        cycle = {
+            "rows_swept": rows,
+            "batches": batches,
+            "duration_ms": (time.monotonic() - started) * 1000,
+            "finished_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self._cycles += 1
+            self._rows_swept += rows
+            self._last_cycle = cycle
+        logging.info("Session sweep removed %d expired rows in %d batches (%.1f ms)",
+                     rows, batches, cycle["duration_ms"])
+        return cycle
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                logging.error(e, exc_info=True)
+
+    def start(self) -> None:
+        """Starts the background task on the running event loop (no-op if disabled or running)."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._task is not None,
+                "interval_seconds": self.interval,
+                "batch_size": self.batch_size,
+                "max_rows_per_second": self.max_rows_per_second,
+                "cycles": self._cycles,
+                "errors": self._errors,
+                "rows_swept_total": self._rows_swept,
+                "last_cycle": self._last_cycle,
+            }
+
+
+session_sweeper = SessionSweeper(SESSION_SWEEP_INTERVAL, SESSION_SWEEP_BATCH_SIZE, SESSION_SWEEP_MAX_ROWS_PER_SECOND)
@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import re
+import sys
+import time
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Optional, Tuple, Union
+
+from pydantic import BaseModel, EmailStr, Field, ValidationError, field_validator, model_validator
+from sqlalchemy import select
+
+from tst_auth_svc.config import (
+    BCRYPT_MAX_ROUNDS,
+    BCRYPT_MIN_ROUNDS,
+    BCRYPT_TARGET_MS,
+    BULK_IMPORT_BATCH_SIZE,
+    BULK_IMPORT_HASH_CONCURRENCY,
+    BULK_IMPORT_MAX_LINE_BYTES,
+)
+from tst_auth_svc.hashing import HashingExecutor, get_hasher
+from tst_auth_svc.models.base import AsyncDbSession, open_session
+from tst_auth_svc.models.user import User
+
+"""
+This module bulk-creates users, for migrating accounts from another system.
+
+Input is consumed incrementally, one batch of BULK_IMPORT_BATCH_SIZE rows at a time, so
+memory stays bounded however large the input is. Each row carries a username, an email and
+either a plaintext password, hashed here with bcrypt at the current cost, or an existing
+bcrypt hash (password_hash), stored as is; logins later re-hash it at the current cost.
+
+Per batch, one SELECT finds usernames and emails that are already taken, so those rows are
+reported as conflicts without paying for bcrypt, and the remaining rows go in with one
+multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING, committed as one transaction. A row
+the INSERT skipped (a concurrent /register won) is reported as a conflict too. Re-running
+an interrupted import is therefore safe and cheap: rows imported before are conflicts.
+
+The same pipeline backs POST /internal/users/import (which requires the internal API
+token, see tst_auth_svc.internal_auth), fed from the streamed NDJSON request body and
+hashing on the shared executor with at most BULK_IMPORT_HASH_CONCURRENCY hashes in flight,
+and the tst_auth_svc_import script, which reads NDJSON or CSV and hashes on its own
+process pool.
+"""
+
+# Modular crypt format of the bcrypt variants the bcrypt package verifies
+BCRYPT_HASH_PATTERN = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+# Same rule as /register
+PASSWORD_MIN_LENGTH = 6
+
+
+class ImportRecord(BaseModel):
+    username: str = Field(min_length=1, max_length=50)
+    email: EmailStr = Field(max_length=255)
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+
+    @field_validator("password")
+    @classmethod
+    def password_min_length(cls, v):
+        if v is not None and len(v) < PASSWORD_MIN_LENGTH:
+            raise ValueError(f"Password must be at least {PASSWORD_MIN_LENGTH} characters long")
+        return v
+
+    @field_validator("password_hash")
+    @classmethod
+    def password_hash_is_bcrypt(cls, v):
+        if v is not None and not BCRYPT_HASH_PATTERN.match(v):
+            raise ValueError("password_hash must be a bcrypt hash ($2a$, $2b$ or $2y$)")
+        return v
+
+    @model_validator(mode="after")
+    def exactly_one_password(self):
+        if (self.password is None) == (self.password_hash is None):
+            raise ValueError("Exactly one of password and password_hash is required")
+        return self
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def _decode_line(line: bytes) -> Union[dict, str, None]:
+    """Parses one NDJSON line: the object, an error message, or None for a blank line."""
+    if not line.strip():
+        return None
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        return f"Invalid JSON: {e}"
+    return item if isinstance(item, dict) else "Expected a JSON object"
+
+
+async def ndjson_rows(chunks: AsyncIterable[bytes],
+                      max_line_bytes: int = BULK_IMPORT_MAX_LINE_BYTES) -> AsyncIterator[Tuple[int, Union[dict, str]]]:
+    """Splits a stream of byte chunks into NDJSON rows, yielding (line number, object or error).
+
+    At most one line (up to max_line_bytes) is buffered; longer lines are discarded as they
+    arrive and reported as errors. Blank lines are skipped.
+    """
+    buffer = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        while (end := buffer.find(b"\n")) >= 0:
+            line = bytes(buffer[:end])
+            del buffer[:end + 1]
+            line_number += 1
+            if oversized:
+                oversized = False
+                yield line_number, f"Line longer than {max_line_bytes} bytes"
+            elif (item := _decode_line(line)) is not None:
+                yield line_number, item
+        if len(buffer) > max_line_bytes:
+            buffer.clear()
+            oversized = True
+    if oversized:
+        yield line_number + 1, f"Line longer than {max_line_bytes} bytes"
+    elif (item := _decode_line(bytes(buffer))) is not None:
+        yield line_number + 1, item
+
+
+def csv_rows(lines: Iterable[str]) -> Iterable[Tuple[int, dict]]:
+    """Reads CSV with a header row, yielding (line number, row); empty cells are left out."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key is not None and value not in (None, "")}
+
+
+def _insert_ignoring_conflicts(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Bulk import needs INSERT ... ON CONFLICT, unsupported on {dialect_name}")
+    users = User.__table__
+    return lambda rows: insert(users).values(rows).on_conflict_do_nothing().returning(users.c.username)
+
+
+def _conflict(line: int, record: ImportRecord, fields: list) -> dict:
+    return {"line": line, "status": "conflict", "username": record.username, "fields": fields}
+
+
+class UserImporter:
+    """Creates users from a stream of rows in batched, separately committed transactions.
+
+    Args:
+        batch_size (int): Rows per SELECT/INSERT round and per transaction.
+        hash_concurrency (int): Plaintext passwords hashed at the same time.
+        hasher (HashingExecutor, optional): Executor for bcrypt; the shared one by default.
+        session_factory (callable, optional): Returns the AsyncDbSession a batch runs on.
+    """
+
+    def __init__(self, batch_size: int = BULK_IMPORT_BATCH_SIZE, hash_concurrency: int = BULK_IMPORT_HASH_CONCURRENCY,
+                 hasher: Optional[HashingExecutor] = None,
+                 session_factory: Callable[[], AsyncDbSession] = open_session):
+        self.batch_size = max(1, batch_size)
+        self.hash_concurrency = max(1, hash_concurrency)
+        self.hasher = hasher
+        self.session_factory = session_factory
+
+    async def run(self, rows: AsyncIterable[Tuple[int, Union[dict, str]]]) -> AsyncIterator[dict]:
+        """Imports every row, yielding a result per row that was not imported, then a summary.
+
+        Rows come as (line number, parsed object or parse error). A result has the row's line
+        and a status of "invalid", "conflict" (with the taken fields) or "error"; the summary
+        has a status of "done", or "failed" if the import stopped early, and the totals.
+        Batches committed before a failure stay committed.
+        """
+        started = time.monotonic()
+        totals = {"rows": 0, "inserted": 0, "conflicts": 0, "invalid": 0, "errors": 0, "hashed": 0, "batches": 0}
+        batch = []
+        try:
+            async for line, item in rows:
+                totals["rows"] += 1
+                try:
+                    if isinstance(item, str):
+                        raise ValueError(item)
+                    batch.append((line, ImportRecord.model_validate(item)))
+                except (ValueError, ValidationError) as e:
+                    totals["invalid"] += 1
+                    message = _validation_message(e) if isinstance(e, ValidationError) else str(e)
+                    yield {"line": line, "status": "invalid", "error": message}
+                    continue
+                if len(batch) >= self.batch_size:
+                    for result in await self._import_batch(batch, totals):
+                        yield result
+                    batch = []
+            if batch:
+                for result in await self._import_batch(batch, totals):
+                    yield result
+        except Exception as e:
+            logging.error(e, exc_info=True)
+            yield {"status": "failed", "error": "Internal server error", **totals,
+                   "duration_seconds": round(time.monotonic() - started, 3)}
+            return
+        yield {"status": "done", **totals, "duration_seconds": round(time.monotonic() - started, 3)}
+
+    async def _hash_all(self, records: list) -> list:
+        """Hashes plaintext passwords in parallel; returns a hash or the exception per record."""
+        hasher = self.hasher or get_hasher()
+        slots = asyncio.Semaphore(self.hash_concurrency)
+
+        async def hash_one(record: ImportRecord) -> str:
+            async with slots:
+                return await hasher.hash_password(record.password)
+
+        return await asyncio.gather(*(hash_one(record) for record in records), return_exceptions=True)
+
+    async def _import_batch(self, batch: list, totals: dict) -> list:
+        results = []
+        # Within a batch the first row with a given username or email wins
+        seen_usernames, seen_emails, candidates = set(), set(), []
+        for line, record in batch:
+            fields = [field for field, seen in (("username", seen_usernames), ("email", seen_emails))
+                      if getattr(record, field) in seen]
+            if fields:
+                results.append(_conflict(line, record, fields))
+                continue
+            seen_usernames.add(record.username)
+            seen_emails.add(record.email)
+            candidates.append((line, record))
+
+        db = self.session_factory()
+        try:
+            # Rows whose username or email is taken are rejected before any bcrypt work
+            existing = (await db.execute(
+                select(User.username, User.email)
+                .where(User.username.in_(seen_usernames) | User.email.in_(seen_emails))
+            )).all()
+            # End the read transaction so the pooled connection is not held while bcrypt runs
+            await db.rollback()
+            taken_usernames = {row.username for row in existing}
+            taken_emails = {row.email for row in existing}
+            pending = []
+            for line, record in candidates:
+                fields = [field for field, taken in (("username", taken_usernames), ("email", taken_emails))
+                          if getattr(record, field) in taken]
+                if fields:
+                    results.append(_conflict(line, record, fields))
+                else:
+                    pending.append((line, record))
+
+            plaintext = [record for _, record in pending if record.password_hash is None]
+            hashes = iter(await self._hash_all(plaintext))
+            totals["hashed"] += len(plaintext)
+            rows, inserting = [], []
+            for line, record in pending:
+                hashed = record.password_hash if record.password_hash is not None else next(hashes)
+                if isinstance(hashed, Exception):
+                    logging.error(hashed, exc_info=hashed)
+                    results.append({"line": line, "status": "error", "error": "Error processing password encryption."})
+                    continue
+                rows.append({"username": record.username, "email": record.email, "password": hashed})
+                inserting.append((line, record))
+
+            inserted = set()
+            if rows:
+                insert_rows = _insert_ignoring_conflicts(db.sync_session.get_bind().dialect.name)
+                inserted = set((await db.execute(insert_rows(rows))).scalars().all())
+                await db.commit()
+            skipped = [(line, record) for line, record in inserting if record.username not in inserted]
+            if skipped:
+                # Lost a race with a concurrent insert; look up what it took
+                existing = (await db.execute(
+                    select(User.username, User.email).where(
+                        User.username.in_([record.username for _, record in skipped])
+                        | User.email.in_([record.email for _, record in skipped]))
+                )).all()
+                await db.rollback()
+                taken = {("username", row.username) for row in existing} | {("email", row.email) for row in existing}
+                for line, record in skipped:
+                    results.append(_conflict(line, record, [field for field in ("username", "email")
+                                                            if (field, getattr(record, field)) in taken]))
+        finally:
+            await db.close()
+
+        results.sort(key=lambda result: result["line"])
+        totals["batches"] += 1
+        totals["inserted"] += len(inserted)
+        totals["conflicts"] += sum(1 for result in results if result["status"] == "conflict")
+        totals["errors"] += sum(1 for result in results if result["status"] == "error")
+        logging.info("User import: %d rows read, %d inserted, %d conflicts in %d batches",
+                     totals["rows"], totals["inserted"], totals["conflicts"], totals["batches"])
+        return results
+
+
+user_importer = UserImporter()
+
+
+async def _file_chunks(stream, size: int = 65536) -> AsyncIterator[bytes]:
+    while chunk := stream.read(size):
+        yield chunk
+
+
+async def _iterate(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+async def _import_file(args, output) -> dict:
+    hasher = HashingExecutor(kind="process", max_workers=args.workers or None)
+    if BCRYPT_TARGET_MS > 0:
+        await hasher.calibrate(BCRYPT_TARGET_MS, BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS)
+    importer = UserImporter(batch_size=args.batch_size, hash_concurrency=hasher.max_workers * 2, hasher=hasher)
+    binary = args.format == "ndjson"
+    source = (sys.stdin.buffer if binary else sys.stdin) if args.path == "-" else \
+        open(args.path, "rb" if binary else "r", newline=None if binary else "")
+    summary = {}
+    try:
+        rows = ndjson_rows(_file_chunks(source)) if binary else _iterate(csv_rows(source))
+        async for result in importer.run(rows):
+            output.write(json.dumps(result) + "\n")
+            summary = result
+    finally:
+        if source not in (sys.stdin, sys.stdin.buffer):
+            source.close()
+        hasher.shutdown()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-create users from an NDJSON or CSV file.")
+    parser.add_argument("path", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"],
+                        help="input format (default: csv for .csv files, ndjson otherwise)")
+    parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--workers", type=int, default=0, help="bcrypt worker processes (default: one per CPU)")
+    parser.add_argument("--report", help="write per-row results here instead of stdout")
+    args = parser.parse_args()
+    args.format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    logging.basicConfig(level=logging.INFO)
+    output = open(args.report, "w") if args.report else sys.stdout
+    try:
+        summary = asyncio.run(_import_file(args, output))
+    finally:
+        if args.report:
+            output.close()
+    sys.exit(0 if summary.get("status") == "done" else 1)
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import secrets
+import time
+from typing import Callable, Optional
+
+import bcrypt
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from tst_auth_svc.config import WARMUP_BACKGROUND, WARMUP_ENABLED, WARMUP_POOL_CONNECTIONS, WARMUP_TIMEOUT_SECONDS
+from tst_auth_svc.hashing import get_hasher
+from tst_auth_svc.models.base import AsyncDbSession, get_async_engine, get_engine, open_session
+from tst_auth_svc.models.session import SessionToken
+from tst_auth_svc.models.user import User
+from tst_auth_svc.replicas import replica_set
+from tst_auth_svc.session_store import get_session_store
+
+"""
+This module pays the service's cold-start costs before it takes traffic, so the first
+requests after a deploy or scale-out are not a latency spike.
+
+The warm-up runs in the lifespan startup and, step by step:
+
+    mappers     configures the SQLAlchemy mappers
+    pool        opens up to WARMUP_POOL_CONNECTIONS connections on the primary and each
+                replica, and returns them to the pool
+    statements  runs the hot-path statements (login and password-reset lookups, session
+                lookup and delete, password update, user and session inserts) with values
+                that match nothing, in a transaction that is rolled back, so SQLAlchemy's
+                statement cache is filled; this also reaches the session store and replicas
+    models      validates every route's request and response model once and builds the
+                OpenAPI schema
+    hashing     starts every worker of the hashing executor with a cheap bcrypt check
+
+A failing step is logged and reported; the others still run. The whole warm-up is bounded
+by WARMUP_TIMEOUT_SECONDS, after which the service serves anyway.
+
+By default startup waits for the warm-up, so no connection is accepted cold (a listening
+socket gets traffic whatever /ready says). With WARMUP_BACKGROUND the service starts
+listening at once and warms up behind /ready, for platforms whose liveness checks would
+not wait. Either way /ready answers 200 only once the warm-up is over, and 503 again once
+shutdown begins.
+"""
+
+
+def _open_connections(bind, count: int) -> int:
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(bind.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def _open_async_connections(bind: AsyncEngine, count: int) -> int:
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await bind.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+
+class Warmup:
+    """Runs the startup warm-up and tracks whether the service is ready.
+
+    Args:
+        pool_connections (int): Connections to pre-open per engine (capped by the pool size).
+        timeout (float): Seconds the whole warm-up may take.
+        session_factory (callable, optional): Returns the AsyncDbSession statements run on.
+    """
+
+    def __init__(self, pool_connections: int, timeout: float,
+                 session_factory: Callable[[], AsyncDbSession] = open_session):
+        self.pool_connections = pool_connections
+        self.timeout = timeout
+        self.session_factory = session_factory
+        self.ready = False
+        self.state = "starting"
+        self._steps = {}
+        self._duration_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _step(self, name: str, fn, *args) -> None:
+        started = time.perf_counter()
+        try:
+            result = await fn(*args)
+            self._steps[name] = {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 3)}
+            if result is not None:
+                self._steps[name]["result"] = result
+        except Exception as e:
+            logging.warning("Warm-up step %s failed: %s", name, e)
+            self._steps[name] = {"ok": False, "ms": round((time.perf_counter() - started) * 1000, 3),
+                                 "error": str(e)}
+
+    async def _mappers(self) -> None:
+        await run_in_threadpool(configure_mappers)
+
+    async def _pool(self) -> dict:
+        opened = {}
+        for name, bind in [("primary", get_async_engine() or get_engine())] + [
+                (f"replica{i}", replica) for i, replica in enumerate(replica_set.engines())]:
+            pool = getattr(bind, "sync_engine", bind).pool
+            # Single-connection pools (in-memory SQLite) have nothing more to open
+            count = min(self.pool_connections, pool.size()) if isinstance(pool, QueuePool) else 1
+            if isinstance(bind, AsyncEngine):
+                opened[name] = await _open_async_connections(bind, count)
+            else:
+                opened[name] = await run_in_threadpool(_open_connections, bind, count)
+        return opened
+
+    async def _statements(self) -> None:
+        nothing = f"warmup-{secrets.token_hex(8)}"
+        store = get_session_store()
+        db = self.session_factory()
+        try:
+            await replica_set.first(db, select(User.id, User.password).where(User.username == nothing))
+            await replica_set.first(db, select(User.id).where((User.username == nothing) | (User.email == nothing)))
+            await replica_set.first(db, select(User.id).where(User.email == nothing))
+            await db.rollback()
+            await store.lookup(db, nothing)
+            await store.delete(db, nothing, commit=False)
+            await db.execute(update(User).where(User.id == -1).values(password=nothing))
+            # Rolled back below: only the INSERT statements' compilation is kept
+            user = User(username=nothing, email=f"{nothing}@warmup.invalid", password=nothing)
+            db.add(user)
+            await db.flush()
+            db.add(SessionToken(user_id=user.id, session_token=nothing))
+            await db.flush()
+        finally:
+            await db.rollback()
+            await db.close()
+
+    async def _models(self, app: FastAPI) -> int:
+        exercised = 0
+        for route in app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            for field in (route.body_field, route.response_field):
+                if field is not None:
+                    # Validation errors are expected: the point is to run the validators once
+                    field.validate({}, {}, loc=("body",))
+                    exercised += 1
+        app.openapi()
+        return exercised
+
+    async def _hashing(self) -> int:
+        hasher = get_hasher()
+        hashed = bcrypt.hashpw(b"warmup", bcrypt.gensalt(4)).decode("utf-8")
+        await asyncio.gather(*(hasher.verify_password("warmup", hashed) for _ in range(hasher.max_workers)))
+        return hasher.max_workers
+
+    async def _run(self, app: FastAPI) -> None:
+        await self._step("mappers", self._mappers)
+        await self._step("pool", self._pool)
+        await self._step("statements", self._statements)
+        await self._step("models", self._models, app)
+        await self._step("hashing", self._hashing)
+
+    async def run(self, app: FastAPI) -> None:
+        """Warms the service up (within the timeout) and marks it ready."""
+        started = time.perf_counter()
+        self.state = "warming"
+        try:
+            await asyncio.wait_for(self._run(app), self.timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Warm-up did not finish within %ss; serving anyway", self.timeout)
+        self._duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        logging.info("Warm-up finished in %.0f ms", self._duration_ms)
+        self.mark_ready()
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.state = "ready"
+
+    def mark_stopping(self) -> None:
+        self.ready = False
+        self.state = "stopping"
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "state": self.state, "duration_ms": self._duration_ms,
+                "steps": dict(self._steps)}
+
+    async def start(self, app: FastAPI, enabled: bool = True, background: bool = False) -> None:
+        """Lifespan startup hook: warms up now, in a background task, or not at all."""
+        if not enabled:
+            self.mark_ready()
+        elif background:
+            self.state = "warming"
+            self._task = asyncio.create_task(self.run(app))
+        else:
+            await self.run(app)
+
+    async def stop(self) -> None:
+        """Lifespan shutdown hook: reports not ready and abandons a warm-up still running."""
+        self.mark_stopping()
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+warmup = Warmup(WARMUP_POOL_CONNECTIONS, WARMUP_TIMEOUT_SECONDS)
+
+
+async def warm_up(app: FastAPI) -> None:
+    await warmup.start(app, enabled=WARMUP_ENABLED, background=WARMUP_BACKGROUND)
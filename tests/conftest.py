@@ -1,10 +1,14 @@
 import pytest
 from fastapi.testclient import TestClient
+from pydantic import SecretStr
 from sqlalchemy import StaticPool, create_engine
 from sqlalchemy.orm import sessionmaker
 
 from tst_auth_svc.app import app
 from tst_auth_svc.models.base import Base, get_db
+from tst_auth_svc import settings as settings_module
+from tst_auth_svc.internal_auth import INTERNAL_TOKEN_HEADER
+from tst_auth_svc.settings import Settings, get_settings
 
 
 # DO NOT MODIFY SECTION START
@@ -39,4 +43,22 @@ def client(session_local):
     with TestClient(app) as c:
         yield c
     app.dependency_overrides[get_db] = get_db
-# DO NOT MODIFY SECTION END
\ No newline at end of file
+# DO NOT MODIFY SECTION END
+
+@pytest.fixture
+def google_settings():
+    settings = Settings(google_client_id='test_client_id', google_client_secret='test_client_secret',
+                        google_redirect_uri='http://testserver/google-callback')
+    app.dependency_overrides[get_settings] = lambda: settings
+    yield settings
+    app.dependency_overrides.pop(get_settings, None)
+
+
+@pytest.fixture
+def internal_headers(monkeypatch):
+    """Configures an internal API token (in the snapshot and for reloads); returns the headers carrying it."""
+    token = "test-internal-token"
+    monkeypatch.setenv("INTERNAL_API_TOKEN", token)
+    monkeypatch.setattr(settings_module, "_settings",
+                        settings_module._settings.model_copy(update={"internal_api_token": SecretStr(token)}))
+    return {INTERNAL_TOKEN_HEADER: token}
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from tst_auth_svc.admission import AdmissionController, AdmissionRejected, get_controller
+
+
+def test_admits_up_to_limit_and_hands_slot_to_waiter():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=1, queue_timeout=1.0)
+
+    async def scenario():
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 1
+        controller.release()
+        await waiter
+        assert controller.stats()["in_flight"] == 1
+        controller.release()
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2
+    assert stats["queued"] == 1
+
+
+def test_rejects_when_queue_deadline_expires():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=4, queue_timeout=0.01)
+
+    async def scenario():
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        controller.release()
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats["rejected_timeout"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_rejects_immediately_when_queue_full():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=0, queue_timeout=10.0)
+
+    async def scenario():
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        controller.release()
+
+    asyncio.run(scenario())
+    assert controller.stats()["rejected_queue_full"] == 1
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=1, queue_timeout=10.0)
+
+    async def scenario():
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        controller.release()
+
+    asyncio.run(scenario())
+    stats = controller.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_login_shed_with_503_before_hashing(monkeypatch, client):
+    async def fail_if_called(*args, **kwargs):
+        raise AssertionError("bcrypt must not run for a shed request")
+
+    monkeypatch.setattr('tst_auth_svc.routers.login.verify_password', fail_if_called)
+    controller = get_controller("login")
+    monkeypatch.setattr(controller, "max_in_flight", 0)
+    monkeypatch.setattr(controller, "max_queue", 0)
+
+    response = client.post("/login", json={"username": "someone", "password": "whatever"})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers.get("retry-after") == str(controller.retry_after)
+
+    counters = client.get("/internal/admission").json()
+    assert counters["login"]["rejected_queue_full"] >= 1
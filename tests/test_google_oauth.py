@@ -6,11 +6,7 @@ import logging
 from fastapi import status
 
 
-def test_google_login_redirect(monkeypatch, client):
-    # Set environment variables
-    monkeypatch.setenv('GOOGLE_CLIENT_ID', 'test_client_id')
-    monkeypatch.setenv('GOOGLE_CLIENT_SECRET', 'test_client_secret')
-    monkeypatch.setenv('GOOGLE_REDIRECT_URI', 'http://testserver/google-callback')
+def test_google_login_redirect(monkeypatch, client, google_settings):
 
     # Mock the generate_auth_url function in the google_oauth router since it was imported at module level
     def fake_generate_auth_url(client_id, redirect_uri):
@@ -26,11 +22,7 @@ def test_google_login_redirect(monkeypatch, client):
     assert response.headers.get('location') == 'http://fake.google.auth/url'
 
 
-def test_google_callback_success(monkeypatch, client, db_session):
-    # Set environment variables
-    monkeypatch.setenv('GOOGLE_CLIENT_ID', 'test_client_id')
-    monkeypatch.setenv('GOOGLE_CLIENT_SECRET', 'test_client_secret')
-    monkeypatch.setenv('GOOGLE_REDIRECT_URI', 'http://testserver/google-callback')
+def test_google_callback_success(monkeypatch, client, db_session, google_settings):
 
     # Prepare a fake token response
     fake_tokens = {
@@ -40,7 +32,7 @@ def test_google_callback_success(monkeypatch, client, db_session):
     }
 
     # Monkeypatch the exchange_code_for_tokens function in the google_oauth module
-    def fake_exchange_code_for_tokens(code, client_id, client_secret, redirect_uri):
+    async def fake_exchange_code_for_tokens(code, client_id, client_secret, redirect_uri):
         if code == 'valid_code':
             return fake_tokens
         raise Exception('Invalid code')
@@ -69,14 +61,10 @@ def test_google_callback_missing_code(client):
     assert 'Authorization code is missing' in data.get('detail', '')
 
 
-def test_google_callback_invalid_tokens(monkeypatch, client):
-    # Set environment variables
-    monkeypatch.setenv('GOOGLE_CLIENT_ID', 'test_client_id')
-    monkeypatch.setenv('GOOGLE_CLIENT_SECRET', 'test_client_secret')
-    monkeypatch.setenv('GOOGLE_REDIRECT_URI', 'http://testserver/google-callback')
+def test_google_callback_invalid_tokens(monkeypatch, client, google_settings):
 
     # Monkeypatch the exchange function to return incomplete tokens
-    def fake_exchange_code_for_tokens(code, client_id, client_secret, redirect_uri):
+    async def fake_exchange_code_for_tokens(code, client_id, client_secret, redirect_uri):
         return {'access_token': 'dummy'}  # missing id_token and email
 
     monkeypatch.setattr('tst_auth_svc.routers.google_oauth.exchange_code_for_tokens', fake_exchange_code_for_tokens)
@@ -87,11 +75,7 @@ def test_google_callback_invalid_tokens(monkeypatch, client):
     assert 'Invalid token exchange response' in data.get('detail', '')
 
 
-def test_google_callback_user_not_found(monkeypatch, client, db_session):
-    # Set environment variables
-    monkeypatch.setenv('GOOGLE_CLIENT_ID', 'test_client_id')
-    monkeypatch.setenv('GOOGLE_CLIENT_SECRET', 'test_client_secret')
-    monkeypatch.setenv('GOOGLE_REDIRECT_URI', 'http://testserver/google-callback')
+def test_google_callback_user_not_found(monkeypatch, client, db_session, google_settings):
 
     fake_tokens = {
         'access_token': 'dummy_access_token',
@@ -99,7 +83,7 @@ def test_google_callback_user_not_found(monkeypatch, client, db_session):
         'email': 'nonexistent@example.com'
     }
 
-    def fake_exchange_code_for_tokens(code, client_id, client_secret, redirect_uri):
+    async def fake_exchange_code_for_tokens(code, client_id, client_secret, redirect_uri):
         return fake_tokens
 
     monkeypatch.setattr('tst_auth_svc.routers.google_oauth.exchange_code_for_tokens', fake_exchange_code_for_tokens)
@@ -0,0 +1,239 @@
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from fastapi import status
+
+from tst_auth_svc.google_oauth_client import GoogleOAuthClient, GoogleOAuthError
+from tst_auth_svc.models.user import User
+
+# Throwaway 2048-bit RSA test key (public exponent 65537)
+N = int(
+    "bab7a6990048eae0814a5d0ed1aedf24d76a19b19c0417e600f9adb750a29aa009af149910a3ebcc094a04c319b72f5c"
+    "81a139fd5de410c22a18d7075f6585b7dd736697ae4af2559dd78a866954e87154abfd607c2a26b23fb84e20f6a48e51"
+    "1b3bef5e7f03809c01959fad565318d785f44d76707f26d994bb019304bc2794dd9fa1dc1ddadeb43c193901930612cc"
+    "1c5a096570ebda5183069667b7692d85a5ab4e7dd3352dbbb4c4aeac619f25058431356d46859edec972e5063a9d21be"
+    "11799181a61b1000ca45d49c964f3354b23b4a746b6f24300ffd9c66363d48708a705ea4045f75117aec4cd378d7335f"
+    "4a1ffcbade5038d8c1693f12ba0a8833",
+    16,
+)
+D = int(
+    "4819c0c85636d2140d7904c4432e0ed6f023f5760334057278aff167d7486303279a270f1040ec3de6dc61486176be60"
+    "2f626dbd2bf3749135a64fea75e90320c3efdb0ef96bd17644344636af17ed864dd6f849b8c8a216b4ca5bc918d4e46b"
+    "e76356849bf163495ac74758acfbfb9cc60a579b43c7a5dde133f160af3464e7cb3be19dfdd282101501315c806c39ef"
+    "ff172450ec1eee3690f6473f8abfe356d287ba434be6f938b24ae8519a668107be1fb20a754e82100def9bf8c512475f"
+    "de3fb204f9cd4bf36853d1ed5959c2f3024eea647f254d08de58647c73499e3024d69bf580d04a6295b20ee20710e31b"
+    "e67b6391ff0cc1e8c077cc3113a663f9",
+    16,
+)
+E = 65537
+CLIENT_ID = "test_client_id"
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def jwk(kid: str) -> dict:
+    return {"kty": "RSA", "alg": "RS256", "use": "sig", "kid": kid,
+            "n": b64(N.to_bytes(256, "big")), "e": b64(E.to_bytes(3, "big"))}
+
+
+def sign(claims: dict, kid: str = "k1", alg: str = "RS256") -> str:
+    signing_input = ".".join(b64(json.dumps(part).encode()) for part in ({"alg": alg, "kid": kid}, claims))
+    digest_info = bytes.fromhex("3031300d060960864801650304020105000420") + hashlib.sha256(
+        signing_input.encode()).digest()
+    encoded = b"\x00\x01" + b"\xff" * (256 - len(digest_info) - 3) + b"\x00" + digest_info
+    signature = pow(int.from_bytes(encoded, "big"), D, N).to_bytes(256, "big")
+    return f"{signing_input}.{b64(signature)}"
+
+
+def claims(**overrides) -> dict:
+    now = int(time.time())
+    return {"iss": "https://accounts.google.com", "aud": CLIENT_ID, "sub": "1234", "iat": now, "exp": now + 3600,
+            "email": "testuser@example.com", "email_verified": True, **overrides}
+
+
+class StandInGoogle:
+    """Local stand-in for Google's token and JWKS endpoints, counting hits."""
+
+    def __init__(self):
+        self.keys = [jwk("k1")]
+        self.cache_control = "public, max-age=3600"
+        self.id_token = sign(claims())
+        self.delay = 0.0
+        self.jwks_status = 200
+        self.hits = {"/token": 0, "/certs": 0}
+        self.forms = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, code: int, body: dict, headers: dict = None):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                stand_in.hits["/certs"] += 1
+                time.sleep(stand_in.delay)
+                self.reply(stand_in.jwks_status, {"keys": stand_in.keys}, {"Cache-Control": stand_in.cache_control})
+
+            def do_POST(self):
+                stand_in.hits["/token"] += 1
+                form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+                stand_in.forms.append(form)
+                time.sleep(stand_in.delay)
+                if form.get("code") != ["good"]:
+                    self.reply(400, {"error": "invalid_grant"})
+                else:
+                    self.reply(200, {"access_token": "at", "id_token": stand_in.id_token, "token_type": "Bearer"})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def client(self, timeout: float = 2.0, clock=time.monotonic) -> GoogleOAuthClient:
+        return GoogleOAuthClient(f"{self.url}/token", f"{self.url}/certs", ["https://accounts.google.com"],
+                                 timeout=timeout, connect_timeout=1.0, max_connections=4, jwks_max_age=3600,
+                                 clock_skew=60, clock=clock)
+
+
+@pytest.fixture
+def google():
+    stand_in = StandInGoogle()
+    yield stand_in
+    stand_in.server.shutdown()
+    stand_in.server.server_close()
+
+
+def verify(client: GoogleOAuthClient, *tokens: str) -> list:
+    async def run():
+        try:
+            return await asyncio.gather(*(client.verify_id_token(token, CLIENT_ID) for token in tokens))
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+def test_google_callback_against_stand_in(monkeypatch, client, db_session, google, google_settings):
+    monkeypatch.setenv('GOOGLE_CLIENT_ID', CLIENT_ID)
+    monkeypatch.setenv('GOOGLE_CLIENT_SECRET', 'test_client_secret')
+    monkeypatch.setenv('GOOGLE_REDIRECT_URI', 'http://testserver/google-callback')
+    monkeypatch.setattr('tst_auth_svc.google_oauth_client.google_client', google.client())
+    db_session.add(User(username='testuser', email='testuser@example.com', password='dummy'))
+    db_session.commit()
+
+    for _ in range(3):
+        response = client.get('/auth/google/google-callback', params={'code': 'good'})
+        assert response.status_code == status.HTTP_200_OK
+        assert 'session_token' in response.json()
+    assert google.forms[0]["grant_type"] == ["authorization_code"]
+    assert google.forms[0]["redirect_uri"] == ["http://testserver/google-callback"]
+    # Signing keys are fetched once and then served from the cache
+    assert google.hits == {"/token": 3, "/certs": 1}
+
+    response = client.get('/auth/google/google-callback', params={'code': 'bad'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize("token, reason", [
+    (sign(claims())[:-8] + "AAAAAAAA", "signature"),
+    (sign(claims(aud="someone-else")), "another client"),
+    (sign(claims(iss="https://evil.example.com")), "issuer"),
+    (sign(claims(exp=int(time.time()) - 120)), "expired"),
+    (sign(claims(iat=int(time.time()) + 600)), "not valid yet"),
+    (sign({k: v for k, v in claims().items() if k != "exp"}), "exp"),
+    (sign(claims(), alg="HS256"), "algorithm"),
+    (sign(claims(), kid="unknown"), "unknown key"),
+    ("not-a-token", "Malformed"),
+])
+def test_invalid_id_tokens_are_rejected(google, token, reason):
+    with pytest.raises(GoogleOAuthError, match=reason):
+        verify(google.client(), token)
+
+
+def test_unverified_email_is_not_returned(google):
+    google.id_token = sign(claims(email_verified=False))
+    client = google.client()
+
+    async def run():
+        try:
+            return await client.exchange_code("good", CLIENT_ID, "secret", "http://testserver/google-callback")
+        finally:
+            await client.close()
+
+    tokens = asyncio.run(run())
+    assert tokens["access_token"] == "at"
+    assert tokens["email"] is None
+
+
+def test_concurrent_verifications_share_one_jwks_fetch(google):
+    google.delay = 0.2
+    client = google.client()
+    assert len(verify(client, *[sign(claims(sub=str(i))) for i in range(20)])) == 20
+    assert google.hits["/certs"] == 1
+    assert 3500 < client.jwks.stats()["expires_in"] <= 3600
+
+
+def test_jwks_follows_cache_control(google):
+    google.cache_control = "max-age=0"
+    client = google.client()
+    verify(client, sign(claims()))
+    verify(client, sign(claims()))
+    assert google.hits["/certs"] == 2
+
+    # A failed refresh keeps the cached keys in use
+    google.jwks_status = 500
+    verify(client, sign(claims()))
+    assert google.hits["/certs"] == 3
+    assert client.jwks.stats()["failed_fetches"] == 1
+
+
+def test_key_rotation_refreshes_once(google):
+    now = [1000.0]
+    client = google.client(clock=lambda: now[0])
+    verify(client, sign(claims()))
+    google.keys = [jwk("k1"), jwk("k2")]
+    # Unknown key ids right after a refresh do not trigger another one
+    with pytest.raises(GoogleOAuthError):
+        verify(client, sign(claims(), kid="k2"))
+    assert google.hits["/certs"] == 1
+
+    now[0] += 61
+    verify(client, sign(claims(), kid="k2"), sign(claims(), kid="k2"))
+    assert google.hits["/certs"] == 2
+    verify(client, sign(claims()))
+    assert google.hits["/certs"] == 2
+
+
+def test_slow_token_endpoint_times_out(google):
+    google.delay = 1.0
+    client = google.client(timeout=0.2)
+
+    async def run():
+        try:
+            await client.exchange_code("good", CLIENT_ID, "secret", "http://testserver/google-callback")
+        finally:
+            await client.close()
+
+    started = time.monotonic()
+    with pytest.raises(httpx.TimeoutException):
+        asyncio.run(run())
+    assert time.monotonic() - started < 0.9
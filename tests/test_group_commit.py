@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy.exc import IntegrityError
+
+from tst_auth_svc import group_commit
+from tst_auth_svc.group_commit import SessionWriteQueue
+from tst_auth_svc.models.base import SyncSessionAdapter
+from tst_auth_svc.models.session import TOKEN_TYPE_SESSION, SessionToken, token_digest
+
+
+def make_queue(session_local, max_rows=2, max_delay=0.01) -> SessionWriteQueue:
+    return SessionWriteQueue(max_rows=max_rows, max_delay=max_delay,
+                             session_factory=lambda: SyncSessionAdapter(session_local()))
+
+
+def stored_tokens(db_session) -> list:
+    db_session.expire_all()
+    return sorted(t for (t,) in db_session.query(SessionToken.session_token))
+
+
+def digests(*tokens) -> list:
+    return sorted(token_digest(token) for token in tokens)
+
+
+def test_rows_are_committed_in_batches(session_local, db_session):
+    queue = make_queue(session_local, max_rows=2)
+
+    async def run():
+        await asyncio.gather(*(queue.submit(1, f"token_{i}") for i in range(5)))
+        await queue.close()
+
+    asyncio.run(run())
+    assert stored_tokens(db_session) == digests(*(f"token_{i}" for i in range(5)))
+    stats = queue.stats()
+    assert stats["batches"] == 3
+    assert stats["max_batch_size"] == 2
+    assert all(row.expires_at is not None and row.token_type == TOKEN_TYPE_SESSION
+               for row in db_session.query(SessionToken))
+
+
+def test_partial_batch_is_flushed_after_max_delay(session_local, db_session):
+    queue = make_queue(session_local, max_rows=100, max_delay=0.01)
+
+    async def run():
+        await asyncio.wait_for(queue.submit(1, "lonely"), timeout=5)
+        assert stored_tokens(db_session) == digests("lonely")
+        await queue.close()
+
+    asyncio.run(run())
+
+
+def test_close_drains_queued_rows(session_local, db_session):
+    queue = make_queue(session_local, max_rows=100, max_delay=60)
+
+    async def run():
+        submits = [asyncio.create_task(queue.submit(1, f"drain_{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        await queue.close()
+        await asyncio.gather(*submits)
+        with pytest.raises(RuntimeError):
+            await queue.submit(1, "too_late")
+
+    asyncio.run(run())
+    assert stored_tokens(db_session) == digests("drain_0", "drain_1", "drain_2")
+
+
+def test_failed_batch_fails_every_request(session_local, db_session):
+    queue = make_queue(session_local, max_rows=2)
+
+    async def run():
+        results = await asyncio.gather(queue.submit(1, "dup"), queue.submit(1, "dup"), return_exceptions=True)
+        await queue.close()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, IntegrityError) for r in results)
+    assert stored_tokens(db_session) == []
+    assert queue.stats()["errors"] == 1
+
+
+def test_session_factory_failure_fails_the_batch_and_keeps_the_flusher(session_local, db_session):
+    queue = make_queue(session_local, max_rows=1)
+    working_factory = queue.session_factory
+
+    def broken_factory():
+        queue.session_factory = working_factory
+        raise ConnectionError("database unavailable")
+
+    queue.session_factory = broken_factory
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(queue.submit(1, "first"), timeout=5)
+        await asyncio.wait_for(queue.submit(1, "second"), timeout=5)
+        await queue.close()
+
+    asyncio.run(run())
+    assert stored_tokens(db_session) == digests("second")
+    assert queue.stats()["errors"] == 1
+
+
+def test_flusher_crash_fails_queued_requests_and_restarts(monkeypatch, session_local, db_session):
+    queue = make_queue(session_local, max_rows=2)
+    write = queue._write
+
+    async def crashing_write(batch):
+        monkeypatch.setattr(queue, "_write", write)
+        raise RuntimeError("flusher bug")
+
+    monkeypatch.setattr(queue, "_write", crashing_write)
+
+    async def run():
+        results = await asyncio.wait_for(
+            asyncio.gather(*(queue.submit(1, f"lost_{i}") for i in range(3)), return_exceptions=True), timeout=5)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert queue._task is None
+        await asyncio.wait_for(queue.submit(1, "after_crash"), timeout=5)
+        await queue.close()
+
+    asyncio.run(run())
+    assert stored_tokens(db_session) == digests("after_crash")
+
+
+def test_login_uses_group_commit(monkeypatch, client, session_local, db_session):
+    payload = {"username": "batchuser", "email": "batch@example.com", "password": "batchpassword"}
+    assert client.post("/register", json=payload).status_code == status.HTTP_200_OK
+
+    monkeypatch.setattr(group_commit, "_writer", make_queue(session_local))
+    response = client.post("/login", json={"username": "batchuser", "password": "batchpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    assert stored_tokens(db_session) == digests(response.json()["session_token"])
+
+    stats = client.get("/internal/group-commit").json()
+    assert stats["enabled"] is True
+    assert stats["rows"] == 1
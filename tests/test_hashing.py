@@ -0,0 +1,58 @@
+import asyncio
+
+import bcrypt
+import pytest
+
+from tst_auth_svc.hashing import HashingExecutor
+
+
+def test_hash_and_verify_roundtrip():
+    hasher = HashingExecutor(kind="thread", max_workers=2)
+    try:
+        hashed = asyncio.run(hasher.hash_password("s3cretpass"))
+        assert bcrypt.checkpw(b"s3cretpass", hashed.encode('utf-8'))
+        assert asyncio.run(hasher.verify_password("s3cretpass", hashed))
+        assert not asyncio.run(hasher.verify_password("wrongpass", hashed))
+    finally:
+        hasher.shutdown()
+
+
+def test_process_executor_roundtrip():
+    hasher = HashingExecutor(kind="process", max_workers=1)
+    try:
+        hashed = asyncio.run(hasher.hash_password("s3cretpass"))
+        assert asyncio.run(hasher.verify_password("s3cretpass", hashed))
+    finally:
+        hasher.shutdown()
+
+
+def test_stats_report_queue_depth_and_latency():
+    hasher = HashingExecutor(kind="thread", max_workers=1)
+    hashed = bcrypt.hashpw(b"s3cretpass", bcrypt.gensalt(4)).decode('utf-8')
+
+    async def run_concurrently():
+        return await asyncio.gather(*(hasher.verify_password("s3cretpass", hashed) for _ in range(4)))
+
+    try:
+        assert all(asyncio.run(run_concurrently()))
+        stats = hasher.stats()
+        assert stats["in_flight"] == 0
+        assert stats["queue_depth"] == 0
+        assert stats["operations"]["verify"]["count"] == 4
+        assert stats["operations"]["verify"]["run"]["max_ms"] > 0
+        assert stats["operations"]["hash"]["count"] == 0
+    finally:
+        hasher.shutdown()
+
+
+def test_invalid_executor_kind():
+    with pytest.raises(ValueError):
+        HashingExecutor(kind="fiber")
+
+
+def test_hashing_stats_endpoint(client):
+    response = client.get("/internal/hashing")
+    assert response.status_code == 200
+    data = response.json()
+    assert "queue_depth" in data
+    assert set(data["operations"]) == {"hash", "verify"}
@@ -0,0 +1,97 @@
+import bcrypt
+import pytest
+from fastapi import status
+
+from tst_auth_svc.hashing import get_hasher
+from tst_auth_svc.login_limiter import CountMinSketch, LoginLimiter, SlidingWindowCounter
+from tst_auth_svc.models.user import User
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = LoginLimiter(window=60, per_username=3, per_ip=5, width=1024, depth=4)
+    monkeypatch.setattr("tst_auth_svc.login_limiter.login_limiter", limiter)
+    monkeypatch.setattr("tst_auth_svc.routers.internal.login_limiter", limiter)
+    return limiter
+
+
+def add_user(db, username: str, password: str) -> None:
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+    db.add(User(username=username, email=f"{username}@example.com", password=hashed))
+    db.commit()
+
+
+def login(client, username: str, password: str):
+    return client.post("/login", json={"username": username, "password": password})
+
+
+def test_sketch_never_undercounts_and_keeps_its_size():
+    sketch = CountMinSketch(width=2048, depth=4)
+    size = len(sketch.counters)
+    for i in range(20000):
+        sketch.add(f"user{i}")
+    for _ in range(50):
+        sketch.add("target")
+    assert len(sketch.counters) == size
+    assert 50 <= sketch.estimate("target") <= 50 + 20000 * 2.72 / 2048
+    assert all(sketch.estimate(f"user{i}") >= 1 for i in range(0, 20000, 97))
+
+
+def test_sliding_window_weights_the_previous_window():
+    clock = FakeClock()
+    clock.now = 600.0
+    counter = SlidingWindowCounter(window=60, width=256, depth=2, clock=clock)
+    for _ in range(10):
+        counter.add("k")
+    clock.now += 90  # half way through the next window
+    assert counter.count("k") == pytest.approx(5)
+    clock.now += 60
+    assert counter.count("k") == 0
+
+
+def test_failed_logins_are_throttled_per_username_before_bcrypt(client, db_session, limiter):
+    add_user(db_session, "victim", "rightpassword")
+    for _ in range(3):
+        assert login(client, "victim", "wrongpassword").status_code == status.HTTP_401_UNAUTHORIZED
+
+    verified = get_hasher().stats()["operations"]["verify"]["count"]
+    response = login(client, "victim", "rightpassword")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 1 <= int(response.headers["retry-after"]) <= 60
+    assert get_hasher().stats()["operations"]["verify"]["count"] == verified
+
+    # Other usernames from the same address are still served
+    add_user(db_session, "bystander", "bystanderpassword")
+    assert login(client, "bystander", "bystanderpassword").status_code == status.HTTP_200_OK
+
+
+def test_failed_logins_are_throttled_per_client_ip(client, limiter):
+    for i in range(5):
+        assert login(client, f"nobody{i}", "whatever").status_code == status.HTTP_401_UNAUTHORIZED
+    assert login(client, "someone-else", "whatever").status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    stats = client.get("/internal/login-limiter").json()
+    assert stats["failures"] == 5
+    assert stats["rejected_ip"] == 1
+    assert stats["rejection_rate"] == pytest.approx(1 / 6)
+    assert stats["sketches"]["ip"]["memory_bytes"] == 2 * 2 * 1024 * 4
+
+
+def test_successful_logins_are_not_counted(client, db_session, limiter):
+    add_user(db_session, "regular", "regularpassword")
+    for _ in range(5):
+        assert login(client, "regular", "regularpassword").status_code == status.HTTP_200_OK
+    assert limiter.stats()["failures"] == 0
+
+
+def test_malformed_bodies_are_left_to_validation(client, limiter):
+    response = client.post("/login", content=b"not json", headers={"content-type": "application/json"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert limiter.stats()["checked"] == 0
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from tst_auth_svc.metrics import (
+    BCRYPT_DURATION,
+    DB_QUERY_DURATION,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    REGISTRY,
+    SESSIONS_CREATED,
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    instrument_engine,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/a")
+
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'demo_seconds_sum{route="/a"} 3.65' in lines
+    assert 'demo_seconds_count{route="/a"} 4' in lines
+
+
+def test_counter_merges_per_thread_shards_and_escapes_labels():
+    counter = Counter("demo_total", "Demo.", ("path",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc('a"b')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value('a"b') == 4000
+    assert 'demo_total{path="a\\"b"} 4000' in counter.render()
+
+
+def test_shards_of_exited_threads_are_folded_at_scrape_time():
+    histogram = Histogram("demo_seconds", "Demo.", buckets=(1.0,))
+
+    def work():
+        histogram.observe(0.5)
+
+    for _ in range(3):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    histogram.observe(2.0)
+
+    assert histogram.count() == 4
+    # Only the calling thread still owns a shard; the exited threads' values live on merged
+    assert len(histogram._shards) == 1
+    assert 'demo_seconds_bucket{le="1.0"} 3' in histogram.render()
+
+
+def test_in_flight_requests_are_labelled_with_the_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    seen = {}
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        seen["in_flight"] = HTTP_REQUESTS_IN_FLIGHT.value("GET", "/items/{item_id}")
+        seen["unmatched"] = HTTP_REQUESTS_IN_FLIGHT.value("GET", "unmatched")
+        return {}
+
+    with TestClient(app) as client:
+        assert client.get("/items/7").status_code == status.HTTP_200_OK
+        assert client.post("/items/7").status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    assert seen == {"in_flight": 1, "unmatched": 0}
+    assert HTTP_REQUEST_DURATION.count("GET", "/items/{item_id}", "200") == 1
+    assert HTTP_REQUEST_DURATION.count("POST", "/items/{item_id}", "405") == 1
+
+
+def test_requests_are_recorded_per_route_and_status(client, session_local):
+    instrument_engine(session_local.kw["bind"])
+    payload = {"username": "metricsuser", "email": "metrics@example.com", "password": "metricspassword"}
+    assert client.post("/register", json=payload).status_code == status.HTTP_200_OK
+    assert client.post("/login", json={"username": "metricsuser", "password": "metricspassword"}).status_code == 200
+    assert client.post("/login", json={"username": "metricsuser", "password": "wrong"}).status_code == 401
+    assert client.get("/no-such-route").status_code == status.HTTP_404_NOT_FOUND
+
+    assert HTTP_REQUEST_DURATION.count("POST", "/login", "200") == 1
+    assert HTTP_REQUEST_DURATION.count("POST", "/login", "401") == 1
+    assert HTTP_REQUEST_DURATION.count("GET", "unmatched", "404") == 1
+    assert HTTP_REQUESTS_IN_FLIGHT.value("POST", "/login") == 0
+    assert BCRYPT_DURATION.count("hash", "12") == 1
+    assert BCRYPT_DURATION.count("verify", "12") == 2
+    assert SESSIONS_CREATED.value("opaque") == 1
+    assert DB_QUERY_DURATION.count("SELECT") >= 2
+    assert DB_QUERY_DURATION.count("INSERT") >= 2
+
+
+def test_metrics_endpoint_serves_prometheus_text(client):
+    client.post("/session/validate", json={"session_token": "unknown"})
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_request_duration_seconds_count{method="POST",route="/session/validate",status="401"} 1' in body
+    assert "# TYPE bcrypt_in_flight gauge" in body
+    assert "bcrypt_in_flight 0" in body
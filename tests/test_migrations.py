@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from argparse import Namespace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.autogenerate import compare_metadata
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, MetaData, String, Table, bindparam, create_engine, func, insert, select,
+    UniqueConstraint, update,
+)
+
+from tst_auth_svc.models import Base
+from tst_auth_svc.models.session import TOKEN_TYPE_RESET, TOKEN_TYPE_REVOKED, TOKEN_TYPE_SESSION, token_digest
+from tst_auth_svc.online_migrations import ChunkedBackfill
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# The tables as Base.metadata.create_all built them before the migration history started
+legacy_metadata = MetaData()
+Table("users", legacy_metadata,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("username", String(50), nullable=False, unique=True, index=True),
+      Column("email", String(255), nullable=False, unique=True, index=True),
+      Column("password", String(255), nullable=False),
+      UniqueConstraint("username", name="uq_users_username"),
+      UniqueConstraint("email", name="uq_users_email"))
+Table("sessions", legacy_metadata,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+      Column("session_token", String(255), nullable=False, unique=True),
+      Column("created_at", DateTime))
+
+# Runs with SESSION_TOKEN_LEGACY_COLUMN against a database between migrations 0003 and 0005
+LEGACY_COLUMN_CLIENT = """
+import json
+from sqlalchemy import create_engine, delete, select, text
+from sqlalchemy.orm import Session
+from tst_auth_svc.models.session import TOKEN_TYPE_SESSION, SessionToken
+
+engine = create_engine("sqlite:///" + DATABASE)
+with Session(engine) as db:
+    db.add(SessionToken(user_id=1, session_token="new-release"))
+    db.commit()
+    found = {token: db.execute(select(SessionToken.user_id).where(SessionToken.token_is(token))).scalar()
+             for token in ("previous-release", "new-release", "unknown")}
+    deleted = db.execute(delete(SessionToken).where(SessionToken.token_in(["previous-release"]))
+                         .where(SessionToken.type_is(TOKEN_TYPE_SESSION))).rowcount
+    db.commit()
+    plaintext = db.execute(text("SELECT session_token FROM sessions WHERE token_digest IS NOT NULL")).scalars().all()
+print(json.dumps({"found": found, "deleted": deleted, "plaintext": plaintext}))
+"""
+
+
+def alembic_config(monkeypatch, path, *x_args) -> Config:
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{path}")
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    config.cmd_opts = Namespace(x=list(x_args))
+    return config
+
+
+def test_token_digest_migration_converts_rows_in_batches(monkeypatch, tmp_path):
+    path = tmp_path / "migrate.db"
+    command.upgrade(alembic_config(monkeypatch, path), "0001")
+    legacy = ["abc", "reset:xyz", "revoked:00ff:1900000000"] + [f"token_{i}" for i in range(7)]
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO users (username, email, password) VALUES ('u', 'u@example.com', 'x')")
+        connection.executemany("INSERT INTO sessions (user_id, session_token) VALUES (1, ?)", [(t,) for t in legacy])
+
+    command.upgrade(alembic_config(monkeypatch, path, "batch_size=3"), "head")
+
+    with sqlite3.connect(path) as connection:
+        rows = dict(connection.execute("SELECT token_digest, token_type FROM sessions").fetchall())
+    assert rows == {token_digest(token): TOKEN_TYPE_SESSION for token in legacy} | {
+        token_digest("reset:xyz"): TOKEN_TYPE_RESET,
+        token_digest("revoked:00ff:1900000000"): TOKEN_TYPE_REVOKED,
+    }
+
+
+def test_stamped_legacy_database_is_upgraded(monkeypatch, tmp_path):
+    path = tmp_path / "legacy.db"
+    engine = create_engine(f"sqlite:///{path}")
+    legacy_metadata.create_all(engine)
+    engine.dispose()
+    created = datetime(2026, 10, 1, 12, 0, 0)
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO users (username, email, password) VALUES ('u', 'u@example.com', 'x')")
+        connection.executemany("INSERT INTO sessions (user_id, session_token, created_at) VALUES (1, ?, ?)",
+                               [("abc", created), ("reset:xyz", created)])
+    config = alembic_config(monkeypatch, path, "session_ttl=86400", "reset_ttl=3600")
+    command.stamp(config, "0001")
+
+    command.upgrade(config, "head")
+
+    with sqlite3.connect(path) as connection:
+        rows = {digest: datetime.fromisoformat(expires_at)
+                for digest, expires_at in connection.execute("SELECT token_digest, expires_at FROM sessions")}
+    assert rows == {token_digest("abc"): created + timedelta(days=1),
+                    token_digest("reset:xyz"): created + timedelta(hours=1)}
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        with engine.connect() as connection:
+            assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+    finally:
+        engine.dispose()
+
+
+def test_legacy_column_bridges_the_token_digest_rollout(monkeypatch, tmp_path):
+    path = tmp_path / "rollout.db"
+    command.upgrade(alembic_config(monkeypatch, path), "0004")
+    # What an instance of the previous release writes after the backfill in 0003
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO users (username, email, password) VALUES ('u', 'u@example.com', 'x')")
+        connection.execute("INSERT INTO sessions (user_id, session_token, created_at, expires_at) "
+                           "VALUES (1, 'previous-release', '2026-10-18 10:00:00', '2999-01-01 00:00:00')")
+
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src"), "SESSION_TOKEN_LEGACY_COLUMN": "true"}
+    result = subprocess.run([sys.executable, "-c", f"DATABASE = {str(path)!r}\n" + LEGACY_COLUMN_CLIENT],
+                            env=env, capture_output=True, text=True, timeout=60, check=True)
+
+    assert json.loads(result.stdout) == {"found": {"previous-release": 1, "new-release": 1, "unknown": None},
+                                         "deleted": 1, "plaintext": ["new-release"]}
+    command.upgrade(alembic_config(monkeypatch, path), "head")
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT token_digest FROM sessions").fetchall() == [(token_digest("new-release"),)]
+
+
+def test_migrations_match_the_models(monkeypatch, tmp_path):
+    path = tmp_path / "schema.db"
+    command.upgrade(alembic_config(monkeypatch, path), "head")
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        with engine.connect() as connection:
+            assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+    finally:
+        engine.dispose()
+
+
+def make_backfill_table(rows: int):
+    engine = create_engine("sqlite://")
+    metadata = MetaData()
+    table = Table("items", metadata, Column("id", Integer, primary_key=True),
+                  Column("value", Integer), Column("doubled", Integer))
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(table), [{"value": i} for i in range(rows)])
+    return engine, table
+
+
+def doubling_backfill(table, sleep=None, **kwargs) -> ChunkedBackfill:
+    return ChunkedBackfill(
+        "items.doubled",
+        source=select(table.c.id, table.c.value).where(table.c.doubled.is_(None)),
+        update=update(table).where(table.c.id == bindparam("row_id")).values(doubled=bindparam("new")),
+        transform=lambda row: {"row_id": row.id, "new": row.value * 2},
+        sleep=sleep or (lambda seconds: None),
+        **kwargs,
+    )
+
+
+def test_backfill_commits_each_chunk_and_resumes():
+    engine, table = make_backfill_table(10)
+    with engine.connect() as connection:
+        chunks = doubling_backfill(table, batch_size=4).chunks(connection)
+        assert next(chunks) == 4
+        chunks.close()
+    # The first chunk survives the interrupted run; the next run only does the rest
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).where(table.c.doubled.is_not(None))).scalar() == 4
+        result = doubling_backfill(table, batch_size=4).run(connection)
+        assert (result["rows"], result["chunks"]) == (6, 2)
+        assert connection.execute(select(table.c.value, table.c.doubled)).all() == [(i, 2 * i) for i in range(10)]
+    engine.dispose()
+
+
+def test_backfill_is_throttled_to_rows_per_second():
+    engine, table = make_backfill_table(10)
+    pauses = []
+    with engine.connect() as connection:
+        doubling_backfill(table, sleep=pauses.append, batch_size=5, max_rows_per_second=10).run(connection)
+    assert len(pauses) == 2
+    assert all(0.4 < pause <= 0.5 for pause in pauses)
+    engine.dispose()
@@ -0,0 +1,63 @@
+import pytest
+from fastapi import status
+
+from tst_auth_svc.profiling import install_profiler, slow_requests
+
+
+@pytest.fixture
+def profiling(monkeypatch, session_local):
+    monkeypatch.setattr("tst_auth_svc.profiling.REQUEST_PROFILING", True)
+    install_profiler(session_local.kw["bind"])
+    slow_requests.clear()
+    yield
+    slow_requests.clear()
+
+
+def parse_server_timing(header: str) -> dict:
+    timings = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        values = dict(param.split("=", 1) for param in params)
+        timings[name] = (float(values["dur"]), values.get("desc"))
+    return timings
+
+
+def register_and_login(client):
+    payload = {"username": "profileuser", "email": "profile@example.com", "password": "profilepassword"}
+    assert client.post("/register", json=payload).status_code == status.HTTP_200_OK
+    response = client.post("/login", json={"username": "profileuser", "password": "profilepassword"})
+    assert response.status_code == status.HTTP_200_OK
+    return response
+
+
+def test_server_timing_breaks_down_login(client, profiling):
+    response = register_and_login(client)
+    timings = parse_server_timing(response.headers["server-timing"])
+
+    assert set(timings) == {"db-query", "db-commit", "hash", "serialize", "total"}
+    assert timings["db-query"][1] == '"2 statements"'
+    assert timings["hash"][0] > 0
+    assert timings["db-commit"][0] > 0
+    assert timings["total"][0] >= timings["hash"][0]
+
+
+def test_requests_over_budget_are_kept_slowest_first(monkeypatch, client, profiling):
+    monkeypatch.setattr("tst_auth_svc.profiling.PROFILE_STATEMENT_BUDGET", 1)
+    register_and_login(client)
+    client.post("/session/validate", json={"session_token": "unknown"})
+
+    report = client.get("/internal/profile").json()
+    routes = [entry["route"] for entry in report["requests"]]
+    # /register is a single INSERT, within budget
+    assert routes == ["/login"]
+    durations = [entry["total_ms"] for entry in report["requests"]]
+    assert durations == sorted(durations, reverse=True)
+    login = next(entry for entry in report["requests"] if entry["route"] == "/login")
+    assert login["statement_count"] == 2
+    assert login["over_budget"] == ["2 statements > 1"]
+    assert login["slowest_statements"][0]["sql"]
+
+
+def test_profiling_is_off_by_default(client):
+    response = client.post("/session/validate", json={"session_token": "unknown"})
+    assert "server-timing" not in response.headers
@@ -0,0 +1,155 @@
+import asyncio
+import sys
+import types
+
+import bcrypt
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from tst_auth_svc.hashing import HashingExecutor, get_hasher, hash_cost
+from tst_auth_svc.metrics import BCRYPT_REHASHES, REGISTRY
+from tst_auth_svc.models.base import Base, SyncSessionAdapter
+from tst_auth_svc.models.user import User
+from tst_auth_svc.rehash import StoredCostCensus, password_rehasher
+from tst_auth_svc.replicas import ReplicaSet
+
+
+@pytest.fixture
+def low_cost(monkeypatch, session_local):
+    """Makes the current cost 5 and points the rehasher at the test database."""
+    monkeypatch.setattr(get_hasher(), "rounds", 5)
+    monkeypatch.setattr(get_hasher(), "rehash_tolerance", 2)
+    monkeypatch.setattr(password_rehasher, "session_factory", lambda: SyncSessionAdapter(session_local()))
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def add_user(db, username: str, password: str, rounds: int) -> User:
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    user = User(username=username, email=f"{username}@example.com", password=hashed)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def stored_hash(db, username: str) -> str:
+    db.expire_all()
+    return db.query(User.password).filter_by(username=username).scalar()
+
+
+def test_hash_cost():
+    assert hash_cost(bcrypt.hashpw(b"pw", bcrypt.gensalt(5)).decode()) == 5
+    assert hash_cost("not-a-hash") is None
+
+
+def test_calibration_stays_within_bounds():
+    hasher = HashingExecutor(kind="thread", max_workers=1, rounds=12)
+    try:
+        assert asyncio.run(hasher.calibrate(target_ms=1e9, min_rounds=4, max_rounds=6)) == 6
+        assert asyncio.run(hasher.calibrate(target_ms=1e-6, min_rounds=4, max_rounds=6)) == 4
+        assert hasher.rounds == 4
+    finally:
+        hasher.shutdown()
+
+
+def test_login_upgrades_hash_to_current_cost(client, db_session, low_cost):
+    add_user(db_session, "oldhash", "oldhashpassword", rounds=4)
+
+    response = client.post("/login", json={"username": "oldhash", "password": "oldhashpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    upgraded = stored_hash(db_session, "oldhash")
+    assert hash_cost(upgraded) == 5
+    assert bcrypt.checkpw(b"oldhashpassword", upgraded.encode())
+    assert BCRYPT_REHASHES.value("upgrade") == 1
+
+    assert client.post("/login", json={"username": "oldhash", "password": "oldhashpassword"}).status_code == 200
+    assert stored_hash(db_session, "oldhash") == upgraded
+    assert BCRYPT_REHASHES.value("upgrade") == 1
+
+
+def test_needs_rehash_upgrades_always_and_downgrades_beyond_the_tolerance():
+    hasher = HashingExecutor(kind="thread", max_workers=1, rounds=12, rehash_tolerance=2)
+    assert hasher.needs_rehash("$2b$11$" + "x" * 53)
+    assert not hasher.needs_rehash("$2b$12$" + "x" * 53)
+    assert not hasher.needs_rehash("$2b$14$" + "x" * 53)
+    assert hasher.needs_rehash("$2b$15$" + "x" * 53)
+
+
+def test_login_keeps_a_costlier_hash_within_the_tolerance(client, db_session, low_cost):
+    add_user(db_session, "costly", "costlypassword", rounds=6)
+    original = stored_hash(db_session, "costly")
+    assert client.post("/login", json={"username": "costly", "password": "costlypassword"}).status_code == 200
+    assert stored_hash(db_session, "costly") == original
+    assert BCRYPT_REHASHES.value("downgrade") == 0
+
+
+def test_login_downgrades_hash_beyond_the_tolerance(client, db_session, low_cost):
+    add_user(db_session, "costly", "costlypassword", rounds=8)
+    assert client.post("/login", json={"username": "costly", "password": "costlypassword"}).status_code == 200
+    assert hash_cost(stored_hash(db_session, "costly")) == 5
+    assert BCRYPT_REHASHES.value("downgrade") == 1
+
+
+def test_rehash_never_overwrites_a_changed_password(db_session, low_cost):
+    user = add_user(db_session, "changed", "changedpassword", rounds=4)
+    current = stored_hash(db_session, "changed")
+
+    asyncio.run(password_rehasher.rehash(user.id, "changedpassword", "$2b$04$stalehashfromanearlierread"))
+    assert stored_hash(db_session, "changed") == current
+    assert BCRYPT_REHASHES.value("stale") == 1
+
+
+def test_stored_cost_distribution_metric(monkeypatch, client, db_session, session_local, low_cost):
+    census = StoredCostCensus(interval=3600, session_factory=lambda: SyncSessionAdapter(session_local()),
+                              replicas=ReplicaSet([], eject_seconds=30))
+    monkeypatch.setattr("tst_auth_svc.routers.metrics.stored_costs", census)
+    add_user(db_session, "a", "apassword", rounds=4)
+    add_user(db_session, "b", "bpassword", rounds=4)
+    add_user(db_session, "c", "cpassword", rounds=5)
+    asyncio.run(census.refresh_once())
+
+    statements = []
+    engine = session_local.kw["bind"]
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        body = client.get("/metrics").text
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert 'bcrypt_stored_cost_users{cost="4"} 2' in body
+    assert 'bcrypt_stored_cost_users{cost="5"} 1' in body
+    assert "bcrypt_target_cost 5" in body
+    # The scrape serves the last count instead of scanning users
+    assert statements == []
+
+
+def test_stored_cost_census_reads_from_a_replica(tmp_path, session_local, low_cost):
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(replica)
+    with Session(replica) as db:
+        add_user(db, "replicated", "replicatedpassword", rounds=4)
+    census = StoredCostCensus(interval=3600, session_factory=lambda: SyncSessionAdapter(session_local()),
+                              replicas=ReplicaSet([replica], eject_seconds=30))
+
+    asyncio.run(census.refresh_once())
+    assert census.counts == {("4",): 1}
+    replica.dispose()
+
+
+def test_stored_cost_census_runs_in_the_first_worker_only(monkeypatch):
+    server = types.SimpleNamespace(_worker_index=1)
+    monkeypatch.setitem(sys.modules, "tst_auth_svc.server", server)
+
+    async def start_and_stop(census):
+        census.start()
+        running = census._task is not None
+        await census.stop()
+        return running
+
+    assert asyncio.run(start_and_stop(StoredCostCensus(interval=3600))) is False
+    server._worker_index = 0
+    assert asyncio.run(start_and_stop(StoredCostCensus(interval=3600))) is True
+    assert asyncio.run(start_and_stop(StoredCostCensus(interval=0))) is False
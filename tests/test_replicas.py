@@ -0,0 +1,160 @@
+import bcrypt
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from tst_auth_svc import replicas
+from tst_auth_svc.app import app
+from tst_auth_svc.models.base import Base, get_db
+from tst_auth_svc.models.user import User
+from tst_auth_svc.replicas import ReplicaSet
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def sqlite_file(path, schema: bool = True):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if schema:
+        Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def primary(tmp_path):
+    """Primary database in one SQLite file, serving the app's sessions."""
+    engine = sqlite_file(tmp_path / "primary.db")
+    factory = sessionmaker(bind=engine)
+
+    def override_session():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_session
+    yield engine
+    app.dependency_overrides[get_db] = get_db
+    engine.dispose()
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """Replica in a second SQLite file; it only sees what a test copies into it."""
+    engine = sqlite_file(tmp_path / "replica.db")
+    replica_set = ReplicaSet([engine], eject_seconds=30)
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+    for module in ("login", "google_oauth", "internal"):
+        monkeypatch.setattr(f"tst_auth_svc.routers.{module}.replica_set", replica_set)
+    yield engine, replica_set
+    engine.dispose()
+
+
+@pytest.fixture
+def client(primary, replica):
+    with TestClient(app) as c:
+        yield c
+
+
+def add_user(engine, username: str, password: str, user_id: int = 1) -> None:
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+    with engine.begin() as connection:
+        connection.execute(insert(User).values(id=user_id, username=username,
+                                               email=f"{username}@example.com", password=hashed))
+
+
+def test_login_reads_the_user_from_the_replica(client, primary, replica):
+    replica_engine, replica_set = replica
+    add_user(primary, "replicated", "samepassword")
+    add_user(replica_engine, "replicated", "samepassword")
+
+    response = client.post("/login", json={"username": "replicated", "password": "samepassword"})
+    assert response.status_code == status.HTTP_200_OK
+    stats = replica_set.stats()
+    assert stats["replicas"][0]["reads"] == 1
+    assert stats["misses_read_from_primary"] == 0
+
+
+def test_register_then_login_reads_own_write(client, replica):
+    _, replica_set = replica
+    payload = {"username": "freshuser", "email": "fresh@example.com", "password": "freshpassword"}
+    assert client.post("/register", json=payload).status_code == status.HTTP_200_OK
+    # The replica has not caught up: the login falls back to the primary
+    response = client.post("/login", json={"username": "freshuser", "password": "freshpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    assert replica_set.stats()["misses_read_from_primary"] == 1
+
+
+def test_login_rechecks_the_primary_hash_when_the_replica_lags(client, primary, replica):
+    replica_engine, _ = replica
+    add_user(primary, "changed", "newpassword")
+    add_user(replica_engine, "changed", "oldpassword")
+
+    response = client.post("/login", json={"username": "changed", "password": "newpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    response = client.post("/login", json={"username": "changed", "password": "wrongpassword"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_replica_served_login_does_not_read_from_the_primary(client, primary, replica):
+    replica_engine, _ = replica
+    add_user(primary, "replicated", "samepassword")
+    add_user(replica_engine, "replicated", "samepassword")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(primary, "before_cursor_execute", record)
+    try:
+        response = client.post("/login", json={"username": "replicated", "password": "samepassword"})
+    finally:
+        event.remove(primary, "before_cursor_execute", record)
+    assert response.status_code == status.HTTP_200_OK
+    # Only the session row is written; the password is not re-read from the primary
+    assert statements == ["INSERT"]
+
+
+def test_failing_replica_is_ejected_and_reads_go_to_the_primary(client, primary, replica, tmp_path, monkeypatch):
+    clock = FakeClock()
+    # No schema: every query on this replica fails
+    broken = ReplicaSet([sqlite_file(tmp_path / "broken.db", schema=False)], eject_seconds=30, clock=clock)
+    monkeypatch.setattr("tst_auth_svc.routers.login.replica_set", broken)
+    add_user(primary, "survivor", "survivorpassword")
+
+    for _ in range(2):
+        response = client.post("/login", json={"username": "survivor", "password": "survivorpassword"})
+        assert response.status_code == status.HTTP_200_OK
+    stats = broken.stats()
+    assert stats["replicas"][0]["errors"] == 1
+    assert stats["replicas"][0]["healthy"] is False
+    assert stats["no_healthy_replica"] == 1
+
+    clock.now += 31
+    assert broken.pick() is not None
+
+
+def test_replicas_are_used_round_robin(tmp_path):
+    clock = FakeClock()
+    engines = [sqlite_file(tmp_path / f"r{i}.db") for i in range(2)]
+    replica_set = ReplicaSet(engines, eject_seconds=30, clock=clock)
+    assert [replica_set.pick().engine for _ in range(4)] == engines * 2
+
+    replica_set.eject(replica_set.pick(), RuntimeError("down"))
+    assert {replica_set.pick().engine for _ in range(3)} == {engines[1]}
+    for engine in engines:
+        engine.dispose()
+
+
+def test_internal_endpoint_reports_replica_health(client, replica):
+    body = client.get("/internal/replicas").json()
+    assert body["replicas"][0]["healthy"] is True
+    assert body["replicas"][0]["name"].endswith("replica.db")
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from tst_auth_svc.models.base import SyncSessionAdapter
+from tst_auth_svc.models.session import TOKEN_TYPE_REVOKED_USER, SessionToken, token_digest
+from tst_auth_svc.session_cache import session_cache
+from tst_auth_svc.sessions import revoke_user_sessions
+from tst_auth_svc.settings import Settings
+from tst_auth_svc.signed_tokens import TokenSigner, parse_key_set, revocations
+
+
+@pytest.fixture(autouse=True)
+def clear_state():
+    session_cache.clear()
+    revocations.clear()
+    yield
+    session_cache.clear()
+    revocations.clear()
+
+
+@pytest.fixture
+def statements(session_local):
+    recorded = []
+    engine = session_local.kw["bind"]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def add_sessions(db, user_id: int, *tokens: str) -> None:
+    db.add_all([SessionToken(user_id=user_id, session_token=token) for token in tokens])
+    db.commit()
+
+
+def live_digests(db) -> set:
+    return {row.session_token for row in db.query(SessionToken.session_token)}
+
+
+def test_logout_everywhere_revokes_only_the_users_sessions(client, db_session):
+    add_sessions(db_session, 1, "a1", "a2", "a3", "reset:a")
+    add_sessions(db_session, 2, "b1")
+
+    response = client.post("/logout/all", json={"session_token": "a2"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["sessions_revoked"] == 3
+    # The user's pending password reset survives; other users are untouched
+    assert live_digests(db_session) == {token_digest("reset:a"), token_digest("b1")}
+    response = client.post("/session/validate", json={"session_token": "a1"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_logout_everywhere_rejects_unknown_tokens(client):
+    response = client.post("/logout/all", json={"session_token": "nope"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_revoke_users_is_one_delete(client, db_session, statements, internal_headers):
+    for user_id in range(1, 6):
+        add_sessions(db_session, user_id, f"u{user_id}-1", f"u{user_id}-2")
+    # Cached validations must not outlive the revocation
+    assert client.post("/session/validate", json={"session_token": "u1-1"}).status_code == status.HTTP_200_OK
+
+    statements.clear()
+    response = client.post("/internal/sessions/revoke-users", json={"user_ids": [1, 2, 3, 4]},
+                           headers=internal_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["sessions_revoked"] == 8
+    assert statements == ["DELETE"]
+    assert live_digests(db_session) == {token_digest("u5-1"), token_digest("u5-2")}
+    assert client.post("/session/validate", json={"session_token": "u1-1"}).status_code == 401
+
+
+def test_revoke_tokens_is_one_delete(client, db_session, statements, internal_headers):
+    add_sessions(db_session, 1, "t1", "t2", "reset:t3")
+    add_sessions(db_session, 2, "t4")
+
+    statements.clear()
+    response = client.post("/internal/sessions/revoke-tokens",
+                           json={"session_tokens": ["t1", "t4", "reset:t3", "unknown", "t1"]},
+                           headers=internal_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["sessions_revoked"] == 2
+    assert statements == ["DELETE"]
+    assert live_digests(db_session) == {token_digest("t2"), token_digest("reset:t3")}
+
+
+def test_revocation_requests_are_bounded(client, internal_headers):
+    response = client.post("/internal/sessions/revoke-users", json={"user_ids": list(range(10001))},
+                           headers=internal_headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = client.post("/internal/sessions/revoke-tokens", json={"session_tokens": []}, headers=internal_headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/internal/sessions/revoke-users", {"user_ids": [1]}),
+    ("/internal/sessions/revoke-tokens", {"session_tokens": ["t1"]}),
+])
+def test_revocation_requires_the_internal_token(client, db_session, path, body, monkeypatch):
+    add_sessions(db_session, 1, "t1")
+    # Disabled while no token is configured
+    assert client.post(path, json=body).status_code == status.HTTP_403_FORBIDDEN
+
+    monkeypatch.setattr("tst_auth_svc.settings._settings", Settings(internal_api_token="expected-token"))
+    assert client.post(path, json=body).status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post(path, json=body, headers={"X-Internal-Token": "guessed-token"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert live_digests(db_session) == {token_digest("t1")}
+
+
+@pytest.mark.parametrize("revoke", [False, True])
+def test_password_update_can_revoke_sessions(client, db_session, statements, revoke):
+    response = client.post("/register", json={"username": "victim", "email": "victim@example.com",
+                                              "password": "oldpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    token = client.post("/login", json={"username": "victim", "password": "oldpassword"}).json()["session_token"]
+    reset_token = client.post("/password-reset", json={"identifier": "victim"}).json()["reset_token"]
+
+    statements.clear()
+    response = client.post("/password-update", json={"reset_token": reset_token, "new_password": "newpassword",
+                                                     "revoke_sessions": revoke})
+    assert response.status_code == status.HTTP_200_OK
+    assert statements == (["SELECT", "DELETE", "UPDATE", "DELETE"] if revoke else ["SELECT", "DELETE", "UPDATE"])
+    response = client.post("/session/validate", json={"session_token": token})
+    assert response.status_code == (status.HTTP_401_UNAUTHORIZED if revoke else status.HTTP_200_OK)
+
+
+def test_revoking_a_user_revokes_their_signed_tokens(monkeypatch, session_local):
+    signer = TokenSigner(parse_key_set("k1:test-secret"), ttl=3600)
+    monkeypatch.setattr("tst_auth_svc.sessions.token_signer", signer)
+    old = signer.verify(signer.issue(7, now=1000), now=1001)
+    other_user = signer.verify(signer.issue(8, now=1000), now=1001)
+
+    async def run():
+        db = SyncSessionAdapter(session_local())
+        try:
+            assert await revoke_user_sessions(db, [7]) == 0
+        finally:
+            await db.close()
+
+    asyncio.run(run())
+    assert revocations.is_revoked(old)
+    assert not revocations.is_revoked(other_user)
+
+    # Other workers learn about it from the sessions table
+    revocations.clear()
+    db = session_local()
+    assert db.query(SessionToken).filter(SessionToken.token_type == TOKEN_TYPE_REVOKED_USER).count() == 1
+    db.close()
+
+    async def refresh():
+        db = SyncSessionAdapter(session_local())
+        try:
+            await revocations.maybe_refresh(db)
+        finally:
+            await db.close()
+
+    asyncio.run(refresh())
+    assert revocations.is_revoked(old)
+    assert not revocations.is_revoked(other_user)
+
@@ -30,8 +30,8 @@ def test_get_secure_db_failure(monkeypatch, caplog):
     def faulty_session(*args, **kwargs):
         raise Exception("Simulated connection error")
 
-    # Monkeypatch sessionmaker to simulate failure
-    monkeypatch.setattr('tst_auth_svc.models.base.sessionmaker', lambda bind: lambda: faulty_session())
+    # Monkeypatch the shared session factory to simulate failure
+    monkeypatch.setattr('tst_auth_svc.models.base.SessionLocal', faulty_session)
 
     gen = get_secure_db()
     with pytest.raises(Exception) as excinfo:
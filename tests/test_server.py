@@ -0,0 +1,115 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from tst_auth_svc.server import pin_bcrypt_cost, reuse_port_socket, worker_count
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def worker(port: int) -> dict:
+    # A new connection per request, so the kernel can pick another worker each time
+    return httpx.get(f"http://127.0.0.1:{port}/internal/worker", timeout=5).json()
+
+
+def wait_for(condition, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = condition()
+        except httpx.TransportError:
+            result = None
+        if result:
+            return result
+        time.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+def test_worker_count_defaults_to_one_per_core():
+    assert worker_count(3) == 3
+    assert worker_count(0) == (os.cpu_count() or 1)
+
+
+def test_reuse_port_sockets_share_a_port():
+    first = reuse_port_socket("127.0.0.1", 0)
+    try:
+        second = reuse_port_socket("127.0.0.1", first.getsockname()[1])
+        second.close()
+    finally:
+        first.close()
+
+
+def test_supervisor_pins_the_calibrated_bcrypt_cost_for_its_workers(monkeypatch):
+    monkeypatch.setenv("BCRYPT_ROUNDS", "12")
+    monkeypatch.setenv("BCRYPT_TARGET_MS", "250")
+    assert pin_bcrypt_cost(target_ms=1e9, min_rounds=4, max_rounds=5) == 5
+    # Workers read these at import and skip their own calibration
+    assert os.environ["BCRYPT_ROUNDS"] == "5"
+    assert os.environ["BCRYPT_TARGET_MS"] == "0"
+
+
+def test_no_bcrypt_target_leaves_the_cost_alone(monkeypatch):
+    monkeypatch.setenv("BCRYPT_ROUNDS", "12")
+    assert pin_bcrypt_cost(target_ms=0) is None
+    assert os.environ["BCRYPT_ROUNDS"] == "12"
+
+
+def test_in_process_app_is_not_a_worker(client):
+    info = client.get("/internal/worker").json()
+    assert info["worker"] is None
+    assert info["pid"] == os.getpid()
+
+
+@pytest.mark.parametrize("reuse_port", [False, True])
+def test_prefork_workers_and_rolling_restart(tmp_path, reuse_port):
+    port = free_port()
+    command = [sys.executable, "-m", "tst_auth_svc.main", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", "2", "--reuse-port" if reuse_port else "--no-reuse-port"]
+    log = open(tmp_path / "server.log", "w")
+    supervisor = subprocess.Popen(command, env={**os.environ, "PYTHONPATH": SRC}, stdout=log, stderr=log)
+    try:
+        def all_workers() -> dict:
+            seen = {}
+            for _ in range(50):
+                info = worker(port)
+                seen[info["worker"]] = info["pid"]
+                if len(seen) == 2:
+                    return seen
+            return None
+
+        before = wait_for(all_workers)
+        assert set(before) == {0, 1}
+        assert all(worker(port)["supervisor_pid"] == supervisor.pid for _ in range(4))
+
+        # Every request during the rolling restart is served
+        supervisor.send_signal(signal.SIGHUP)
+        replaced = {}
+
+        def restarted() -> bool:
+            info = worker(port)
+            if info["pid"] not in before.values():
+                replaced[info["worker"]] = info["pid"]
+            return len(replaced) == 2
+
+        deadline = time.monotonic() + 60
+        while not restarted():
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert not set(replaced.values()) & set(before.values())
+    finally:
+        supervisor.send_signal(signal.SIGTERM)
+        supervisor.wait(30)
+        log.close()
+    assert supervisor.returncode == 0, (tmp_path / "server.log").read_text()
@@ -0,0 +1,352 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+import pytest
+from fastapi import status
+
+from tst_auth_svc import session_store
+from tst_auth_svc.models.base import SyncSessionAdapter
+from tst_auth_svc.models.session import SessionToken
+from tst_auth_svc.models.user import User
+from tst_auth_svc.session_cache import session_cache
+from tst_auth_svc.session_store.memory import MemorySessionStore
+from tst_auth_svc.session_store.redis_store import RedisSessionStore
+from tst_auth_svc.session_store.sql import SqlSessionStore
+from tst_auth_svc.session_store.resp import RespError, RespPool, encode_command, read_reply
+
+
+class FakeRespServer:
+    """Tiny in-memory server speaking just the RESP commands the session store sends."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.commands = []
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.port = None
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self) -> str:
+        self._thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._serve, "127.0.0.1", 0), self.loop).result(5)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def stop(self) -> None:
+        async def shutdown():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+
+    def _live(self, key):
+        expires_at = self.expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return self.data.get(key)
+
+    def _reply(self, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._reply(item) for item in value)
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, RespError):
+            return b"-%s\r\n" % str(value).encode()
+        if value == "OK":
+            return b"+OK\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _execute(self, name: str, args: list):
+        self.commands.append(name)
+        if name in ("PING", "AUTH", "SELECT"):
+            return "OK"
+        if name == "SET":
+            key, value = args[0], args[1]
+            self.data[key] = value
+            self.expiry.pop(key, None)
+            if len(args) == 4 and args[2].upper() == b"EX":
+                self.expiry[key] = time.monotonic() + int(args[3])
+            return "OK"
+        if name == "GET":
+            value = self._live(args[0])
+            return value if isinstance(value, bytes) or value is None else RespError("WRONGTYPE")
+        if name == "GETDEL":
+            value = self._live(args[0])
+            self.data.pop(args[0], None)
+            self.expiry.pop(args[0], None)
+            return value
+        if name == "DEL":
+            return sum(1 for key in args if self._live(key) is not None and self.data.pop(key) is not None)
+        if name == "SADD":
+            members = self.data.setdefault(args[0], set())
+            before = len(members)
+            members.update(args[1:])
+            return len(members) - before
+        if name == "SMEMBERS":
+            return sorted(self._live(args[0]) or ())
+        if name == "SREM":
+            members = self._live(args[0]) or set()
+            removed = len(members & set(args[1:]))
+            members.difference_update(args[1:])
+            return removed
+        if name == "EXPIRE":
+            if self._live(args[0]) is None:
+                return 0
+            expires_at = time.monotonic() + int(args[1])
+            current = self.expiry.get(args[0])
+            condition = args[2].upper() if len(args) > 2 else None
+            # A key without an expiry counts as never expiring for GT
+            if (condition == b"NX" and current is not None) or (
+                    condition == b"GT" and (current is None or expires_at <= current)):
+                return 0
+            self.expiry[args[0]] = expires_at
+            return 1
+        return RespError(f"ERR unknown command '{name}'")
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                command = await read_reply(reader)
+                writer.write(self._reply(self._execute(command[0].decode().upper(), command[1:])))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+def resp_server():
+    server = FakeRespServer()
+    url = server.start()
+    yield server, url
+    server.stop()
+
+
+@pytest.fixture
+def use_store(monkeypatch):
+    """Installs a session store as the process-wide one for the duration of a test."""
+    session_cache.clear()
+
+    def install(store):
+        monkeypatch.setattr(session_store, "_store", store)
+        return store
+
+    yield install
+    session_cache.clear()
+
+
+def add_user(db, username: str, password: str) -> User:
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+    user = User(username=username, email=f"{username}@example.com", password=hashed)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_encode_command():
+    assert encode_command("SET", "k", 42) == b"*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$2\r\n42\r\n"
+
+
+def test_memory_store_expires_tokens():
+    clock = FakeClock()
+    store = MemorySessionStore(shards=4, clock=clock)
+
+    async def run():
+        await store.create(None, 7, "tok", ttl=60)
+        assert await store.lookup(None, "tok") == 7
+        clock.now += 61
+        assert await store.lookup(None, "tok") is None
+        assert store.stats()["tokens"] == 0
+
+    asyncio.run(run())
+
+
+def test_memory_store_delete_returns_the_owner():
+    store = MemorySessionStore(shards=4)
+
+    async def run():
+        await store.create(None, 1, "tok", ttl=60)
+        assert await store.delete(None, "tok") == 1
+        assert await store.delete(None, "tok") is None
+        assert await store.lookup(None, "tok") is None
+
+    asyncio.run(run())
+
+
+def test_sql_store_delete_skips_expired_tokens(db_session):
+    user = add_user(db_session, "expireduser", "expiredpassword")
+    db_session.add(SessionToken(user_id=user.id, session_token="stale",
+                                expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db_session.commit()
+
+    # Like lookup: an expired token is not a session any more, and the sweeper removes its row
+    assert asyncio.run(SqlSessionStore().delete(SyncSessionAdapter(db_session), "stale")) is None
+    assert db_session.query(SessionToken).count() == 1
+
+
+def test_sql_store_delete_miss_leaves_the_callers_transaction(db_session):
+    db = SyncSessionAdapter(db_session)
+    db_session.add(User(username="pending", email="pending@example.com", password="x"))
+    db_session.flush()
+
+    assert asyncio.run(SqlSessionStore().delete(db, "missing", commit=False)) is None
+    db_session.commit()
+    assert db_session.query(User).filter_by(username="pending").count() == 1
+
+
+def test_memory_store_spreads_tokens_over_shards():
+    store = MemorySessionStore(shards=8)
+
+    async def run():
+        for i in range(800):
+            await store.create(None, 1, f"token_{i}", ttl=60)
+
+    asyncio.run(run())
+    stats = store.stats()
+    assert stats["tokens"] == 800
+    assert stats["largest_shard"] < 200
+
+
+def test_redis_store_round_trip(resp_server):
+    server, url = resp_server
+    store = RedisSessionStore(RespPool(url, max_connections=2))
+
+    async def run():
+        await store.create(None, 5, "tok", ttl=60)
+        assert await store.lookup(None, "tok") == 5
+        assert await store.delete(None, "tok") == 5
+        assert await store.delete(None, "tok") is None
+        assert await store.lookup(None, "tok") is None
+        await store.close()
+
+    asyncio.run(run())
+    # The writes of a create go out as one pipeline on one connection
+    assert server.commands[:4] == ["SET", "SADD", "EXPIRE", "EXPIRE"]
+    assert server.expiry[b"tst_auth:user_sessions:5"] > time.monotonic()
+
+
+def test_memory_store_bulk_deletes():
+    store = MemorySessionStore(shards=4)
+
+    async def run():
+        for user_id in (1, 2):
+            for i in range(3):
+                await store.create(None, user_id, f"s{user_id}-{i}", ttl=60)
+        await store.create(None, 1, "reset:r1", ttl=60)
+        assert await store.delete_many(None, ["s2-0", "reset:r1", "missing"]) == 1
+        assert await store.delete_for_users(None, [1]) == 3
+        assert await store.lookup(None, "reset:r1") == 1
+        assert await store.lookup(None, "s2-1") == 2
+
+    asyncio.run(run())
+
+
+def test_redis_store_bulk_deletes(resp_server):
+    server, url = resp_server
+    store = RedisSessionStore(RespPool(url, max_connections=2))
+
+    async def run():
+        for user_id in (1, 2):
+            for i in range(3):
+                await store.create(None, user_id, f"s{user_id}-{i}", ttl=60)
+        await store.create(None, 1, "reset:r1", ttl=60)
+        assert await store.delete_many(None, ["s2-0", "reset:r1", "missing"]) == 1
+        assert await store.delete_for_users(None, [1, 2]) == 5
+        assert await store.delete_for_users(None, [1, 2]) == 0
+        assert await store.lookup(None, "reset:r1") == 1
+        await store.close()
+
+    asyncio.run(run())
+    # Reset tokens are never listed in the per-user set
+    assert server.data[b"tst_auth:user_sessions:1"] == set()
+
+
+def test_redis_per_user_set_outlives_shorter_tokens(resp_server):
+    server, url = resp_server
+    store = RedisSessionStore(RespPool(url, max_connections=2))
+
+    async def run():
+        await store.create(None, 1, "long-session", ttl=60)
+        # Neither a short reset token nor a shorter session may cut the set's lifetime
+        await store.create(None, 1, "reset:short", ttl=1)
+        await store.create(None, 1, "short-session", ttl=1)
+        await asyncio.sleep(1.1)
+        assert await store.lookup(None, "reset:short") is None
+        assert await store.delete_for_users(None, [1]) == 1
+        assert await store.lookup(None, "long-session") is None
+        await store.close()
+
+    asyncio.run(run())
+    assert server.expiry[b"tst_auth:user_sessions:1"] > time.monotonic() + 50
+
+
+def test_redis_pool_raises_error_replies(resp_server):
+    _, url = resp_server
+    pool = RespPool(url)
+
+    async def run():
+        with pytest.raises(RespError):
+            await pool.execute("FLUSHALL")
+        assert await pool.execute("PING") == "OK"
+        await pool.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_login_validate_logout(client, db_session, use_store, resp_server, backend):
+    _, url = resp_server
+    store = use_store(MemorySessionStore() if backend == "memory" else RedisSessionStore(RespPool(url)))
+    user = add_user(db_session, "storeuser", "storepassword")
+
+    response = client.post("/login", json={"username": "storeuser", "password": "storepassword"})
+    assert response.status_code == status.HTTP_200_OK
+    token = response.json()["session_token"]
+    # The session lives in the configured store, not in the sessions table
+    assert db_session.query(SessionToken).count() == 0
+
+    response = client.post("/session/validate", json={"session_token": token})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["user_id"] == user.id
+
+    assert client.post("/logout", json={"session_token": token}).status_code == status.HTTP_200_OK
+    response = client.post("/session/validate", json={"session_token": token})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.get("/internal/session-store").json()["backend"] == backend
+    asyncio.run(store.close())
+
+
+def test_password_reset_through_memory_store(client, db_session, use_store):
+    use_store(MemorySessionStore())
+    add_user(db_session, "resetuser", "oldpassword")
+
+    reset_token = client.post("/password-reset", json={"identifier": "resetuser"}).json()["reset_token"]
+    # A reset token is never a session
+    response = client.post("/session/validate", json={"session_token": reset_token})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    request = {"reset_token": reset_token, "new_password": "newpassword"}
+    assert client.post("/password-update", json=request).status_code == status.HTTP_200_OK
+    assert client.post("/password-update", json=request).status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/login", json={"username": "resetuser", "password": "newpassword"})
+    assert response.status_code == status.HTTP_200_OK
@@ -0,0 +1,117 @@
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from tst_auth_svc.models.session import SessionToken
+from tst_auth_svc.session_cache import MISS, SessionCache, session_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_session_cache():
+    session_cache.clear()
+    yield
+    session_cache.clear()
+
+
+@pytest.fixture
+def statement_count(session_local):
+    statements = []
+    engine = session_local.kw["bind"]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def create_session(db, user_id: int, token: str):
+    db.add(SessionToken(user_id=user_id, session_token=token))
+    db.commit()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_ttl_and_negative_entries():
+    clock = FakeClock()
+    cache = SessionCache(max_entries=10, ttl=60, negative_ttl=5, clock=clock)
+    cache.put("good", 1)
+    cache.put("bad", None)
+    assert cache.get("good") == 1
+    assert cache.get("bad") is None
+
+    clock.now = 6
+    assert cache.get("bad") is MISS
+    assert cache.get("good") == 1
+
+    clock.now = 61
+    assert cache.get("good") is MISS
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["negative_hits"] == 1
+    assert stats["expirations"] == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SessionCache(max_entries=2, ttl=60, negative_ttl=5)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is MISS
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_invalidate_user():
+    cache = SessionCache(max_entries=10, ttl=60, negative_ttl=5)
+    cache.put("a", 1)
+    cache.put("b", 1)
+    cache.put("c", 2)
+    cache.invalidate_user(1)
+    assert cache.get("a") is MISS
+    assert cache.get("b") is MISS
+    assert cache.get("c") == 2
+
+
+def test_validate_hit_does_not_touch_database(client, db_session, statement_count):
+    create_session(db_session, 7, "valid_token_abc")
+
+    response = client.post("/session/validate", json={"session_token": "valid_token_abc"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"valid": True, "user_id": 7}
+
+    statement_count.clear()
+    response = client.post("/session/validate", json={"session_token": "valid_token_abc"})
+    assert response.status_code == status.HTTP_200_OK
+    assert statement_count == []
+    assert client.get("/internal/session-cache").json()["hits"] == 1
+
+
+def test_validate_unknown_token_is_negatively_cached(client, statement_count):
+    for _ in range(2):
+        response = client.post("/session/validate", json={"session_token": "no_such_token"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert len(statement_count) == 1
+
+
+def test_validate_rejects_reset_tokens(client, db_session):
+    create_session(db_session, 7, "reset:sometoken")
+    response = client.post("/session/validate", json={"session_token": "reset:sometoken"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_logout_evicts_cached_session(client, db_session):
+    create_session(db_session, 7, "logout_me")
+    assert client.post("/session/validate", json={"session_token": "logout_me"}).status_code == status.HTTP_200_OK
+
+    assert client.post("/logout", json={"session_token": "logout_me"}).status_code == status.HTTP_200_OK
+    response = client.post("/session/validate", json={"session_token": "logout_me"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import signal
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from fastapi import status
+from pydantic import ValidationError
+
+from tst_auth_svc import settings as settings_module
+from tst_auth_svc.settings import (
+    Settings,
+    get_settings,
+    install_reload_signal,
+    load_settings,
+    reload_settings,
+    remove_reload_signal,
+    settings_stats,
+)
+
+
+@pytest.fixture
+def restore_settings(monkeypatch):
+    monkeypatch.setattr(settings_module, "_settings", settings_module._settings)
+    monkeypatch.setattr(settings_module, "_generation", settings_module._generation)
+
+
+def test_load_settings_reads_values_and_secret_files(tmp_path):
+    secret = tmp_path / "secret"
+    secret.write_text("s3cret\n")
+    settings = load_settings({"GOOGLE_CLIENT_ID": " id ", "GOOGLE_CLIENT_SECRET_FILE": str(secret),
+                              "GOOGLE_REDIRECT_URI": "https://auth.example.com/cb"})
+    assert settings.google_client_id == "id"
+    assert settings.google_client_secret.get_secret_value() == "s3cret"
+    assert settings.google_configured
+    assert "s3cret" not in repr(settings)
+
+    assert not load_settings({"GOOGLE_CLIENT_ID": "id", "GOOGLE_CLIENT_SECRET": ""}).google_configured
+    with pytest.raises(ValidationError):
+        load_settings({"GOOGLE_REDIRECT_URI": "/relative/callback"})
+
+
+def test_requests_use_the_snapshot_until_reloaded(monkeypatch, client, restore_settings, internal_headers):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "first client")
+    monkeypatch.setenv("GOOGLE_CLIENT_SECRET", "secret")
+    monkeypatch.setenv("GOOGLE_REDIRECT_URI", "http://testserver/google-callback?from=a&b=c")
+    assert reload_settings()
+
+    response = client.get("/auth/google/google-login", follow_redirects=False)
+    assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    query = parse_qs(urlsplit(response.headers["location"]).query)
+    # Values are encoded, not pasted into the URL
+    assert query["client_id"] == ["first client"]
+    assert query["redirect_uri"] == ["http://testserver/google-callback?from=a&b=c"]
+
+    # The environment is not read per request
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "second-client")
+    response = client.get("/auth/google/google-login", follow_redirects=False)
+    assert parse_qs(urlsplit(response.headers["location"]).query)["client_id"] == ["first client"]
+
+    generation = client.get("/internal/settings").json()["generation"]
+    response = client.post("/internal/settings/reload", headers=internal_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["generation"] == generation + 1
+    assert response.json()["set"] == {"google_client_id": True, "google_client_secret": True,
+                                      "google_redirect_uri": True, "internal_api_token": True}
+    response = client.get("/auth/google/google-login", follow_redirects=False)
+    assert parse_qs(urlsplit(response.headers["location"]).query)["client_id"] == ["second-client"]
+
+
+def test_invalid_reload_keeps_the_current_settings(monkeypatch, client, restore_settings, internal_headers):
+    current = get_settings()
+    monkeypatch.setenv("GOOGLE_REDIRECT_URI", "not a url")
+    response = client.post("/internal/settings/reload", headers=internal_headers)
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert get_settings() is current
+
+
+def test_reload_requires_the_internal_token(client, restore_settings, internal_headers):
+    generation = settings_stats()["generation"]
+    assert client.post("/internal/settings/reload").status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/internal/settings/reload", headers={"X-Internal-Token": "guessed-token"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert settings_stats()["generation"] == generation
+
+
+def test_sighup_reloads_settings(monkeypatch, restore_settings):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "rotated-client")
+
+    async def run():
+        assert install_reload_signal()
+        try:
+            os.kill(os.getpid(), signal.SIGHUP)
+            for _ in range(50):
+                if get_settings().google_client_id == "rotated-client":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            remove_reload_signal()
+
+    asyncio.run(run())
+    assert get_settings().google_client_id == "rotated-client"
+    assert isinstance(get_settings(), Settings)
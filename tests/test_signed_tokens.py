@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import select
+
+from tst_auth_svc.models.base import SyncSessionAdapter
+from tst_auth_svc.models.session import REVOKED_TOKEN_PREFIX, TOKEN_TYPE_REVOKED, SessionToken, token_digest
+from tst_auth_svc.signed_tokens import RevocationSet, TokenSigner, parse_key_set, revocation_record, revocations
+
+
+@pytest.fixture(autouse=True)
+def clear_revocations():
+    revocations.clear()
+    yield
+    revocations.clear()
+
+
+@pytest.fixture
+def signed_sessions(monkeypatch):
+    signer = TokenSigner(parse_key_set("k1:test-secret"), ttl=3600)
+    monkeypatch.setattr("tst_auth_svc.sessions.signed_tokens_enabled", lambda: True)
+    monkeypatch.setattr("tst_auth_svc.sessions.token_signer", signer)
+    return signer
+
+
+def test_parse_key_set():
+    assert parse_key_set("new:s2, old:s1") == {"new": b"s2", "old": b"s1"}
+    assert parse_key_set("") == {}
+    with pytest.raises(ValueError):
+        parse_key_set("missing-secret")
+
+
+def test_issue_and_verify_round_trip():
+    signer = TokenSigner(parse_key_set("k1:secret"), ttl=60)
+    token = signer.issue(42, now=1000)
+    claims = signer.verify(token, now=1010)
+    assert claims.user_id == 42
+    assert claims.issued_at == 1000
+    assert claims.expires_at == 1060
+
+
+def test_rotated_keys_still_verify_old_tokens():
+    old_token = TokenSigner(parse_key_set("k1:old"), ttl=60).issue(5, now=0)
+    rotated = TokenSigner(parse_key_set("k2:new,k1:old"), ttl=60)
+    assert rotated.verify(old_token, now=1).user_id == 5
+    assert rotated.issue(5, now=0).split(".")[1] == "k2"
+
+    retired = TokenSigner(parse_key_set("k2:new"), ttl=60)
+    assert retired.verify(old_token, now=1) is None
+
+
+def test_rejects_tampered_and_expired_tokens():
+    signer = TokenSigner(parse_key_set("k1:secret"), ttl=60)
+    token = signer.issue(1, now=0)
+    version, kid, payload, signature = token.split(".")
+    forged = TokenSigner(parse_key_set("k1:other"), ttl=60).issue(1, now=0).split(".")[2]
+
+    assert signer.verify(f"{version}.{kid}.{forged}.{signature}", now=1) is None
+    assert signer.verify(f"{version}.{kid}.{payload}.{signature[:-2]}AA", now=1) is None
+    assert signer.verify(token, now=60) is None
+    assert signer.verify("v1.k1.garbage", now=1) is None
+
+
+def test_signed_session_login_validate_logout(client, db_session, signed_sessions):
+    payload = {"username": "signeduser", "email": "signed@example.com", "password": "signedpassword"}
+    assert client.post("/register", json=payload).status_code == status.HTTP_200_OK
+
+    response = client.post("/login", json={"username": "signeduser", "password": "signedpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    token = response.json()["session_token"]
+    assert token.startswith("v1.k1.")
+    assert db_session.query(SessionToken).count() == 0
+
+    response = client.post("/session/validate", json={"session_token": token})
+    assert response.status_code == status.HTTP_200_OK
+    user_id = response.json()["user_id"]
+
+    assert client.post("/logout", json={"session_token": token}).status_code == status.HTTP_200_OK
+    assert client.post("/logout", json={"session_token": token}).status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/session/validate", json={"session_token": token})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    record = db_session.execute(select(SessionToken.user_id, SessionToken.token_type)).one()
+    assert record.user_id == user_id
+    assert record.token_type == TOKEN_TYPE_REVOKED
+
+
+def test_revocations_are_loaded_from_the_database(client, db_session, signed_sessions):
+    token = signed_sessions.issue(9)
+    claims = signed_sessions.verify(token)
+    db_session.add(SessionToken(user_id=9, session_token=revocation_record(claims)))
+    db_session.commit()
+    assert db_session.query(SessionToken.session_token).scalar() == token_digest(revocation_record(claims))
+
+    response = client.post("/session/validate", json={"session_token": token})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert revocations.is_revoked(claims)
+
+
+def test_revocations_committed_out_of_id_order_are_loaded(db_session, signed_sessions):
+    now = [1000.0]
+    revoked = RevocationSet(refresh_interval=5, overlap=30, clock=lambda: now[0])
+    first, second = (signed_sessions.verify(signed_sessions.issue(user_id)) for user_id in (1, 2))
+
+    def commit_revocation(row_id, claims):
+        db_session.add(SessionToken(id=row_id, user_id=claims.user_id, session_token=revocation_record(claims)))
+        db_session.commit()
+
+    def refresh(at):
+        now[0] = at
+        asyncio.run(revoked.maybe_refresh(SyncSessionAdapter(db_session)))
+
+    # Row 11 commits and is read before row 10, whose transaction started earlier, commits
+    commit_revocation(11, second)
+    refresh(1000)
+    refresh(1010)
+    commit_revocation(10, first)
+    refresh(1020)
+    assert revoked.is_revoked(first) and revoked.is_revoked(second)
+
+    # Ids read by refreshes that finished an overlap before the previous one are not scanned again
+    refresh(1100)
+    refresh(1200)
+    third = signed_sessions.verify(signed_sessions.issue(3))
+    commit_revocation(5, third)
+    refresh(1300)
+    assert not revoked.is_revoked(third)
+
+
+def test_revocation_records_are_not_sessions(client, db_session):
+    db_session.add(SessionToken(user_id=3, session_token=f"{REVOKED_TOKEN_PREFIX}00ff:99"))
+    db_session.commit()
+    response = client.post("/session/validate", json={"session_token": f"{REVOKED_TOKEN_PREFIX}00ff:99"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/logout", json={"session_token": f"{REVOKED_TOKEN_PREFIX}00ff:99"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
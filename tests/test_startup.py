@@ -0,0 +1,86 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Import plus lifespan startup (engines, warm-up) on a cold interpreter; override on slow machines
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", 2500))
+
+# Modules the app must not load until they are used: Google sign-in's HTTP client and ID
+# token verification, the prefork server, and the database driver (loaded when the engine is created)
+DEFERRED_MODULES = ("httpx", "jwt", "uvicorn", "sqlite3")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (.+)$", re.MULTILINE)
+
+COLD_START = f"""
+import json, sys, time
+started = time.perf_counter()
+import tst_auth_svc.app
+imported = time.perf_counter()
+from tst_auth_svc.models import base
+loaded = sorted(name for name in {DEFERRED_MODULES!r} if name in sys.modules)
+engines_created = base._engines is not None
+
+from fastapi.testclient import TestClient
+base.Base.metadata.create_all(base.get_engine())
+lifespan_started = time.perf_counter()
+with TestClient(tst_auth_svc.app.app) as client:
+    ready = client.get("/ready").status_code
+    lifespan_done = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (lifespan_done - lifespan_started) * 1000,
+    "loaded": loaded,
+    "engines_created": engines_created,
+    "ready": ready,
+}}))
+"""
+
+
+def cold_start(tmp_path, *options) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": SRC, "DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}"}
+    return subprocess.run([sys.executable, *options, "-c", COLD_START], env=env, capture_output=True, text=True,
+                          timeout=120, check=True)
+
+
+def parse_importtime(report: str) -> dict:
+    """Maps module name to (self, cumulative) microseconds from a -X importtime report."""
+    return {name.strip(): (int(self_us), int(cumulative_us))
+            for self_us, cumulative_us, name in IMPORTTIME_LINE.findall(report)}
+
+
+def slowest(modules: dict, count: int = 15) -> str:
+    ranked = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:count]
+    return "\n".join(f"{cumulative / 1000:9.1f} ms  {name}" for name, (_, cumulative) in ranked)
+
+
+def test_importtime_report_defers_optional_subsystems(tmp_path):
+    result = cold_start(tmp_path, "-X", "importtime")
+    report = tmp_path / "importtime.txt"
+    report.write_text(result.stderr)
+    # A module is reported once its own imports are done, so everything up to the app's line
+    # was imported by the app (the TestClient brings in httpx afterwards)
+    modules = parse_importtime(result.stderr[:result.stderr.index("| tst_auth_svc.app\n")])
+    assert {"fastapi", "sqlalchemy", "tst_auth_svc.google_oauth_client"} <= set(modules)
+    for module in DEFERRED_MODULES:
+        assert module not in modules, f"{module} is imported with the app:\n{slowest(modules)}"
+
+    summary = json.loads(result.stdout)
+    assert summary["loaded"] == []
+    assert not summary["engines_created"]
+    assert summary["ready"] == 200
+
+
+def test_cold_start_within_budget(tmp_path):
+    # Best of three, so one slow run on a busy machine does not fail the build
+    runs = [json.loads(cold_start(tmp_path).stdout) for _ in range(3)]
+    best = min(runs, key=lambda run: run["import_ms"] + run["lifespan_ms"])
+    total_ms = best["import_ms"] + best["lifespan_ms"]
+    if total_ms > STARTUP_BUDGET_MS:
+        modules = parse_importtime(cold_start(tmp_path, "-X", "importtime").stderr)
+        raise AssertionError(
+            f"cold start took {total_ms:.0f} ms (import {best['import_ms']:.0f} ms, lifespan "
+            f"{best['lifespan_ms']:.0f} ms), budget {STARTUP_BUDGET_MS:.0f} ms; slowest imports:\n{slowest(modules)}")
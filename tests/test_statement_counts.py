@@ -0,0 +1,85 @@
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from tst_auth_svc.session_cache import session_cache
+
+
+@pytest.fixture
+def statements(session_local):
+    """Records every statement sent to the test database."""
+    session_cache.clear()
+    recorded = []
+    engine = session_local.kw["bind"]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine, "before_cursor_execute", record)
+    session_cache.clear()
+
+
+def register(client, username: str = "rounduser", email: str = "round@example.com"):
+    payload = {"username": username, "email": email, "password": "roundpassword"}
+    return client.post("/register", json=payload)
+
+
+def login(client) -> str:
+    response = client.post("/login", json={"username": "rounduser", "password": "roundpassword"})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["session_token"]
+
+
+def test_register_is_a_single_insert(client, statements):
+    assert register(client).status_code == status.HTTP_200_OK
+    assert statements == ["INSERT"]
+
+    statements.clear()
+    response = register(client, email="other@example.com")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "User with this username or email already exists."
+    assert statements == ["INSERT"]
+
+
+def test_login_and_logout_round_trips(client, statements):
+    register(client)
+    statements.clear()
+    token = login(client)
+    assert statements == ["SELECT", "INSERT"]
+
+    statements.clear()
+    assert client.post("/logout", json={"session_token": token}).status_code == status.HTTP_200_OK
+    assert statements == ["DELETE"]
+
+    statements.clear()
+    response = client.post("/logout", json={"session_token": token})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert statements == ["DELETE"]
+
+
+def test_session_validate_miss_is_one_select(client, statements):
+    register(client)
+    token = login(client)
+    session_cache.clear()
+    statements.clear()
+    assert client.post("/session/validate", json={"session_token": token}).status_code == status.HTTP_200_OK
+    assert statements == ["SELECT"]
+
+
+def test_password_reset_and_update_round_trips(client, statements):
+    register(client)
+    statements.clear()
+    reset_token = client.post("/password-reset", json={"identifier": "rounduser"}).json()["reset_token"]
+    assert statements == ["SELECT", "INSERT"]
+
+    statements.clear()
+    request = {"reset_token": reset_token, "new_password": "newroundpassword"}
+    assert client.post("/password-update", json=request).status_code == status.HTTP_200_OK
+    # Token check, then the consuming DELETE ... RETURNING and the UPDATE in one transaction
+    assert statements == ["SELECT", "DELETE", "UPDATE"]
+
+    statements.clear()
+    assert client.post("/password-update", json=request).status_code == status.HTTP_400_BAD_REQUEST
+    assert statements == ["SELECT"]
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi import status
+
+from tst_auth_svc.config import RESET_TOKEN_TTL, SESSION_TOKEN_TTL
+from tst_auth_svc.models.base import SyncSessionAdapter
+from tst_auth_svc.models.session import SessionToken, token_digest, token_expiry
+from tst_auth_svc.sweeper import SessionSweeper
+
+
+def add_token(db, token: str, expires_at=None, user_id: int = 1):
+    db.add(SessionToken(user_id=user_id, session_token=token, expires_at=expires_at))
+    db.commit()
+
+
+def test_expiry_depends_on_token_type():
+    now = datetime(2024, 1, 1)
+    assert token_expiry("abc", now) == now + timedelta(seconds=SESSION_TOKEN_TTL)
+    assert token_expiry("reset:abc", now) == now + timedelta(seconds=RESET_TOKEN_TTL)
+    assert token_expiry("revoked:00ff:1704070800", now) == datetime(2024, 1, 1, 1)
+
+
+def test_inserted_rows_get_an_expiry(db_session):
+    db_session.add(SessionToken(user_id=1, session_token="fresh"))
+    db_session.commit()
+    row = db_session.query(SessionToken).one()
+    assert row.expires_at > datetime.utcnow() + timedelta(seconds=SESSION_TOKEN_TTL - 60)
+
+
+def test_sweep_deletes_expired_rows_in_batches(session_local, db_session):
+    past = datetime.utcnow() - timedelta(minutes=1)
+    for i in range(5):
+        add_token(db_session, f"expired_{i}", past)
+    add_token(db_session, "live", datetime.utcnow() + timedelta(hours=1))
+    db_session.add(SessionToken(user_id=1, session_token="legacy"))
+    db_session.commit()
+    db_session.query(SessionToken).filter_by(session_token="legacy").update({"expires_at": None})
+    db_session.commit()
+
+    sweeper = SessionSweeper(interval=0, batch_size=2, max_rows_per_second=0,
+                             session_factory=lambda: SyncSessionAdapter(session_local()))
+    cycle = asyncio.run(sweeper.sweep_once())
+
+    assert cycle["rows_swept"] == 5
+    assert cycle["batches"] == 3
+    remaining = {t for (t,) in db_session.query(SessionToken.session_token)}
+    assert remaining == {token_digest("legacy"), token_digest("live")}
+    stats = sweeper.stats()
+    assert stats["cycles"] == 1
+    assert stats["rows_swept_total"] == 5
+    assert stats["last_cycle"]["rows_swept"] == 5
+
+
+def test_expired_session_is_rejected_before_it_is_swept(client, db_session):
+    add_token(db_session, "stale_session", datetime.utcnow() - timedelta(seconds=1), user_id=7)
+    response = client.post("/session/validate", json={"session_token": "stale_session"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_expired_reset_token_is_rejected(client, db_session):
+    payload = {"username": "sweepuser", "email": "sweep@example.com", "password": "sweeppassword"}
+    assert client.post("/register", json=payload).status_code == status.HTTP_200_OK
+    reset_token = client.post("/password-reset", json={"identifier": "sweepuser"}).json()["reset_token"]
+    db_session.query(SessionToken).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+
+    response = client.post("/password-update", json={"reset_token": reset_token, "new_password": "newpassword"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_sweeper_stats_endpoint(client):
+    response = client.get("/internal/sweeper")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"cycles", "rows_swept_total", "last_cycle"} <= response.json().keys()
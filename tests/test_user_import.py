@@ -0,0 +1,144 @@
+import asyncio
+import json
+
+import bcrypt
+import pytest
+from fastapi import status
+
+from tst_auth_svc.hashing import HashingExecutor
+from tst_auth_svc.models.base import SyncSessionAdapter
+from tst_auth_svc.models.user import User
+from tst_auth_svc.user_import import csv_rows, ndjson_rows, user_importer
+
+
+@pytest.fixture
+def importer(monkeypatch, session_local):
+    hasher = HashingExecutor(kind="thread", max_workers=2, rounds=4)
+    monkeypatch.setattr(user_importer, "session_factory", lambda: SyncSessionAdapter(session_local()))
+    monkeypatch.setattr(user_importer, "hasher", hasher)
+    monkeypatch.setattr(user_importer, "batch_size", 2)
+    yield user_importer
+    hasher.shutdown()
+
+
+def ndjson(*rows) -> bytes:
+    return b"".join((row if isinstance(row, bytes) else json.dumps(row).encode()) + b"\n" for row in rows)
+
+
+@pytest.fixture
+def post_import(client, internal_headers):
+    def post(body: bytes) -> list:
+        response = client.post("/internal/users/import", content=body,
+                               headers={**internal_headers, "content-type": "application/x-ndjson"})
+        assert response.status_code == status.HTTP_200_OK
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    return post
+
+
+def collect(rows) -> list:
+    async def run():
+        return [row async for row in rows]
+
+    return asyncio.run(run())
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_ndjson_rows_reassembles_lines_across_chunks():
+    data = ndjson({"a": 1}, b"", b"[1]", b"{oops", {"b": 2}).rstrip(b"\n")
+    rows = collect(ndjson_rows(chunked(data, 3)))
+    assert rows[0] == (1, {"a": 1})
+    assert rows[1] == (3, "Expected a JSON object")
+    assert rows[2][0] == 4 and rows[2][1].startswith("Invalid JSON")
+    # The last line needs no trailing newline
+    assert rows[3] == (5, {"b": 2})
+
+
+def test_ndjson_rows_drops_oversized_lines():
+    data = ndjson({"username": "x" * 200}, {"ok": True})
+    rows = collect(ndjson_rows(chunked(data, 16), max_line_bytes=64))
+    assert rows == [(1, "Line longer than 64 bytes"), (2, {"ok": True})]
+
+
+def test_csv_rows_leave_out_empty_cells():
+    lines = ["username,email,password,password_hash\n", "alice,alice@example.com,alicepassword,\n"]
+    assert list(csv_rows(lines)) == [
+        (2, {"username": "alice", "email": "alice@example.com", "password": "alicepassword"}),
+    ]
+
+
+def test_import_reports_rows_it_did_not_create(client, db_session, importer, post_import):
+    prehashed = bcrypt.hashpw(b"legacypassword", bcrypt.gensalt(4)).decode()
+    db_session.add(User(username="taken", email="taken@example.com", password=prehashed))
+    db_session.commit()
+
+    results = post_import(ndjson(
+        {"username": "plain", "email": "plain@example.com", "password": "plainpassword"},
+        {"username": "legacy", "email": "legacy@example.com", "password_hash": prehashed},
+        b"not json",
+        {"username": "nopassword", "email": "nopassword@example.com"},
+        {"username": "taken", "email": "other@example.com", "password": "takenpassword"},
+        {"username": "plain2", "email": "plain@example.com", "password": "plainpassword"},
+        {"username": "short", "email": "short@example.com", "password": "abc"},
+    ))
+
+    summary = results.pop()
+    assert summary["status"] == "done"
+    assert {key: summary[key] for key in ("rows", "inserted", "conflicts", "invalid", "hashed", "batches")} == {
+        "rows": 7, "inserted": 2, "conflicts": 2, "invalid": 3, "hashed": 1, "batches": 2,
+    }
+    by_line = {result["line"]: result for result in results}
+    assert sorted(by_line) == [3, 4, 5, 6, 7]
+    assert by_line[3]["status"] == "invalid"
+    assert "Exactly one of password and password_hash" in by_line[4]["error"]
+    assert by_line[5] == {"line": 5, "status": "conflict", "username": "taken", "fields": ["username"]}
+    assert by_line[6]["fields"] == ["email"]
+    assert by_line[7]["status"] == "invalid"
+
+    for username, password in (("plain", "plainpassword"), ("legacy", "legacypassword")):
+        response = client.post("/login", json={"username": username, "password": password})
+        assert response.status_code == status.HTTP_200_OK
+
+
+def test_reimport_skips_hashing_for_existing_rows(importer, post_import):
+    body = ndjson(*({"username": f"user{i}", "email": f"user{i}@example.com", "password": "samepassword"}
+                    for i in range(5)))
+    assert post_import(body)[-1]["inserted"] == 5
+
+    results = post_import(body)
+    summary = results.pop()
+    assert summary["inserted"] == 0
+    assert summary["conflicts"] == 5
+    assert summary["hashed"] == 0
+    assert {tuple(result["fields"]) for result in results} == {("username", "email")}
+
+
+def test_duplicates_within_a_batch_keep_the_first_row(importer, db_session, post_import):
+    body = ndjson(
+        {"username": "twin", "email": "twin1@example.com", "password": "twinpassword"},
+        {"username": "twin", "email": "twin2@example.com", "password": "twinpassword"},
+    )
+    results = post_import(body)
+    assert results[0] == {"line": 2, "status": "conflict", "username": "twin", "fields": ["username"]}
+    assert db_session.query(User.email).filter(User.username == "twin").scalar() == "twin1@example.com"
+
+
+@pytest.mark.parametrize("configured, token, expected", [
+    (False, None, status.HTTP_403_FORBIDDEN),
+    (True, None, status.HTTP_401_UNAUTHORIZED),
+    (True, "wrong-token", status.HTTP_401_UNAUTHORIZED),
+])
+def test_import_requires_the_internal_token(request, client, importer, db_session, configured, token, expected):
+    if configured:
+        request.getfixturevalue("internal_headers")
+    headers = {"content-type": "application/x-ndjson"}
+    if token:
+        headers["X-Internal-Token"] = token
+    body = ndjson({"username": "intruder", "email": "intruder@example.com", "password": "intruderpassword"})
+    response = client.post("/internal/users/import", content=body, headers=headers)
+    assert response.status_code == expected
+    assert db_session.query(User).count() == 0
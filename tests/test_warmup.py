@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import event, select
+from sqlalchemy.engine.interfaces import CacheStats
+
+from tst_auth_svc.app import app
+from tst_auth_svc.models.base import SyncSessionAdapter
+from tst_auth_svc.models.session import SessionToken
+from tst_auth_svc.models.user import User
+from tst_auth_svc.warmup import Warmup
+
+
+@pytest.fixture
+def warmup(monkeypatch, session_local):
+    warmup = Warmup(pool_connections=2, timeout=10, session_factory=lambda: SyncSessionAdapter(session_local()))
+    monkeypatch.setattr("tst_auth_svc.routers.health.warmup", warmup)
+    return warmup
+
+
+def test_warmup_runs_every_step_and_leaves_no_rows(warmup, session_local):
+    statements = []
+    engine = session_local.kw["bind"]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        asyncio.run(warmup.run(app))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    stats = warmup.stats()
+    assert stats["ready"]
+    assert all(step["ok"] for step in stats["steps"].values()), stats
+    assert set(stats["steps"]) == {"mappers", "pool", "statements", "models", "hashing"}
+    assert {"SELECT", "DELETE", "UPDATE", "INSERT"} <= set(statements)
+
+    db = session_local()
+    try:
+        assert db.query(User).count() == 0
+        assert db.query(SessionToken).count() == 0
+    finally:
+        db.close()
+
+
+def test_first_login_lookup_hits_the_statement_cache(warmup, session_local):
+    asyncio.run(warmup.run(app))
+    cache_hits = []
+    engine = session_local.kw["bind"]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        cache_hits.append(context.cache_hit == CacheStats.CACHE_HIT)
+
+    event.listen(engine, "before_cursor_execute", record)
+    db = session_local()
+    try:
+        db.execute(select(User.id, User.password).where(User.username == "someone")).first()
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", record)
+    assert cache_hits == [True]
+
+
+def test_ready_reflects_the_warmup_state(client, warmup):
+    response = client.get("/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["detail"]["state"] == "starting"
+
+    warmup.mark_ready()
+    assert client.get("/ready").status_code == status.HTTP_200_OK
+
+    warmup.mark_stopping()
+    assert client.get("/ready").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+def test_background_warmup_and_timeout(warmup, monkeypatch):
+    async def slow_run(app):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(warmup, "_run", slow_run)
+    warmup.timeout = 0.05
+
+    async def run():
+        await warmup.start(app, background=True)
+        assert not warmup.ready
+        assert warmup.state == "warming"
+        await asyncio.sleep(0.2)
+        # A warm-up that overruns its budget gives way to serving
+        assert warmup.ready
+        await warmup.stop()
+
+    asyncio.run(run())
+    assert warmup.state == "stopping"
+    assert not warmup.ready